@@ -7,6 +7,12 @@ from .review_queue_routes import router as review_queue_router
 from .duplicate_detection_routes import router as duplicate_detection_router
 from .version_audit_routes import router as version_audit_router
 
+# Runtime telemetry
+from .system_routes import router as system_router
+
+# Background jobs
+from .job_routes import router as job_router
+
 # Combine routes under admin prefix
 from fastapi import APIRouter
 
@@ -26,4 +32,10 @@ router.include_router(review_queue_router)
 router.include_router(duplicate_detection_router)
 router.include_router(version_audit_router)
 
+# Runtime telemetry
+router.include_router(system_router)
+
+# Background jobs
+router.include_router(job_router)
+
 __all__ = ["router"]
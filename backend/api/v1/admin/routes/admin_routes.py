@@ -1,12 +1,15 @@
 from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
 from bson import ObjectId
 from typing import List
 import os
 
 from api.v1.admin.models import SendNotificationRequest
-from core.security import get_admin_user
+from core.security import get_admin_user, user_cache
 from core.database import get_database
+from api.v1.tests.services.answer_keys import answer_keys
+from api.v1.tests.services.question_pool import question_pools
+from api.v1.admin.services.notification_service import NotificationService, SEND_NOTIFICATION
+from core.jobs import job_runner, accepted
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -79,37 +82,35 @@ async def delete_user(user_id: str, admin: dict = Depends(get_admin_user)):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
     
+    user_cache.invalidate(user_id)
     return {"message": "User deleted successfully"}
 
 # ==================== PUSH NOTIFICATIONS ====================
 
-@router.post("/notifications/send")
+@router.post("/notifications/send", status_code=202)
 async def send_notification(request: SendNotificationRequest, admin: dict = Depends(get_admin_user)):
-    """Send push notification to users (Admin only)"""
-    db = get_database()
-    
-    # Get users with push tokens
-    users = await db.users.find({"push_token": {"$exists": True, "$ne": None}}).to_list(1000)
-    
-    sent_count = 0
-    failed_count = 0
-    
-    # Store notification in DB
-    notification_dict = {
-        "title": request.title,
-        "message": request.message,
-        "sent_at": datetime.utcnow(),
-        "sent_by": str(admin["_id"]),
-        "sent_count": len(users)
-    }
+    """Send push notification to users (Admin only)
     
-    await db.notifications.insert_one(notification_dict)
+    Delivery runs as a background job; poll /api/admin/jobs/{job_id} for the
+    sent and failed counts.
+    """
+    db = get_database()
     
-    return {
-        "message": f"Notification queued for {len(users)} users",
-        "sent_count": len(users),
-        "failed_count": 0
-    }
+    # Users with push tokens the notification goes to
+    recipients = await db.users.count_documents(
+        NotificationService.recipients_query(request.target_users, request.exam_id)
+    )
+    job = await job_runner.submit(
+        SEND_NOTIFICATION, {"notification": request.dict()}, submitted_by=str(admin["_id"])
+    )
+    
+    return accepted(
+        job,
+        success=True,
+        message=f"Notification queued for {recipients} users",
+        sent_count=recipients,
+        failed_count=0
+    )
 
 @router.get("/notifications/history")
 async def get_notification_history(admin: dict = Depends(get_admin_user), limit: int = 50):
@@ -135,6 +136,8 @@ async def bulk_delete_questions(question_ids: List[str], admin: dict = Depends(g
     
     object_ids = [ObjectId(qid) for qid in question_ids]
     result = await db.questions.delete_many({"_id": {"$in": object_ids}})
+    answer_keys.discard(object_ids)
+    question_pools.invalidate()
     
     return {
         "message": f"Deleted {result.deleted_count} questions",
@@ -19,6 +19,8 @@ from api.v1.content.models import (
 )
 from core.security import get_admin_user
 from core.database import get_database
+from api.v1.content.services.hierarchy_cache import content_cache
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
 
 router = APIRouter(tags=["admin-content"])
 
@@ -34,6 +36,7 @@ async def create_exam(exam: ExamCreate, admin: dict = Depends(get_admin_user)):
         "created_at": datetime.utcnow()
     }
     result = await db.exams.insert_one(exam_dict)
+    content_cache.invalidate("exams")
     exam_dict["_id"] = result.inserted_id
     
     return ExamResponse(
@@ -77,6 +80,7 @@ async def update_exam(exam_id: str, exam: ExamCreate, admin: dict = Depends(get_
         {"_id": ObjectId(exam_id)},
         {"$set": {"name": exam.name, "description": exam.description}}
     )
+    content_cache.invalidate("exams")
     updated_exam = await db.exams.find_one({"_id": ObjectId(exam_id)})
     if not updated_exam:
         raise HTTPException(status_code=404, detail="Exam not found")
@@ -92,6 +96,8 @@ async def delete_exam(exam_id: str, admin: dict = Depends(get_admin_user)):
     """Delete an exam (Admin only)"""
     db = get_database()
     result = await db.exams.delete_one({"_id": ObjectId(exam_id)})
+    content_cache.invalidate("exams")
+    await QuestionAncestryService.refresh_in_background("exams", exam_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Exam not found")
     return {"success": True, "message": "Exam deleted"}
@@ -109,6 +115,7 @@ async def create_subject(subject: SubjectCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.subjects.insert_one(subject_dict)
+    content_cache.invalidate("subjects")
     subject_dict["_id"] = result.inserted_id
     
     return SubjectResponse(
@@ -152,10 +159,13 @@ async def get_subject_by_id(subject_id: str, admin: dict = Depends(get_admin_use
 async def update_subject(subject_id: str, subject: SubjectCreate, admin: dict = Depends(get_admin_user)):
     """Update a subject (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("subjects", subject_id)
     await db.subjects.update_one(
         {"_id": ObjectId(subject_id)},
         {"$set": {"exam_id": subject.exam_id, "name": subject.name, "description": subject.description}}
     )
+    content_cache.invalidate("subjects")
+    await QuestionAncestryService.refresh_if_moved("subjects", subject_id, previous_parent, subject.exam_id)
     updated_subject = await db.subjects.find_one({"_id": ObjectId(subject_id)})
     if not updated_subject:
         raise HTTPException(status_code=404, detail="Subject not found")
@@ -172,6 +182,8 @@ async def delete_subject(subject_id: str, admin: dict = Depends(get_admin_user))
     """Delete a subject (Admin only)"""
     db = get_database()
     result = await db.subjects.delete_one({"_id": ObjectId(subject_id)})
+    content_cache.invalidate("subjects")
+    await QuestionAncestryService.refresh_in_background("subjects", subject_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Subject not found")
     return {"success": True, "message": "Subject deleted"}
@@ -189,6 +201,7 @@ async def create_chapter(chapter: ChapterCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.chapters.insert_one(chapter_dict)
+    content_cache.invalidate("chapters")
     chapter_dict["_id"] = result.inserted_id
     
     return ChapterResponse(
@@ -232,10 +245,13 @@ async def get_chapter_by_id(chapter_id: str, admin: dict = Depends(get_admin_use
 async def update_chapter(chapter_id: str, chapter: ChapterCreate, admin: dict = Depends(get_admin_user)):
     """Update a chapter (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("chapters", chapter_id)
     await db.chapters.update_one(
         {"_id": ObjectId(chapter_id)},
         {"$set": {"subject_id": chapter.subject_id, "name": chapter.name, "description": chapter.description}}
     )
+    content_cache.invalidate("chapters")
+    await QuestionAncestryService.refresh_if_moved("chapters", chapter_id, previous_parent, chapter.subject_id)
     updated_chapter = await db.chapters.find_one({"_id": ObjectId(chapter_id)})
     if not updated_chapter:
         raise HTTPException(status_code=404, detail="Chapter not found")
@@ -252,6 +268,8 @@ async def delete_chapter(chapter_id: str, admin: dict = Depends(get_admin_user))
     """Delete a chapter (Admin only)"""
     db = get_database()
     result = await db.chapters.delete_one({"_id": ObjectId(chapter_id)})
+    content_cache.invalidate("chapters")
+    await QuestionAncestryService.refresh_in_background("chapters", chapter_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Chapter not found")
     return {"success": True, "message": "Chapter deleted"}
@@ -269,6 +287,7 @@ async def create_topic(topic: TopicCreate, admin: dict = Depends(get_admin_user)
         "created_at": datetime.utcnow()
     }
     result = await db.topics.insert_one(topic_dict)
+    content_cache.invalidate("topics")
     topic_dict["_id"] = result.inserted_id
     
     return TopicResponse(
@@ -312,10 +331,13 @@ async def get_topic_by_id(topic_id: str, admin: dict = Depends(get_admin_user)):
 async def update_topic(topic_id: str, topic: TopicCreate, admin: dict = Depends(get_admin_user)):
     """Update a topic (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("topics", topic_id)
     await db.topics.update_one(
         {"_id": ObjectId(topic_id)},
         {"$set": {"chapter_id": topic.chapter_id, "name": topic.name, "description": topic.description}}
     )
+    content_cache.invalidate("topics")
+    await QuestionAncestryService.refresh_if_moved("topics", topic_id, previous_parent, topic.chapter_id)
     updated_topic = await db.topics.find_one({"_id": ObjectId(topic_id)})
     if not updated_topic:
         raise HTTPException(status_code=404, detail="Topic not found")
@@ -332,6 +354,8 @@ async def delete_topic(topic_id: str, admin: dict = Depends(get_admin_user)):
     """Delete a topic (Admin only)"""
     db = get_database()
     result = await db.topics.delete_one({"_id": ObjectId(topic_id)})
+    content_cache.invalidate("topics")
+    await QuestionAncestryService.refresh_in_background("topics", topic_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Topic not found")
     return {"success": True, "message": "Topic deleted"}
@@ -349,6 +373,7 @@ async def create_subtopic(subtopic: SubTopicCreate, admin: dict = Depends(get_ad
         "created_at": datetime.utcnow()
     }
     result = await db.sub_topics.insert_one(subtopic_dict)
+    content_cache.invalidate("sub_topics")
     subtopic_dict["_id"] = result.inserted_id
     
     return SubTopicResponse(
@@ -392,10 +417,13 @@ async def get_subtopic_by_id(subtopic_id: str, admin: dict = Depends(get_admin_u
 async def update_subtopic(subtopic_id: str, subtopic: SubTopicCreate, admin: dict = Depends(get_admin_user)):
     """Update a subtopic (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("sub_topics", subtopic_id)
     await db.sub_topics.update_one(
         {"_id": ObjectId(subtopic_id)},
         {"$set": {"topic_id": subtopic.topic_id, "name": subtopic.name, "description": subtopic.description}}
     )
+    content_cache.invalidate("sub_topics")
+    await QuestionAncestryService.refresh_if_moved("sub_topics", subtopic_id, previous_parent, subtopic.topic_id)
     updated_subtopic = await db.sub_topics.find_one({"_id": ObjectId(subtopic_id)})
     if not updated_subtopic:
         raise HTTPException(status_code=404, detail="Subtopic not found")
@@ -412,6 +440,8 @@ async def delete_subtopic(subtopic_id: str, admin: dict = Depends(get_admin_user
     """Delete a subtopic (Admin only)"""
     db = get_database()
     result = await db.sub_topics.delete_one({"_id": ObjectId(subtopic_id)})
+    content_cache.invalidate("sub_topics")
+    await QuestionAncestryService.refresh_in_background("sub_topics", subtopic_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Subtopic not found")
     return {"success": True, "message": "Subtopic deleted"}
@@ -429,6 +459,7 @@ async def create_section(section: SectionCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.sections.insert_one(section_dict)
+    content_cache.invalidate("sections")
     section_dict["_id"] = result.inserted_id
     
     return SectionResponse(
@@ -472,10 +503,13 @@ async def get_section_by_id(section_id: str, admin: dict = Depends(get_admin_use
 async def update_section(section_id: str, section: SectionCreate, admin: dict = Depends(get_admin_user)):
     """Update a section (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("sections", section_id)
     await db.sections.update_one(
         {"_id": ObjectId(section_id)},
         {"$set": {"sub_topic_id": section.sub_topic_id, "name": section.name, "description": section.description}}
     )
+    content_cache.invalidate("sections")
+    await QuestionAncestryService.refresh_if_moved("sections", section_id, previous_parent, section.sub_topic_id)
     updated_section = await db.sections.find_one({"_id": ObjectId(section_id)})
     if not updated_section:
         raise HTTPException(status_code=404, detail="Section not found")
@@ -492,6 +526,8 @@ async def delete_section(section_id: str, admin: dict = Depends(get_admin_user))
     """Delete a section (Admin only)"""
     db = get_database()
     result = await db.sections.delete_one({"_id": ObjectId(section_id)})
+    content_cache.invalidate("sections")
+    await QuestionAncestryService.refresh_in_background("sections", section_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Section not found")
     return {"success": True, "message": "Section deleted"}
@@ -509,6 +545,7 @@ async def create_subsection(subsection: SubSectionCreate, admin: dict = Depends(
         "created_at": datetime.utcnow()
     }
     result = await db.sub_sections.insert_one(subsection_dict)
+    content_cache.invalidate("sub_sections")
     subsection_dict["_id"] = result.inserted_id
     
     return SubSectionResponse(
@@ -552,10 +589,15 @@ async def get_subsection_by_id(subsection_id: str, admin: dict = Depends(get_adm
 async def update_subsection(subsection_id: str, subsection: SubSectionCreate, admin: dict = Depends(get_admin_user)):
     """Update a subsection (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("sub_sections", subsection_id)
     await db.sub_sections.update_one(
         {"_id": ObjectId(subsection_id)},
         {"$set": {"section_id": subsection.section_id, "name": subsection.name, "description": subsection.description}}
     )
+    content_cache.invalidate("sub_sections")
+    await QuestionAncestryService.refresh_if_moved(
+        "sub_sections", subsection_id, previous_parent, subsection.section_id
+    )
     updated_subsection = await db.sub_sections.find_one({"_id": ObjectId(subsection_id)})
     if not updated_subsection:
         raise HTTPException(status_code=404, detail="Subsection not found")
@@ -572,6 +614,8 @@ async def delete_subsection(subsection_id: str, admin: dict = Depends(get_admin_
     """Delete a subsection (Admin only)"""
     db = get_database()
     result = await db.sub_sections.delete_one({"_id": ObjectId(subsection_id)})
+    content_cache.invalidate("sub_sections")
+    await QuestionAncestryService.refresh_in_background("sub_sections", subsection_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Subsection not found")
     return {"success": True, "message": "Subsection deleted"}
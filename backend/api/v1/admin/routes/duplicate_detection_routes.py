@@ -7,83 +7,34 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Any
 from datetime import datetime
 from bson import ObjectId
-import difflib
 
 from core.security import get_admin_user
 from core.database import get_database
+from core.jobs import job_runner, accepted
+from api.v1.admin.services.duplicate_service import DuplicateService, DETECT_DUPLICATES, calculate_similarity
+from api.v1.tests.services.question_pool import question_pools
 
 router = APIRouter(prefix="/admin/duplicates", tags=["admin-duplicates"])
 
 
-def calculate_similarity(text1: str, text2: str) -> float:
-    """Calculate similarity between two texts using difflib"""
-    return difflib.SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-
-
 @router.post("/detect")
 async def detect_duplicates(
     threshold: float = Query(0.85, ge=0.5, le=1.0),
     limit: int = Query(100, le=500),
+    background: bool = False,
     admin: dict = Depends(get_admin_user)
 ):
-    """Detect duplicate questions based on text similarity"""
-    db = get_database()
-    
-    # Get all active questions
-    questions = await db.questions.find(
-        {"is_active": {"$ne": False}}
-    ).limit(limit).to_list(limit)
-    
-    duplicates = []
-    checked_pairs = set()
-    
-    # Compare each question with every other question
-    for i, q1 in enumerate(questions):
-        for j, q2 in enumerate(questions):
-            if i >= j:  # Skip same question and already checked pairs
-                continue
-            
-            pair_key = tuple(sorted([str(q1["_id"]), str(q2["_id"])]))
-            if pair_key in checked_pairs:
-                continue
-            
-            checked_pairs.add(pair_key)
-            
-            # Calculate similarity
-            text1 = q1.get("text", "")
-            text2 = q2.get("text", "")
-            
-            if not text1 or not text2:
-                continue
-            
-            similarity = calculate_similarity(text1, text2)
-            
-            if similarity >= threshold:
-                duplicates.append({
-                    "question1": {
-                        "id": str(q1["_id"]),
-                        "text": text1[:200],
-                        "subject": q1.get("subject", ""),
-                        "chapter": q1.get("chapter", "")
-                    },
-                    "question2": {
-                        "id": str(q2["_id"]),
-                        "text": text2[:200],
-                        "subject": q2.get("subject", ""),
-                        "chapter": q2.get("chapter", "")
-                    },
-                    "similarity": round(similarity * 100, 2)
-                })
-    
-    # Sort by similarity (highest first)
-    duplicates.sort(key=lambda x: x["similarity"], reverse=True)
-    
-    return {
-        "total_checked": len(questions),
-        "duplicates_found": len(duplicates),
-        "threshold_used": threshold,
-        "duplicates": duplicates[:50]  # Return top 50
-    }
+    """Detect duplicate questions based on text similarity
+    
+    With background=true the scan runs as a job (202 with a job id to poll at
+    /api/admin/jobs/{job_id}, whose result is this response).
+    """
+    if background:
+        job = await job_runner.submit(
+            DETECT_DUPLICATES, {"threshold": threshold, "limit": limit}, submitted_by=str(admin["_id"])
+        )
+        return accepted(job)
+    return await DuplicateService.detect(threshold, limit)
 
 
 @router.post("/merge")
@@ -121,6 +72,7 @@ async def merge_duplicate_questions(
             }
         }
     )
+    question_pools.invalidate()
     
     # Update test results to point to the kept question
     await db.test_results.update_many(
@@ -128,7 +80,9 @@ async def merge_duplicate_questions(
         {"$set": {"question_id": keep_question_id}}
     )
     
-    # Update bookmarks
+    # Update bookmarks; users who bookmarked both keep their existing one (unique index)
+    users_with_keep = await db.bookmarks.distinct("user_id", {"question_id": keep_question_id})
+    await db.bookmarks.delete_many({"question_id": delete_question_id, "user_id": {"$in": users_with_keep}})
     await db.bookmarks.update_many(
         {"question_id": delete_question_id},
         {"$set": {"question_id": keep_question_id}}
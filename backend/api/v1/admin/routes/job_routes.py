@@ -0,0 +1,58 @@
+"""
+Job Routes
+Status, cancel and retry of background jobs (core/jobs.py) submitted by
+the admin operations that run outside the request
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+
+from core.security import get_admin_user
+from core.database import get_database
+from core.jobs import job_runner, job_to_dict
+
+router = APIRouter(prefix="/jobs", tags=["admin-jobs"])
+
+@router.get("")
+async def list_jobs(
+    kind: Optional[str] = None,
+    status: Optional[str] = Query(None, regex="^(queued|running|succeeded|failed|cancelled)$"),
+    limit: int = Query(50, ge=1, le=200),
+    admin: dict = Depends(get_admin_user)
+):
+    """Most recent jobs, newest first"""
+    db = get_database()
+    query = {}
+    if kind:
+        query["kind"] = kind
+    if status:
+        query["status"] = status
+    jobs = await db.jobs.find(query, {"params": 0, "files": 0}).sort("created_at", -1).limit(limit).to_list(limit)
+    return {"jobs": [job_to_dict(job) for job in jobs]}
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, admin: dict = Depends(get_admin_user)):
+    """Status, progress and (once finished) result or error of a job"""
+    job = await job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+@router.post("/{job_id}/cancel")
+async def cancel_job(job_id: str, admin: dict = Depends(get_admin_user)):
+    """Cancel a queued job, or ask a running one to stop"""
+    job = await job_runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job)
+
+@router.post("/{job_id}/retry")
+async def retry_job(job_id: str, admin: dict = Depends(get_admin_user)):
+    """Queue a failed or cancelled job again"""
+    job = await job_runner.retry(job_id)
+    if job:
+        return job_to_dict(job)
+    current = await job_runner.get(job_id)
+    if not current:
+        raise HTTPException(status_code=404, detail="Job not found")
+    raise HTTPException(status_code=409, detail=f"Only failed or cancelled jobs can be retried (job is {current['status']})")
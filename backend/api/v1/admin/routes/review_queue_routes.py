@@ -7,29 +7,32 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Optional
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ASCENDING
 
 from core.security import get_admin_user
 from core.database import get_database
+from core.pagination import paginate
+from api.v1.tests.services.question_pool import question_pools
 
 router = APIRouter(prefix="/admin/review-queue", tags=["admin-review-queue"])
 
 @router.get("/pending")
 async def get_pending_questions(
     page: int = Query(1, ge=1),
-    limit: int = Query(20, le=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    exact_total: bool = False,
     admin: dict = Depends(get_admin_user)
 ):
-    """Get all questions pending review"""
+    """Get all questions pending review, oldest first"""
     db = get_database()
     
-    skip = (page - 1) * limit
-    
     # Find questions with status='pending_review'
-    questions = await db.questions.find(
-        {"review_status": "pending_review"}
-    ).skip(skip).limit(limit).to_list(limit)
-    
-    total = await db.questions.count_documents({"review_status": "pending_review"})
+    result = await paginate(
+        db.questions, {"review_status": "pending_review"}, "_id", ASCENDING, limit,
+        cursor=cursor, page=page, exact_total=exact_total
+    )
+    questions = result["items"]
     
     return {
         "questions": [
@@ -40,9 +43,12 @@ async def get_pending_questions(
             }
             for q in questions
         ],
-        "total": total,
-        "page": page,
-        "pages": (total + limit - 1) // limit
+        "total": result["total"],
+        "total_exact": result["total_exact"],
+        "page": result["page"],
+        "pages": result["pages"],
+        "next_cursor": result["next_cursor"],
+        "has_more": result["has_more"]
     }
 
 
@@ -75,6 +81,7 @@ async def approve_question(
             }
         }
     )
+    question_pools.invalidate()
     
     # Log audit entry
     await db.audit_logs.insert_one({
@@ -120,6 +127,7 @@ async def reject_question(
             }
         }
     )
+    question_pools.invalidate()
     
     # Log audit entry
     await db.audit_logs.insert_one({
@@ -0,0 +1,75 @@
+"""
+System Routes
+Admin routes exposing runtime telemetry for the API process
+"""
+
+from fastapi import APIRouter, Depends
+from datetime import datetime
+
+from core.security import get_admin_user, user_cache
+from core.database.mongodb import Database
+from core.database.monitoring import pool_telemetry
+from api.v1.content.services.hierarchy_cache import content_cache
+from api.v1.tests.services.question_pool import question_pools
+from api.v1.tests.services.answer_keys import answer_keys
+from core.jobs import job_runner
+
+router = APIRouter(prefix="/system", tags=["admin-system"])
+
+@router.get("/db-pool")
+async def get_db_pool_stats(admin: dict = Depends(get_admin_user)):
+    """Live MongoDB pool usage and per-command latency for the shared client"""
+    return {
+        "timestamp": datetime.utcnow().isoformat(),
+        "options": Database.pool_options(),
+        **pool_telemetry.snapshot()
+    }
+
+@router.post("/db-pool/reset")
+async def reset_db_pool_stats(admin: dict = Depends(get_admin_user)):
+    """Reset command latency counters"""
+    pool_telemetry.reset_commands()
+    return {"message": "Command latency counters reset"}
+
+@router.get("/user-cache")
+async def get_user_cache_stats(admin: dict = Depends(get_admin_user)):
+    """Hit rate and occupancy of the authenticated user cache"""
+    return user_cache.stats()
+
+@router.get("/content-cache")
+async def get_content_cache_stats(admin: dict = Depends(get_admin_user)):
+    """Versions and sizes of the cached content hierarchy"""
+    return content_cache.stats()
+
+@router.post("/content-cache/invalidate")
+async def invalidate_content_cache(admin: dict = Depends(get_admin_user)):
+    """Force a reload of every hierarchy level (e.g. after a direct database edit)"""
+    content_cache.invalidate()
+    return {"message": "Content hierarchy cache invalidated"}
+
+@router.get("/question-pools")
+async def get_question_pool_stats(admin: dict = Depends(get_admin_user)):
+    """Sizes and hit counts of the test-session question pools"""
+    return question_pools.stats()
+
+@router.post("/question-pools/invalidate")
+async def invalidate_question_pools(admin: dict = Depends(get_admin_user)):
+    """Force a reload of every question pool (e.g. after a direct database edit)"""
+    question_pools.invalidate()
+    return {"message": "Question pools invalidated"}
+
+@router.get("/answer-keys")
+async def get_answer_key_stats(admin: dict = Depends(get_admin_user)):
+    """Size and hit counts of the in-memory answer keys used for grading"""
+    return answer_keys.stats()
+
+@router.post("/answer-keys/reload")
+async def reload_answer_keys(admin: dict = Depends(get_admin_user)):
+    """Rebuild the answer keys now (e.g. after a direct database edit)"""
+    count = await answer_keys.reload()
+    return {"message": f"Answer keys reloaded ({count} questions)"}
+
+@router.get("/jobs")
+async def get_job_runner_stats(admin: dict = Depends(get_admin_user)):
+    """Background job workers of this process and the jobs they are running"""
+    return job_runner.stats()
@@ -7,9 +7,19 @@ from fastapi import APIRouter, HTTPException, Depends, Query
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import DESCENDING
 
 from core.security import get_admin_user, get_current_user
 from core.database import get_database
+from core.pagination import paginate
+from core.export import (
+    stream_export, date_range_query, test_result_row,
+    TEST_RESULT_EXPORT_FIELDS, TEST_RESULT_EXPORT_PROJECTION
+)
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
+from api.v1.questions.services.question_service import uid_conflict
+from api.v1.tests.services.answer_keys import answer_keys
+from api.v1.tests.services.question_pool import question_pools
 
 router = APIRouter(prefix="/admin", tags=["admin-version-control"])
 
@@ -144,11 +154,15 @@ async def restore_question_version(
     snapshot["updated_at"] = datetime.utcnow()
     snapshot["updated_by"] = str(admin["_id"])
     snapshot["restored_from_version"] = version_number
+    await QuestionAncestryService.stamp(snapshot)
     
-    await db.questions.update_one(
-        {"_id": obj_id},
-        {"$set": snapshot}
-    )
+    with uid_conflict():
+        await db.questions.update_one(
+            {"_id": obj_id},
+            {"$set": snapshot}
+        )
+    answer_keys.discard([obj_id])
+    question_pools.invalidate()
     
     # Log audit entry
     await db.audit_logs.insert_one({
@@ -217,7 +231,9 @@ async def compare_question_versions(
 @router.get("/audit-logs")
 async def get_audit_logs(
     page: int = Query(1, ge=1),
-    limit: int = Query(50, le=200),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    exact_total: bool = False,
     action: Optional[str] = None,
     admin_id: Optional[str] = None,
     start_date: Optional[str] = None,
@@ -253,10 +269,12 @@ async def get_audit_logs(
         except:
             pass
     
-    # Get logs
-    skip = (page - 1) * limit
-    logs = await db.audit_logs.find(filter_query).sort("timestamp", -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.audit_logs.count_documents(filter_query)
+    # Get logs, newest first
+    result = await paginate(
+        db.audit_logs, filter_query, "timestamp", DESCENDING, limit,
+        cursor=cursor, page=page, exact_total=exact_total
+    )
+    logs = result["items"]
     
     return {
         "logs": [
@@ -267,9 +285,12 @@ async def get_audit_logs(
             }
             for log in logs
         ],
-        "total": total,
-        "page": page,
-        "pages": (total + limit - 1) // limit
+        "total": result["total"],
+        "total_exact": result["total_exact"],
+        "page": result["page"],
+        "pages": result["pages"],
+        "next_cursor": result["next_cursor"],
+        "has_more": result["has_more"]
     }
 
 
@@ -454,3 +475,25 @@ async def export_analytics_data(
         "format": "json",
         "data": analytics
     }
+
+
+@router.get("/analytics/export/test-results")
+async def export_test_results(
+    format: str = Query("csv", regex="^(csv|ndjson)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    user_id: Optional[str] = None,
+    admin: dict = Depends(get_admin_user)
+):
+    """Stream every test result in a date range, newest first"""
+    db = get_database()
+    query = date_range_query("timestamp", start_date, end_date)
+    if user_id:
+        query["user_id"] = user_id
+
+    cursor = db.test_results.find(query, TEST_RESULT_EXPORT_PROJECTION).sort("timestamp", DESCENDING)
+    fields = (("user_id", "User ID"),) + TEST_RESULT_EXPORT_FIELDS
+    return stream_export(
+        cursor, format, fields, test_result_row,
+        f"test_results_{datetime.utcnow().strftime('%Y%m%d')}"
+    )
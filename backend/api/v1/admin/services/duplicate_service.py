@@ -0,0 +1,110 @@
+"""
+Duplicate Service - Pairwise text-similarity scan of the question bank
+The scan compares every pair of the loaded questions with difflib, which
+is CPU bound and quadratic, so it runs in the threadpool a block of rows
+at a time and reports progress between blocks. /admin/duplicates/detect
+runs it directly, or as a background job with background=true.
+"""
+import difflib
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from core.database import get_database
+from core.jobs import JobContext, job_runner
+
+DETECT_DUPLICATES = "admin.detect_duplicates"
+
+ROWS_PER_BLOCK = 25  # outer-loop rows compared per threadpool call
+MAX_REPORTED = 50
+
+
+def calculate_similarity(text1: str, text2: str) -> float:
+    """Calculate similarity between two texts using difflib"""
+    return difflib.SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
+
+
+def _summary(question: Dict[str, Any], text: str) -> Dict[str, Any]:
+    return {
+        "id": str(question["_id"]),
+        "text": text[:200],
+        "subject": question.get("subject", ""),
+        "chapter": question.get("chapter", "")
+    }
+
+
+def _similar_pairs(questions: List[Dict[str, Any]], start: int, stop: int, threshold: float) -> List[Dict[str, Any]]:
+    """Pairs (i, j), start <= i < stop, i < j, at or above the threshold"""
+    duplicates = []
+    for i in range(start, stop):
+        text1 = questions[i].get("text", "")
+        if not text1:
+            continue
+        for j in range(i + 1, len(questions)):
+            text2 = questions[j].get("text", "")
+            if not text2:
+                continue
+            similarity = calculate_similarity(text1, text2)
+            if similarity >= threshold:
+                duplicates.append({
+                    "question1": _summary(questions[i], text1),
+                    "question2": _summary(questions[j], text2),
+                    "similarity": round(similarity * 100, 2)
+                })
+    return duplicates
+
+
+class DuplicateService:
+    """Service for duplicate question detection"""
+
+    @staticmethod
+    async def detect(
+        threshold: float = 0.85,
+        limit: int = 100,
+        progress: Optional[Callable[[float, str], Awaitable[None]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Find pairs of active questions with similar text
+
+        Args:
+            threshold: Minimum similarity ratio (0-1)
+            limit: Questions compared (the scan is quadratic in this)
+            progress: Awaited with (percentage, message) after every block
+
+        Returns:
+            Questions checked and the most similar pairs (top MAX_REPORTED)
+        """
+        db = get_database()
+
+        # Get all active questions
+        questions = await db.questions.find(
+            {"is_active": {"$ne": False}}
+        ).limit(limit).to_list(limit)
+
+        duplicates = []
+        # Row i is compared with the n - i - 1 rows after it
+        total_pairs = max(len(questions) * (len(questions) - 1) // 2, 1)
+        compared = 0
+        for start in range(0, len(questions), ROWS_PER_BLOCK):
+            stop = min(start + ROWS_PER_BLOCK, len(questions))
+            duplicates.extend(await run_in_threadpool(_similar_pairs, questions, start, stop, threshold))
+            compared += sum(len(questions) - i - 1 for i in range(start, stop))
+            if progress:
+                await progress(100 * compared / total_pairs, f"{len(duplicates)} similar pairs found")
+
+        # Sort by similarity (highest first)
+        duplicates.sort(key=lambda x: x["similarity"], reverse=True)
+
+        return {
+            "total_checked": len(questions),
+            "duplicates_found": len(duplicates),
+            "threshold_used": threshold,
+            "duplicates": duplicates[:MAX_REPORTED]  # Return top 50
+        }
+
+
+@job_runner.handler(DETECT_DUPLICATES)
+async def detect_duplicates_job(context: JobContext) -> Dict[str, Any]:
+    async def report(percentage: float, message: str):
+        await context.progress(percentage, message, "comparing")
+    return await DuplicateService.detect(progress=report, **context.params)
@@ -0,0 +1,175 @@
+"""
+Notification Service - Push notification delivery through Expo
+The notification send endpoints queue a send as a background job; the
+job reads the recipients' push tokens with a cursor, publishes them to
+Expo 100 messages per request (the Expo limit) in the threadpool, and
+records the notification with its delivery counts when it is done.
+
+Tokens come from one of two places: users.push_token (set by
+/auth/push-token) or the push_tokens collection (set by the legacy
+/notifications/register-token), depending on the endpoint.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi.concurrency import run_in_threadpool
+
+from core.database import get_database
+from core.jobs import JobContext, JobFailed, job_runner
+
+SEND_NOTIFICATION = "notifications.send"
+
+USERS_SOURCE = "users"
+PUSH_TOKENS_SOURCE = "push_tokens"
+
+EXPO_BATCH_SIZE = 100
+EXPO_TOKEN_PREFIX = "ExponentPushToken"
+
+
+class NotificationService:
+    """Service for push notifications"""
+
+    @staticmethod
+    def recipients_query(target_users: Optional[List[str]] = None, exam_id: Optional[str] = None) -> Dict[str, Any]:
+        """Users a notification goes to: the targeted users, an exam's users, or everyone (with a push token)"""
+        query: Dict[str, Any] = {"push_token": {"$exists": True, "$ne": None}}
+        if target_users:
+            query["_id"] = {"$in": [ObjectId(uid) for uid in target_users if ObjectId.is_valid(uid)]}
+        elif exam_id:
+            query["selected_exam_id"] = exam_id
+        return query
+
+    @staticmethod
+    async def recipients(notification: Dict[str, Any], source: str = USERS_SOURCE) -> Tuple[str, Dict[str, Any], str]:
+        """
+        Where a notification's push tokens are read from
+
+        Args:
+            notification: target_users, exam_id
+            source: USERS_SOURCE or PUSH_TOKENS_SOURCE
+
+        Returns:
+            Collection name, query and token field
+        """
+        target_users = notification.get("target_users")
+        exam_id = notification.get("exam_id")
+        if source == USERS_SOURCE:
+            return "users", NotificationService.recipients_query(target_users, exam_id), "push_token"
+
+        query: Dict[str, Any] = {}
+        if target_users:
+            query["user_id"] = {"$in": target_users}
+        elif exam_id:
+            # Users who have taken a test (tests are not linked to exams)
+            query["user_id"] = {"$in": await get_database().test_results.distinct("user_id")}
+        return "push_tokens", query, "token"
+
+    @staticmethod
+    async def send(
+        notification: Dict[str, Any],
+        sent_by: Optional[str] = None,
+        source: str = USERS_SOURCE,
+        context: Optional[JobContext] = None
+    ) -> Dict[str, Any]:
+        """
+        Deliver a notification to its recipients and record it
+
+        A failed Expo request counts its batch as failed instead of stopping
+        the send, so an interrupted send is never repeated for the users who
+        already got it.
+
+        Args:
+            notification: title, body, data, target_users, exam_id
+            sent_by: Admin id
+            source: Where the push tokens are read from (see recipients)
+            context: Job context, for progress reports
+
+        Returns:
+            Sent and failed counts
+        """
+        try:
+            from exponent_server_sdk import PushClient, PushMessage
+        except ImportError:
+            raise JobFailed("Push notifications are not available")
+
+        db = get_database()
+        collection, query, token_field = await NotificationService.recipients(notification, source)
+        recipients = await db[collection].count_documents(query)
+        client = PushClient()
+        sent_count = 0
+        failed_count = 0
+        errors: List[str] = []
+
+        async def publish(messages: List[Any]):
+            nonlocal sent_count, failed_count
+            try:
+                tickets = await run_in_threadpool(client.publish_multiple, messages)
+            except Exception as e:
+                failed_count += len(messages)
+                errors.append(str(e))
+                return
+            for ticket in tickets:
+                if ticket.status == "ok":
+                    sent_count += 1
+                else:
+                    failed_count += 1
+                    errors.append(str(ticket.message))
+
+        batch = []
+        processed = 0
+        async for recipient in db[collection].find(query, {token_field: 1}):
+            processed += 1
+            push_token = recipient.get(token_field)
+            if not isinstance(push_token, str) or not push_token.startswith(EXPO_TOKEN_PREFIX):
+                continue
+            batch.append(PushMessage(
+                to=push_token,
+                title=notification["title"],
+                body=notification["body"],
+                data=notification.get("data") or {},
+                sound="default",
+                badge=1
+            ))
+            if len(batch) == EXPO_BATCH_SIZE:
+                await publish(batch)
+                batch = []
+                if context:
+                    await context.progress(100 * processed / max(recipients, 1), f"{sent_count} sent", "sending")
+        if batch:
+            await publish(batch)
+
+        now = datetime.utcnow()
+        await db.notifications.insert_one({
+            "title": notification["title"],
+            "message": notification["body"],
+            "body": notification["body"],
+            "data": notification.get("data"),
+            "target_users": notification.get("target_users"),
+            "exam_id": notification.get("exam_id"),
+            "sent_at": now,
+            "created_at": now,
+            "sent_by": sent_by,
+            "sent_count": sent_count,
+            "failed_count": failed_count,
+            "job_id": context.id if context else None
+        })
+        return {
+            "success": True,
+            "recipients": recipients,
+            "sent_count": sent_count,
+            "failed_count": failed_count,
+            "errors": errors[:20],
+            "message": f"Successfully sent {sent_count} notification(s)"
+        }
+
+
+# Not retried: a second run would notify the users the first one reached
+@job_runner.handler(SEND_NOTIFICATION, max_attempts=1)
+async def send_notification_job(context: JobContext) -> Dict[str, Any]:
+    return await NotificationService.send(
+        context.params["notification"],
+        context.job.get("submitted_by"),
+        context.params.get("source", USERS_SOURCE),
+        context
+    )
@@ -1,25 +1,26 @@
 from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, BackgroundTasks
 from typing import Dict, Any, List
 import os
-import google.generativeai as genai
-import pandas as pd
 import io
 import uuid
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
 import hashlib
 
 from api.v1.ai.models import AIRecommendationRequest
 from core.security import get_current_user, get_admin_user
 from core.database import get_database
 from api.v1.ai.services.pdf_processor import pdf_processor
+from api.v1.ai.services.gemini_client import get_model
+from api.v1.ai.services.question_generation import (
+    QuestionGenerationService, GENERATE_CSV, GENERATE_CSV_FROM_PDF
+)
+from core.jobs import job_runner, accepted
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
-# Configure Gemini AI
+# Gemini is imported and configured lazily by gemini_client on first use
 gemini_api_key = os.getenv("GEMINI_API_KEY")
-if gemini_api_key:
-    genai.configure(api_key=gemini_api_key)
 
 @router.post("/recommendations")
 async def get_ai_recommendations(request: AIRecommendationRequest, current_user: dict = Depends(get_current_user)):
@@ -35,7 +36,7 @@ async def get_ai_recommendations(request: AIRecommendationRequest, current_user:
         }
     
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = get_model('gemini-pro')
         
         prompt = f"""
         You are a personalized study advisor. Based on the student's context, provide 3-5 specific, actionable recommendations.
@@ -108,131 +109,24 @@ async def generate_questions_csv_ai(
     exam: str,
     subjects: List[str],
     questions_per_subject: int = 40,
+    background: bool = False,
     admin: dict = Depends(get_admin_user)
 ):
-    """Generate questions in CSV format using Gemini AI with tips and tricks"""
+    """Generate questions in CSV format using Gemini AI with tips and tricks
+    
+    With background=true the generation runs as a job: the response is 202 with
+    a job id to poll at /api/admin/jobs/{job_id}, whose result is this response.
+    """
     try:
         if not gemini_api_key:
             raise HTTPException(status_code=500, detail="Gemini API key not configured")
         
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
-        
-        all_questions = []
-        
-        # Subject-specific chapter mappings for realistic questions
-        subject_chapters = {
-            "Physics": ["Mechanics", "Thermodynamics", "Optics", "Electromagnetism"],
-            "Chemistry": ["Organic Chemistry", "Inorganic Chemistry", "Physical Chemistry"],
-            "Mathematics": ["Calculus", "Algebra", "Trigonometry", "Coordinate Geometry"],
-            "History": ["Ancient History", "Medieval History", "Modern History"],
-            "Geography": ["Physical Geography", "Human Geography", "Economic Geography"],
-            "Biology": ["Cell Biology", "Genetics", "Ecology", "Human Physiology"],
-            "Electrical": ["Circuit Theory", "Power Systems", "Control Systems", "Machines"],
-            "Computer Science": ["Data Structures", "Algorithms", "DBMS", "Operating Systems"],
-            "General Studies": ["Polity", "Economy", "Environment", "Current Affairs"]
-        }
-        
-        for subject in subjects:
-            chapters = subject_chapters.get(subject, ["Core Concepts", "Advanced Topics", "Applications"])
-            
-            # Distribute questions across chapters
-            questions_per_chapter = questions_per_subject // len(chapters)
-            
-            for chapter in chapters:
-                prompt = f"""
-                Generate {questions_per_chapter} competitive exam questions for {exam} - {subject} - {chapter}.
-                
-                Requirements:
-                1. Mix of difficulty: 30% Easy, 50% Medium, 20% Hard
-                2. Use previous years' question style (2018-2024)
-                3. Include SHORT explanations with TIME-SAVING TRICKS and SHORTCUTS
-                4. Add LaTeX formulas where applicable (use $...$ or $$...$$)
-                5. Each question must be realistic and exam-worthy
-                
-                Return ONLY a valid JSON array with this exact structure (no markdown, no extra text):
-                [
-                  {{
-                    "question_text": "The question text here",
-                    "option_a": "First option",
-                    "option_b": "Second option", 
-                    "option_c": "Third option",
-                    "option_d": "Fourth option",
-                    "correct_answer": "A",
-                    "difficulty": "easy",
-                    "explanation": "Short explanation with TRICK: [mention shortcut/tip]",
-                    "formula_latex": "$formula here$",
-                    "year": "2023",
-                    "topic": "Specific topic name",
-                    "tags": "tag1,tag2"
-                  }}
-                ]
-                """
-                
-                response = model.generate_content(prompt)
-                response_text = response.text.strip()
-                
-                # Clean response - remove markdown code blocks if present
-                if response_text.startswith("```"):
-                    response_text = response_text.split("```")[1]
-                    if response_text.startswith("json"):
-                        response_text = response_text[4:]
-                response_text = response_text.strip()
-                
-                try:
-                    questions_data = json.loads(response_text)
-                except json.JSONDecodeError:
-                    # Fallback: try to extract JSON array
-                    import re
-                    json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-                    if json_match:
-                        questions_data = json.loads(json_match.group())
-                    else:
-                        continue
-                
-                # Convert to 24-column format
-                for q in questions_data:
-                    question_dict = {
-                        "UID": str(uuid.uuid4()),
-                        "Exam": exam,
-                        "Year": q.get("year", "2023"),
-                        "Subject": subject,
-                        "Chapter": chapter,
-                        "Topic": q.get("topic", chapter),
-                        "QuestionType": "MCQ-SC",
-                        "QuestionText": q.get("question_text", ""),
-                        "OptionA": q.get("option_a", ""),
-                        "OptionB": q.get("option_b", ""),
-                        "OptionC": q.get("option_c", ""),
-                        "OptionD": q.get("option_d", ""),
-                        "CorrectAnswer": q.get("correct_answer", "A"),
-                        "AnswerChoicesCount": 4,
-                        "Marks": 4.0 if exam in ["JEE", "GATE"] else 2.0,
-                        "NegativeMarks": 1.0 if exam in ["JEE", "GATE"] else 0.0,
-                        "TimeLimitSeconds": 180 if q.get("difficulty") == "hard" else 120,
-                        "Difficulty": q.get("difficulty", "medium"),
-                        "Tags": q.get("tags", f"{exam},{subject}"),
-                        "FormulaLaTeX": q.get("formula_latex", ""),
-                        "ImageUploadThingURL": "",
-                        "ImageAltText": "",
-                        "Explanation": q.get("explanation", ""),
-                        "ConfidenceScore": 0.95,
-                        "SourceNotes": f"AI-generated for {exam} {subject}"
-                    }
-                    all_questions.append(question_dict)
-        
-        # Create DataFrame and CSV
-        df = pd.DataFrame(all_questions)
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_content = csv_buffer.getvalue()
+        params = {"exam": exam, "subjects": subjects, "questions_per_subject": questions_per_subject}
+        if background:
+            job = await job_runner.submit(GENERATE_CSV, params, submitted_by=str(admin.get("_id")))
+            return accepted(job)
         
-        return {
-            "success": True,
-            "exam": exam,
-            "total_questions": len(all_questions),
-            "csv_content": csv_content,
-            "message": f"Generated {len(all_questions)} questions for {exam}"
-        }
+        return await QuestionGenerationService.generate_csv(**params)
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI CSV generation failed: {str(e)}")
@@ -254,6 +148,7 @@ async def generate_questions_from_pdf(
     exam: str = "JEE",
     subject: str = "Physics",
     questions_per_chapter: int = 10,
+    background: bool = False,
     admin: dict = Depends(get_admin_user)
 ):
     """Generate questions CSV from uploaded PDF using Gemini AI
@@ -269,6 +164,9 @@ async def generate_questions_from_pdf(
     2. Extracts key concepts, topics, and answer keys from PDF
     3. Generates questions based on PDF content with tricks, tips, and logical solutions
     4. Returns CSV in 24-column format
+    
+    With background=true the PDF is stored with a job and the response is 202
+    with a job id to poll at /api/admin/jobs/{job_id} (instead of /ai/progress).
     """
     # Generate job ID for progress tracking
     job_id = str(uuid.uuid4())
@@ -286,197 +184,21 @@ async def generate_questions_from_pdf(
         if not is_valid:
             raise HTTPException(status_code=400, detail=error_message)
         
-        # Calculate file hash for caching
-        file_hash = pdf_processor.get_file_hash(pdf_content)
-        
-        # Check cache
-        pdf_processor.set_progress(job_id, "checking_cache", 20, "Checking cache for previous analysis...")
-        cached_result = pdf_processor.get_cached_result(file_hash, exam, subject)
-        
-        if cached_result:
-            pdf_processor.set_progress(job_id, "completed", 100, "Retrieved from cache")
-            cached_result["job_id"] = job_id
-            cached_result["from_cache"] = True
-            return cached_result
-        
-        # Use Gemini 1.5 Pro with PDF support
-        pdf_processor.set_progress(job_id, "analyzing_pdf", 30, "Analyzing PDF content with Gemini AI...")
-        model = genai.GenerativeModel('gemini-1.5-pro-latest')
+        params = {"exam": exam, "subject": subject, "questions_per_chapter": questions_per_chapter}
+        if background:
+            job = await job_runner.submit(
+                GENERATE_CSV_FROM_PDF, params, submitted_by=str(admin.get("_id")),
+                files={"pdf": (file.filename, io.BytesIO(pdf_content))}
+            )
+            return accepted(job)
         
-        # Upload PDF to Gemini
-        pdf_processor.set_progress(job_id, "uploading_gemini", 40, "Uploading PDF to Gemini for processing...")
-        pdf_file = genai.upload_file(io.BytesIO(pdf_content), mime_type="application/pdf")
+        async def report(step: str, percentage: float, message: str):
+            pdf_processor.set_progress(job_id, step, percentage, message)
         
-        # Step 2: Analyze PDF to extract structure and content
-        pdf_processor.set_progress(job_id, "extracting_content", 50, "Extracting chapters, concepts, and formulas...")
-        analysis_prompt = f"""
-        Analyze this PDF document thoroughly and provide:
-        
-        1. **Main Topics/Chapters**: List all major chapters or topics covered
-        2. **Key Concepts**: Important concepts, formulas, and theories per chapter
-        3. **Answer Keys**: If this PDF contains solutions or answer keys, extract them
-        4. **Difficulty Patterns**: Note the difficulty progression
-        5. **Important Tips/Tricks**: Any shortcuts, tricks, or tips mentioned
-        
-        Format your response as JSON:
-        {{
-            "chapters": [
-                {{
-                    "name": "Chapter name",
-                    "concepts": ["concept1", "concept2"],
-                    "formulas": ["formula1", "formula2"],
-                    "tips": ["tip1", "tip2"]
-                }}
-            ],
-            "exam_type": "{exam}",
-            "subject": "{subject}",
-            "answer_keys": {{}},
-            "overall_difficulty": "medium"
-        }}
-        """
-        
-        analysis_response = model.generate_content([pdf_file, analysis_prompt])
-        analysis_text = analysis_response.text.strip()
-        
-        # Clean and parse JSON
-        if analysis_text.startswith("```"):
-            analysis_text = analysis_text.split("```")[1]
-            if analysis_text.startswith("json"):
-                analysis_text = analysis_text[4:]
-        analysis_text = analysis_text.strip()
-        
-        try:
-            pdf_analysis = json.loads(analysis_text)
-        except json.JSONDecodeError:
-            # Fallback to simple extraction
-            pdf_analysis = {
-                "chapters": [{"name": "Main Content", "concepts": [], "formulas": [], "tips": []}],
-                "exam_type": exam,
-                "subject": subject,
-                "answer_keys": {},
-                "overall_difficulty": "medium"
-            }
-        
-        # Step 2: Generate questions based on PDF analysis
-        all_questions = []
-        chapters = pdf_analysis.get("chapters", [{"name": "Main Content"}])
-        
-        for chapter_info in chapters[:5]:  # Limit to 5 chapters
-            chapter_name = chapter_info.get("name", "Chapter")
-            concepts = chapter_info.get("concepts", [])
-            formulas = chapter_info.get("formulas", [])
-            tips = chapter_info.get("tips", [])
-            
-            generation_prompt = f"""
-            Based on the PDF content for Chapter: "{chapter_name}", generate {questions_per_chapter} high-quality competitive exam questions.
-            
-            **Context from PDF:**
-            - Concepts: {', '.join(concepts[:5]) if concepts else 'From chapter content'}
-            - Key Formulas: {', '.join(formulas[:3]) if formulas else 'Relevant formulas'}
-            - Tips/Tricks: {', '.join(tips[:3]) if tips else 'Include shortcuts'}
-            
-            **Requirements:**
-            1. Questions should be based ONLY on content from the PDF
-            2. Use the concepts, formulas, and topics mentioned in the PDF
-            3. If PDF has answer keys, align questions with those patterns
-            4. Mix difficulty: 30% Easy, 50% Medium, 20% Hard
-            5. Include DETAILED explanations with:
-               - TRICK: Mention time-saving shortcuts
-               - LOGIC: Explain the reasoning step-by-step
-               - TIP: Add memory aids or common mistake warnings
-            6. Use LaTeX for formulas where applicable (use $...$ or $$...$$)
-            7. Make questions realistic for {exam} exam
-            
-            Return ONLY a valid JSON array (no markdown, no extra text):
-            [
-              {{
-                "question_text": "Question based on PDF content",
-                "option_a": "Option A",
-                "option_b": "Option B", 
-                "option_c": "Option C",
-                "option_d": "Option D",
-                "correct_answer": "A",
-                "difficulty": "medium",
-                "explanation": "LOGIC: [Step by step reasoning]. TRICK: [Shortcut method]. TIP: [Common mistake to avoid]",
-                "formula_latex": "$formula$",
-                "year": "2024",
-                "topic": "Specific topic from PDF",
-                "tags": "tag1,tag2"
-              }}
-            ]
-            """
-            
-            response = model.generate_content([pdf_file, generation_prompt])
-            response_text = response.text.strip()
-            
-            # Clean response
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-            response_text = response_text.strip()
-            
-            try:
-                questions_data = json.loads(response_text)
-            except json.JSONDecodeError:
-                # Try to extract JSON array
-                import re
-                json_match = re.search(r'\[.*\]', response_text, re.DOTALL)
-                if json_match:
-                    questions_data = json.loads(json_match.group())
-                else:
-                    continue
-            
-            # Convert to 24-column format
-            for q in questions_data:
-                question_dict = {
-                    "UID": str(uuid.uuid4()),
-                    "Exam": exam,
-                    "Year": q.get("year", "2024"),
-                    "Subject": subject,
-                    "Chapter": chapter_name,
-                    "Topic": q.get("topic", chapter_name),
-                    "QuestionType": "MCQ-SC",
-                    "QuestionText": q.get("question_text", ""),
-                    "OptionA": q.get("option_a", ""),
-                    "OptionB": q.get("option_b", ""),
-                    "OptionC": q.get("option_c", ""),
-                    "OptionD": q.get("option_d", ""),
-                    "CorrectAnswer": q.get("correct_answer", "A"),
-                    "AnswerChoicesCount": 4,
-                    "Marks": 4.0 if exam in ["JEE", "GATE"] else 2.0,
-                    "NegativeMarks": 1.0 if exam in ["JEE", "GATE"] else 0.0,
-                    "TimeLimitSeconds": 180 if q.get("difficulty") == "hard" else 120,
-                    "Difficulty": q.get("difficulty", "medium"),
-                    "Tags": q.get("tags", f"{exam},{subject},{chapter_name}"),
-                    "FormulaLaTeX": q.get("formula_latex", ""),
-                    "ImageUploadThingURL": "",
-                    "ImageAltText": "",
-                    "Explanation": q.get("explanation", ""),
-                    "ConfidenceScore": 0.95,
-                    "SourceNotes": f"AI-generated from PDF for {exam} {subject} - {chapter_name}"
-                }
-                all_questions.append(question_dict)
-        
-        # Create DataFrame and CSV
-        df = pd.DataFrame(all_questions)
-        csv_buffer = io.StringIO()
-        df.to_csv(csv_buffer, index=False)
-        csv_content = csv_buffer.getvalue()
-        
-        return {
-            "success": True,
-            "exam": exam,
-            "subject": subject,
-            "total_questions": len(all_questions),
-            "chapters_processed": len(chapters),
-            "csv_content": csv_content,
-            "pdf_analysis": {
-                "chapters": [c.get("name") for c in chapters],
-                "total_concepts": sum(len(c.get("concepts", [])) for c in chapters)
-            },
-            "message": f"Generated {len(all_questions)} questions from PDF for {exam} - {subject}"
-        }
+        result = await QuestionGenerationService.generate_csv_from_pdf(pdf_content, progress=report, **params)
+        if result.get("from_cache"):
+            result["job_id"] = job_id
+        return result
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"PDF-based CSV generation failed: {str(e)}")
@@ -498,7 +220,7 @@ async def ai_generate_questions(
                 "questions": []
             }
         
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        model = get_model('gemini-2.0-flash-exp')
         
         prompt = f"""
         Generate {count} multiple-choice questions for the topic: "{topic}"
@@ -562,7 +284,7 @@ async def ai_suggest_difficulty(
                 "reasoning": "Default difficulty (API key not configured)"
             }
         
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        model = get_model('gemini-2.0-flash-exp')
         
         prompt = f"""
         Analyze this question and suggest its difficulty level:
@@ -617,7 +339,7 @@ async def ai_generate_explanation(
                 "explanation": "Explanation not available (API key not configured)"
             }
         
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        model = get_model('gemini-2.0-flash-exp')
         
         prompt = f"""
         Generate a comprehensive explanation for this question:
@@ -693,7 +415,6 @@ async def get_advanced_analytics(admin: dict = Depends(get_admin_user)):
     difficulty_stats = await db.test_results.aggregate(difficulty_pipeline).to_list(10)
     
     # Time trends - tests per day (last 7 days)
-    from datetime import datetime, timedelta
     seven_days_ago = datetime.utcnow() - timedelta(days=7)
     
     time_pipeline = [
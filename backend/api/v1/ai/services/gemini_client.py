@@ -0,0 +1,68 @@
+"""
+Gemini Client
+Wrappers around google.generativeai that count and time every outbound
+call into the Prometheus registry. The SDK is imported and configured on
+first use, not at application import.
+"""
+
+import time
+
+from core.config import settings
+from core.metrics import gemini_requests_total, gemini_request_duration_seconds
+
+_genai = None
+
+
+def get_genai():
+    """Import and configure google.generativeai once, on first use"""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+
+        if settings.GEMINI_API_KEY:
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+        _genai = genai
+    return _genai
+
+
+def _observe(model_name: str, start: float, status: str):
+    gemini_requests_total.inc(model=model_name, status=status)
+    gemini_request_duration_seconds.observe(time.perf_counter() - start, model=model_name)
+
+
+class InstrumentedModel:
+    """GenerativeModel proxy whose generate_content calls are measured"""
+
+    def __init__(self, model_name: str, **kwargs):
+        self.model_name = model_name
+        self._model = get_genai().GenerativeModel(model_name, **kwargs)
+
+    def generate_content(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self._model.generate_content(*args, **kwargs)
+        except Exception:
+            _observe(self.model_name, start, "error")
+            raise
+        _observe(self.model_name, start, "success")
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._model, name)
+
+
+def get_model(model_name: str, **kwargs) -> InstrumentedModel:
+    """Drop-in replacement for genai.GenerativeModel(model_name)"""
+    return InstrumentedModel(model_name, **kwargs)
+
+
+def upload_file(*args, **kwargs):
+    """Drop-in replacement for genai.upload_file, measured as model 'files'"""
+    start = time.perf_counter()
+    try:
+        uploaded = get_genai().upload_file(*args, **kwargs)
+    except Exception:
+        _observe("files", start, "error")
+        raise
+    _observe("files", start, "success")
+    return uploaded
@@ -0,0 +1,373 @@
+"""
+Question Generation Service - Gemini-generated question sheets
+Generates questions in the 24-column CSV format, per subject or from an
+uploaded PDF. Used by the /ai/generate-csv endpoints directly, or through
+the background job runner when they are called with background=true.
+Gemini calls are blocking, so they run in the threadpool.
+"""
+import io
+import json
+import re
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from core.config import settings
+from core.jobs import JobContext, JobFailed, job_runner
+from api.v1.ai.services.gemini_client import get_model, upload_file
+from api.v1.ai.services.pdf_processor import pdf_processor
+
+GENERATE_CSV = "ai.generate_csv"
+GENERATE_CSV_FROM_PDF = "ai.generate_csv_from_pdf"
+
+# (step, percentage, message), as pdf_processor.set_progress takes them
+Progress = Callable[[str, float, str], Awaitable[None]]
+
+# Subject-specific chapter mappings for realistic questions
+SUBJECT_CHAPTERS = {
+    "Physics": ["Mechanics", "Thermodynamics", "Optics", "Electromagnetism"],
+    "Chemistry": ["Organic Chemistry", "Inorganic Chemistry", "Physical Chemistry"],
+    "Mathematics": ["Calculus", "Algebra", "Trigonometry", "Coordinate Geometry"],
+    "History": ["Ancient History", "Medieval History", "Modern History"],
+    "Geography": ["Physical Geography", "Human Geography", "Economic Geography"],
+    "Biology": ["Cell Biology", "Genetics", "Ecology", "Human Physiology"],
+    "Electrical": ["Circuit Theory", "Power Systems", "Control Systems", "Machines"],
+    "Computer Science": ["Data Structures", "Algorithms", "DBMS", "Operating Systems"],
+    "General Studies": ["Polity", "Economy", "Environment", "Current Affairs"]
+}
+DEFAULT_CHAPTERS = ["Core Concepts", "Advanced Topics", "Applications"]
+MAX_PDF_CHAPTERS = 5
+
+
+async def _no_progress(step: str, percentage: float, message: str):
+    pass
+
+
+def _strip_code_fence(text: str) -> str:
+    """Response text without a surrounding ``` / ```json markdown block"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1]
+        if text.startswith("json"):
+            text = text[4:]
+    return text.strip()
+
+
+def _json_array(text: str) -> Optional[List[Dict[str, Any]]]:
+    """The JSON array in a response, or None if there is none"""
+    text = _strip_code_fence(text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # Fallback: try to extract JSON array
+        json_match = re.search(r'\[.*\]', text, re.DOTALL)
+        return json.loads(json_match.group()) if json_match else None
+
+
+def _sheet_row(q: Dict[str, Any], exam: str, subject: str, chapter: str, year: str, tags: str,
+               source_notes: str) -> Dict[str, Any]:
+    """A generated question in the 24-column format"""
+    return {
+        "UID": str(uuid.uuid4()),
+        "Exam": exam,
+        "Year": q.get("year", year),
+        "Subject": subject,
+        "Chapter": chapter,
+        "Topic": q.get("topic", chapter),
+        "QuestionType": "MCQ-SC",
+        "QuestionText": q.get("question_text", ""),
+        "OptionA": q.get("option_a", ""),
+        "OptionB": q.get("option_b", ""),
+        "OptionC": q.get("option_c", ""),
+        "OptionD": q.get("option_d", ""),
+        "CorrectAnswer": q.get("correct_answer", "A"),
+        "AnswerChoicesCount": 4,
+        "Marks": 4.0 if exam in ["JEE", "GATE"] else 2.0,
+        "NegativeMarks": 1.0 if exam in ["JEE", "GATE"] else 0.0,
+        "TimeLimitSeconds": 180 if q.get("difficulty") == "hard" else 120,
+        "Difficulty": q.get("difficulty", "medium"),
+        "Tags": q.get("tags", tags),
+        "FormulaLaTeX": q.get("formula_latex", ""),
+        "ImageUploadThingURL": "",
+        "ImageAltText": "",
+        "Explanation": q.get("explanation", ""),
+        "ConfidenceScore": 0.95,
+        "SourceNotes": source_notes
+    }
+
+
+def _to_csv(rows: List[Dict[str, Any]]) -> str:
+    import pandas as pd
+    csv_buffer = io.StringIO()
+    pd.DataFrame(rows).to_csv(csv_buffer, index=False)
+    return csv_buffer.getvalue()
+
+
+class QuestionGenerationService:
+    """Service generating question sheets with Gemini"""
+
+    @staticmethod
+    async def generate_csv(
+        exam: str,
+        subjects: List[str],
+        questions_per_subject: int = 40,
+        progress: Progress = _no_progress
+    ) -> Dict[str, Any]:
+        """
+        Generate questions per subject, spread over the subject's chapters
+
+        Args:
+            exam: Exam name (JEE, NEET, GATE, ...)
+            subjects: Subjects to generate for
+            questions_per_subject: Questions per subject
+            progress: Awaited as each chapter starts
+
+        Returns:
+            The CSV (24-column format) and question count
+        """
+        model = await run_in_threadpool(get_model, 'gemini-2.0-flash-exp')
+        all_questions = []
+        plan = [(subject, chapter) for subject in subjects for chapter in SUBJECT_CHAPTERS.get(subject, DEFAULT_CHAPTERS)]
+
+        for done, (subject, chapter) in enumerate(plan):
+            await progress("generating", 100 * done / len(plan), f"Generating {subject} - {chapter}...")
+            # Distribute questions across chapters
+            questions_per_chapter = questions_per_subject // len(SUBJECT_CHAPTERS.get(subject, DEFAULT_CHAPTERS))
+            prompt = f"""
+            Generate {questions_per_chapter} competitive exam questions for {exam} - {subject} - {chapter}.
+
+            Requirements:
+            1. Mix of difficulty: 30% Easy, 50% Medium, 20% Hard
+            2. Use previous years' question style (2018-2024)
+            3. Include SHORT explanations with TIME-SAVING TRICKS and SHORTCUTS
+            4. Add LaTeX formulas where applicable (use $...$ or $$...$$)
+            5. Each question must be realistic and exam-worthy
+
+            Return ONLY a valid JSON array with this exact structure (no markdown, no extra text):
+            [
+              {{
+                "question_text": "The question text here",
+                "option_a": "First option",
+                "option_b": "Second option",
+                "option_c": "Third option",
+                "option_d": "Fourth option",
+                "correct_answer": "A",
+                "difficulty": "easy",
+                "explanation": "Short explanation with TRICK: [mention shortcut/tip]",
+                "formula_latex": "$formula here$",
+                "year": "2023",
+                "topic": "Specific topic name",
+                "tags": "tag1,tag2"
+              }}
+            ]
+            """
+
+            response = await run_in_threadpool(model.generate_content, prompt)
+            questions_data = _json_array(response.text)
+            if questions_data is None:
+                continue
+
+            # Convert to 24-column format
+            all_questions.extend(
+                _sheet_row(q, exam, subject, chapter, "2023", f"{exam},{subject}", f"AI-generated for {exam} {subject}")
+                for q in questions_data
+            )
+
+        return {
+            "success": True,
+            "exam": exam,
+            "total_questions": len(all_questions),
+            "csv_content": await run_in_threadpool(_to_csv, all_questions),
+            "message": f"Generated {len(all_questions)} questions for {exam}"
+        }
+
+    @staticmethod
+    async def generate_csv_from_pdf(
+        pdf_content: bytes,
+        exam: str = "JEE",
+        subject: str = "Physics",
+        questions_per_chapter: int = 10,
+        progress: Progress = _no_progress
+    ) -> Dict[str, Any]:
+        """
+        Generate questions from the content of a (validated) PDF
+
+        Args:
+            pdf_content: PDF bytes (pdf_processor.validate_file already passed)
+            exam: Exam name
+            subject: Subject of the PDF
+            questions_per_chapter: Questions per chapter found in the PDF
+            progress: Awaited at every step
+
+        Returns:
+            The CSV (24-column format), question count and PDF analysis summary
+            (a cached result for the same PDF has from_cache set)
+        """
+        # Calculate file hash for caching
+        file_hash = pdf_processor.get_file_hash(pdf_content)
+
+        # Check cache
+        await progress("checking_cache", 20, "Checking cache for previous analysis...")
+        cached_result = pdf_processor.get_cached_result(file_hash, exam, subject)
+        if cached_result:
+            await progress("completed", 100, "Retrieved from cache")
+            cached_result["from_cache"] = True
+            return cached_result
+
+        # Use Gemini 1.5 Pro with PDF support
+        await progress("analyzing_pdf", 30, "Analyzing PDF content with Gemini AI...")
+        model = await run_in_threadpool(get_model, 'gemini-1.5-pro-latest')
+
+        # Upload PDF to Gemini
+        await progress("uploading_gemini", 40, "Uploading PDF to Gemini for processing...")
+        pdf_file = await run_in_threadpool(upload_file, io.BytesIO(pdf_content), mime_type="application/pdf")
+
+        # Step 1: Analyze PDF to extract structure and content
+        await progress("extracting_content", 50, "Extracting chapters, concepts, and formulas...")
+        analysis_prompt = f"""
+        Analyze this PDF document thoroughly and provide:
+
+        1. **Main Topics/Chapters**: List all major chapters or topics covered
+        2. **Key Concepts**: Important concepts, formulas, and theories per chapter
+        3. **Answer Keys**: If this PDF contains solutions or answer keys, extract them
+        4. **Difficulty Patterns**: Note the difficulty progression
+        5. **Important Tips/Tricks**: Any shortcuts, tricks, or tips mentioned
+
+        Format your response as JSON:
+        {{
+            "chapters": [
+                {{
+                    "name": "Chapter name",
+                    "concepts": ["concept1", "concept2"],
+                    "formulas": ["formula1", "formula2"],
+                    "tips": ["tip1", "tip2"]
+                }}
+            ],
+            "exam_type": "{exam}",
+            "subject": "{subject}",
+            "answer_keys": {{}},
+            "overall_difficulty": "medium"
+        }}
+        """
+
+        analysis_response = await run_in_threadpool(model.generate_content, [pdf_file, analysis_prompt])
+        try:
+            pdf_analysis = json.loads(_strip_code_fence(analysis_response.text))
+        except json.JSONDecodeError:
+            # Fallback to simple extraction
+            pdf_analysis = {
+                "chapters": [{"name": "Main Content", "concepts": [], "formulas": [], "tips": []}],
+                "exam_type": exam,
+                "subject": subject,
+                "answer_keys": {},
+                "overall_difficulty": "medium"
+            }
+
+        # Step 2: Generate questions based on PDF analysis
+        all_questions = []
+        chapters = pdf_analysis.get("chapters", [{"name": "Main Content"}])
+        selected = chapters[:MAX_PDF_CHAPTERS]
+
+        for done, chapter_info in enumerate(selected):
+            chapter_name = chapter_info.get("name", "Chapter")
+            concepts = chapter_info.get("concepts", [])
+            formulas = chapter_info.get("formulas", [])
+            tips = chapter_info.get("tips", [])
+            await progress("generating", 60 + 35 * done / len(selected), f"Generating questions for {chapter_name}...")
+
+            generation_prompt = f"""
+            Based on the PDF content for Chapter: "{chapter_name}", generate {questions_per_chapter} high-quality competitive exam questions.
+
+            **Context from PDF:**
+            - Concepts: {', '.join(concepts[:5]) if concepts else 'From chapter content'}
+            - Key Formulas: {', '.join(formulas[:3]) if formulas else 'Relevant formulas'}
+            - Tips/Tricks: {', '.join(tips[:3]) if tips else 'Include shortcuts'}
+
+            **Requirements:**
+            1. Questions should be based ONLY on content from the PDF
+            2. Use the concepts, formulas, and topics mentioned in the PDF
+            3. If PDF has answer keys, align questions with those patterns
+            4. Mix difficulty: 30% Easy, 50% Medium, 20% Hard
+            5. Include DETAILED explanations with:
+               - TRICK: Mention time-saving shortcuts
+               - LOGIC: Explain the reasoning step-by-step
+               - TIP: Add memory aids or common mistake warnings
+            6. Use LaTeX for formulas where applicable (use $...$ or $$...$$)
+            7. Make questions realistic for {exam} exam
+
+            Return ONLY a valid JSON array (no markdown, no extra text):
+            [
+              {{
+                "question_text": "Question based on PDF content",
+                "option_a": "Option A",
+                "option_b": "Option B",
+                "option_c": "Option C",
+                "option_d": "Option D",
+                "correct_answer": "A",
+                "difficulty": "medium",
+                "explanation": "LOGIC: [Step by step reasoning]. TRICK: [Shortcut method]. TIP: [Common mistake to avoid]",
+                "formula_latex": "$formula$",
+                "year": "2024",
+                "topic": "Specific topic from PDF",
+                "tags": "tag1,tag2"
+              }}
+            ]
+            """
+
+            response = await run_in_threadpool(model.generate_content, [pdf_file, generation_prompt])
+            questions_data = _json_array(response.text)
+            if questions_data is None:
+                continue
+
+            # Convert to 24-column format
+            all_questions.extend(
+                _sheet_row(
+                    q, exam, subject, chapter_name, "2024", f"{exam},{subject},{chapter_name}",
+                    f"AI-generated from PDF for {exam} {subject} - {chapter_name}"
+                )
+                for q in questions_data
+            )
+
+        return {
+            "success": True,
+            "exam": exam,
+            "subject": subject,
+            "total_questions": len(all_questions),
+            "chapters_processed": len(chapters),
+            "csv_content": await run_in_threadpool(_to_csv, all_questions),
+            "pdf_analysis": {
+                "chapters": [c.get("name") for c in chapters],
+                "total_concepts": sum(len(c.get("concepts", [])) for c in chapters)
+            },
+            "message": f"Generated {len(all_questions)} questions from PDF for {exam} - {subject}"
+        }
+
+
+# ==================== BACKGROUND JOBS ====================
+
+def _job_progress(context: JobContext) -> Progress:
+    async def report(step: str, percentage: float, message: str):
+        await context.progress(percentage, message, step)
+    return report
+
+
+@job_runner.handler(GENERATE_CSV)
+async def generate_csv_job(context: JobContext) -> Dict[str, Any]:
+    if not settings.GEMINI_API_KEY:
+        raise JobFailed("Gemini API key not configured")
+    return await QuestionGenerationService.generate_csv(progress=_job_progress(context), **context.params)
+
+
+@job_runner.handler(GENERATE_CSV_FROM_PDF)
+async def generate_csv_from_pdf_job(context: JobContext) -> Dict[str, Any]:
+    if not settings.GEMINI_API_KEY:
+        raise JobFailed("Gemini API key not configured")
+    pdf = await context.open_file("pdf")
+    try:
+        pdf_content = pdf.read()
+    finally:
+        pdf.close()
+    return await QuestionGenerationService.generate_csv_from_pdf(
+        pdf_content, progress=_job_progress(context), **context.params
+    )
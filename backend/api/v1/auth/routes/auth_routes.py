@@ -3,7 +3,7 @@ from datetime import datetime
 from bson import ObjectId
 
 from api.v1.auth.models import UserCreate, UserLogin, UserResponse, Token, PushTokenUpdate
-from core.security import get_password_hash, verify_password, create_access_token, get_current_user
+from core.security import get_password_hash_async, verify_password_async, create_access_token, get_current_user, user_cache
 from core.database import get_database
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
@@ -19,7 +19,7 @@ async def signup(user: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_dict = {
         "email": user.email,
         "password": hashed_password,
@@ -49,7 +49,7 @@ async def login(credentials: UserLogin):
     """Login user"""
     db = get_database()
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password_async(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     
     access_token = create_access_token({"sub": str(user["_id"])})
@@ -86,4 +86,5 @@ async def update_push_token(
         {"_id": current_user["_id"]},
         {"$set": {"push_token": token_data.push_token}}
     )
+    user_cache.invalidate(current_user["_id"])
     return {"success": True, "message": "Push token updated"}
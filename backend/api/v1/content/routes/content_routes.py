@@ -14,6 +14,8 @@ from api.v1.content.models import (
 )
 from core.security import get_current_user, get_admin_user
 from core.database import get_database
+from api.v1.content.services.hierarchy_cache import content_cache
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
 
 router = APIRouter(prefix="/content", tags=["content"])
 
@@ -29,6 +31,7 @@ async def create_exam(exam: ExamCreate, admin: dict = Depends(get_admin_user)):
         "created_at": datetime.utcnow()
     }
     result = await db.exams.insert_one(exam_dict)
+    content_cache.invalidate("exams")
     exam_dict["_id"] = result.inserted_id
     
     return ExamResponse(
@@ -48,8 +51,7 @@ async def get_exams_admin(admin: dict = Depends(get_admin_user)):
 @router.get("/exams", response_model=List[ExamResponse])
 async def get_exams_public():
     """Get all exams (Public)"""
-    db = get_database()
-    exams = await db.exams.find().to_list(length=1000)
+    exams = await content_cache.list("exams")
     return [ExamResponse(id=str(e["_id"]), name=e["name"], description=e["description"], created_at=e["created_at"]) for e in exams]
 
 @router.put("/admin/exams/{exam_id}", response_model=ExamResponse)
@@ -60,6 +62,7 @@ async def update_exam(exam_id: str, exam: ExamCreate, admin: dict = Depends(get_
         {"_id": ObjectId(exam_id)},
         {"$set": {"name": exam.name, "description": exam.description}}
     )
+    content_cache.invalidate("exams")
     updated_exam = await db.exams.find_one({"_id": ObjectId(exam_id)})
     return ExamResponse(
         id=str(updated_exam["_id"]),
@@ -73,6 +76,8 @@ async def delete_exam(exam_id: str, admin: dict = Depends(get_admin_user)):
     """Delete an exam (Admin only)"""
     db = get_database()
     await db.exams.delete_one({"_id": ObjectId(exam_id)})
+    content_cache.invalidate("exams")
+    await QuestionAncestryService.refresh_in_background("exams", exam_id)
     return {"success": True, "message": "Exam deleted"}
 
 # ==================== SUBJECT ROUTES ====================
@@ -88,6 +93,7 @@ async def create_subject(subject: SubjectCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.subjects.insert_one(subject_dict)
+    content_cache.invalidate("subjects")
     subject_dict["_id"] = result.inserted_id
     
     return SubjectResponse(
@@ -109,19 +115,20 @@ async def get_subjects_admin(exam_id: Optional[str] = None, admin: dict = Depend
 @router.get("/subjects", response_model=List[SubjectResponse])
 async def get_subjects_public(exam_id: Optional[str] = None):
     """Get subjects (Public)"""
-    db = get_database()
-    query = {"exam_id": exam_id} if exam_id else {}
-    subjects = await db.subjects.find(query).to_list(length=1000)
+    subjects = await content_cache.list("subjects", exam_id)
     return [SubjectResponse(id=str(s["_id"]), exam_id=s["exam_id"], name=s["name"], description=s["description"], created_at=s["created_at"]) for s in subjects]
 
 @router.put("/admin/subjects/{subject_id}", response_model=SubjectResponse)
 async def update_subject(subject_id: str, subject: SubjectCreate, admin: dict = Depends(get_admin_user)):
     """Update a subject (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("subjects", subject_id)
     await db.subjects.update_one(
         {"_id": ObjectId(subject_id)},
         {"$set": {"exam_id": subject.exam_id, "name": subject.name, "description": subject.description}}
     )
+    content_cache.invalidate("subjects")
+    await QuestionAncestryService.refresh_if_moved("subjects", subject_id, previous_parent, subject.exam_id)
     updated_subject = await db.subjects.find_one({"_id": ObjectId(subject_id)})
     return SubjectResponse(
         id=str(updated_subject["_id"]),
@@ -136,6 +143,8 @@ async def delete_subject(subject_id: str, admin: dict = Depends(get_admin_user))
     """Delete a subject (Admin only)"""
     db = get_database()
     await db.subjects.delete_one({"_id": ObjectId(subject_id)})
+    content_cache.invalidate("subjects")
+    await QuestionAncestryService.refresh_in_background("subjects", subject_id)
     return {"success": True, "message": "Subject deleted"}
 
 # ==================== CHAPTER ROUTES ====================
@@ -149,6 +158,7 @@ async def create_chapter(chapter: ChapterCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.chapters.insert_one(chapter_dict)
+    content_cache.invalidate("chapters")
     chapter_dict["_id"] = result.inserted_id
     
     return ChapterResponse(
@@ -176,9 +186,7 @@ async def get_chapters_admin(subject_id: Optional[str] = None, admin: dict = Dep
 @router.get("/chapters", response_model=List[ChapterResponse])
 async def get_chapters_public(subject_id: Optional[str] = None):
     """Get chapters (Public)"""
-    db = get_database()
-    query = {"subject_id": subject_id} if subject_id else {}
-    chapters = await db.chapters.find(query).to_list(1000)
+    chapters = await content_cache.list("chapters", subject_id)
     return [ChapterResponse(
         id=str(chapter["_id"]),
         subject_id=chapter["subject_id"],
@@ -191,10 +199,13 @@ async def get_chapters_public(subject_id: Optional[str] = None):
 async def update_chapter(chapter_id: str, chapter: ChapterCreate, admin: dict = Depends(get_admin_user)):
     """Update a chapter (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("chapters", chapter_id)
     result = await db.chapters.update_one(
         {"_id": ObjectId(chapter_id)},
         {"$set": chapter.dict()}
     )
+    content_cache.invalidate("chapters")
+    await QuestionAncestryService.refresh_if_moved("chapters", chapter_id, previous_parent, chapter.subject_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Chapter not found")
     
@@ -212,6 +223,8 @@ async def delete_chapter(chapter_id: str, admin: dict = Depends(get_admin_user))
     """Delete a chapter (Admin only)"""
     db = get_database()
     result = await db.chapters.delete_one({"_id": ObjectId(chapter_id)})
+    content_cache.invalidate("chapters")
+    await QuestionAncestryService.refresh_in_background("chapters", chapter_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Chapter not found")
     return {"message": "Chapter deleted successfully"}
@@ -227,6 +240,7 @@ async def create_topic(topic: TopicCreate, admin: dict = Depends(get_admin_user)
         "created_at": datetime.utcnow()
     }
     result = await db.topics.insert_one(topic_dict)
+    content_cache.invalidate("topics")
     topic_dict["_id"] = result.inserted_id
     
     return TopicResponse(
@@ -254,9 +268,7 @@ async def get_topics_admin(chapter_id: Optional[str] = None, admin: dict = Depen
 @router.get("/topics", response_model=List[TopicResponse])
 async def get_topics_public(chapter_id: Optional[str] = None):
     """Get topics (Public)"""
-    db = get_database()
-    query = {"chapter_id": chapter_id} if chapter_id else {}
-    topics = await db.topics.find(query).to_list(1000)
+    topics = await content_cache.list("topics", chapter_id)
     return [TopicResponse(
         id=str(topic["_id"]),
         chapter_id=topic["chapter_id"],
@@ -269,10 +281,13 @@ async def get_topics_public(chapter_id: Optional[str] = None):
 async def update_topic(topic_id: str, topic: TopicCreate, admin: dict = Depends(get_admin_user)):
     """Update a topic (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("topics", topic_id)
     result = await db.topics.update_one(
         {"_id": ObjectId(topic_id)},
         {"$set": topic.dict()}
     )
+    content_cache.invalidate("topics")
+    await QuestionAncestryService.refresh_if_moved("topics", topic_id, previous_parent, topic.chapter_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Topic not found")
     
@@ -290,6 +305,8 @@ async def delete_topic(topic_id: str, admin: dict = Depends(get_admin_user)):
     """Delete a topic (Admin only)"""
     db = get_database()
     result = await db.topics.delete_one({"_id": ObjectId(topic_id)})
+    content_cache.invalidate("topics")
+    await QuestionAncestryService.refresh_in_background("topics", topic_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Topic not found")
     return {"message": "Topic deleted successfully"}
@@ -305,6 +322,7 @@ async def create_sub_topic(sub_topic: SubTopicCreate, admin: dict = Depends(get_
         "created_at": datetime.utcnow()
     }
     result = await db.sub_topics.insert_one(sub_topic_dict)
+    content_cache.invalidate("sub_topics")
     sub_topic_dict["_id"] = result.inserted_id
     
     return SubTopicResponse(
@@ -332,9 +350,7 @@ async def get_sub_topics_admin(topic_id: Optional[str] = None, admin: dict = Dep
 @router.get("/sub-topics", response_model=List[SubTopicResponse])
 async def get_sub_topics_public(topic_id: Optional[str] = None):
     """Get sub-topics (Public)"""
-    db = get_database()
-    query = {"topic_id": topic_id} if topic_id else {}
-    sub_topics = await db.sub_topics.find(query).to_list(1000)
+    sub_topics = await content_cache.list("sub_topics", topic_id)
     return [SubTopicResponse(
         id=str(st["_id"]),
         topic_id=st["topic_id"],
@@ -347,10 +363,13 @@ async def get_sub_topics_public(topic_id: Optional[str] = None):
 async def update_sub_topic(sub_topic_id: str, sub_topic: SubTopicCreate, admin: dict = Depends(get_admin_user)):
     """Update a sub-topic (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("sub_topics", sub_topic_id)
     result = await db.sub_topics.update_one(
         {"_id": ObjectId(sub_topic_id)},
         {"$set": sub_topic.dict()}
     )
+    content_cache.invalidate("sub_topics")
+    await QuestionAncestryService.refresh_if_moved("sub_topics", sub_topic_id, previous_parent, sub_topic.topic_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Sub-topic not found")
     
@@ -368,6 +387,8 @@ async def delete_sub_topic(sub_topic_id: str, admin: dict = Depends(get_admin_us
     """Delete a sub-topic (Admin only)"""
     db = get_database()
     result = await db.sub_topics.delete_one({"_id": ObjectId(sub_topic_id)})
+    content_cache.invalidate("sub_topics")
+    await QuestionAncestryService.refresh_in_background("sub_topics", sub_topic_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Sub-topic not found")
     return {"message": "Sub-topic deleted successfully"}
@@ -383,6 +404,7 @@ async def create_section(section: SectionCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.sections.insert_one(section_dict)
+    content_cache.invalidate("sections")
     section_dict["_id"] = result.inserted_id
     
     return SectionResponse(
@@ -410,9 +432,7 @@ async def get_sections_admin(sub_topic_id: Optional[str] = None, admin: dict = D
 @router.get("/sections", response_model=List[SectionResponse])
 async def get_sections_public(sub_topic_id: Optional[str] = None):
     """Get sections (Public)"""
-    db = get_database()
-    query = {"sub_topic_id": sub_topic_id} if sub_topic_id else {}
-    sections = await db.sections.find(query).to_list(1000)
+    sections = await content_cache.list("sections", sub_topic_id)
     return [SectionResponse(
         id=str(s["_id"]),
         sub_topic_id=s["sub_topic_id"],
@@ -425,10 +445,13 @@ async def get_sections_public(sub_topic_id: Optional[str] = None):
 async def update_section(section_id: str, section: SectionCreate, admin: dict = Depends(get_admin_user)):
     """Update a section (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("sections", section_id)
     result = await db.sections.update_one(
         {"_id": ObjectId(section_id)},
         {"$set": section.dict()}
     )
+    content_cache.invalidate("sections")
+    await QuestionAncestryService.refresh_if_moved("sections", section_id, previous_parent, section.sub_topic_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Section not found")
     
@@ -446,6 +469,8 @@ async def delete_section(section_id: str, admin: dict = Depends(get_admin_user))
     """Delete a section (Admin only)"""
     db = get_database()
     result = await db.sections.delete_one({"_id": ObjectId(section_id)})
+    content_cache.invalidate("sections")
+    await QuestionAncestryService.refresh_in_background("sections", section_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Section not found")
     return {"message": "Section deleted successfully"}
@@ -461,6 +486,7 @@ async def create_sub_section(sub_section: SubSectionCreate, admin: dict = Depend
         "created_at": datetime.utcnow()
     }
     result = await db.sub_sections.insert_one(sub_section_dict)
+    content_cache.invalidate("sub_sections")
     sub_section_dict["_id"] = result.inserted_id
     
     return SubSectionResponse(
@@ -488,9 +514,7 @@ async def get_sub_sections_admin(section_id: Optional[str] = None, admin: dict =
 @router.get("/sub-sections", response_model=List[SubSectionResponse])
 async def get_sub_sections_public(section_id: Optional[str] = None):
     """Get sub-sections (Public)"""
-    db = get_database()
-    query = {"section_id": section_id} if section_id else {}
-    sub_sections = await db.sub_sections.find(query).to_list(1000)
+    sub_sections = await content_cache.list("sub_sections", section_id)
     return [SubSectionResponse(
         id=str(ss["_id"]),
         section_id=ss["section_id"],
@@ -503,10 +527,15 @@ async def get_sub_sections_public(section_id: Optional[str] = None):
 async def update_sub_section(sub_section_id: str, sub_section: SubSectionCreate, admin: dict = Depends(get_admin_user)):
     """Update a sub-section (Admin only)"""
     db = get_database()
+    previous_parent = await QuestionAncestryService.parent_of("sub_sections", sub_section_id)
     result = await db.sub_sections.update_one(
         {"_id": ObjectId(sub_section_id)},
         {"$set": sub_section.dict()}
     )
+    content_cache.invalidate("sub_sections")
+    await QuestionAncestryService.refresh_if_moved(
+        "sub_sections", sub_section_id, previous_parent, sub_section.section_id
+    )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Sub-section not found")
     
@@ -524,6 +553,8 @@ async def delete_sub_section(sub_section_id: str, admin: dict = Depends(get_admi
     """Delete a sub-section (Admin only)"""
     db = get_database()
     result = await db.sub_sections.delete_one({"_id": ObjectId(sub_section_id)})
+    content_cache.invalidate("sub_sections")
+    await QuestionAncestryService.refresh_in_background("sub_sections", sub_section_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Sub-section not found")
     return {"message": "Sub-section deleted successfully"}
@@ -8,6 +8,8 @@ from bson import ObjectId
 from fastapi import HTTPException
 
 from core.database import get_database
+from api.v1.content.services.hierarchy_cache import PARENT_FIELDS, content_cache
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
 
 
 class ContentService:
@@ -34,6 +36,7 @@ class ContentService:
         }
         
         result = await collection.insert_one(entity_dict)
+        content_cache.invalidate(collection_name)
         entity_dict["_id"] = result.inserted_id
         
         return entity_dict
@@ -99,10 +102,15 @@ class ContentService:
         db = get_database()
         collection = getattr(db, collection_name)
         
+        previous_parent = await QuestionAncestryService.parent_of(collection_name, entity_id)
         result = await collection.update_one(
             {"_id": ObjectId(entity_id)},
             {"$set": update_data}
         )
+        content_cache.invalidate(collection_name)
+        await QuestionAncestryService.refresh_if_moved(
+            collection_name, entity_id, previous_parent, update_data.get(PARENT_FIELDS.get(collection_name))
+        )
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail=f"{collection_name.capitalize()} not found")
@@ -129,6 +137,8 @@ class ContentService:
         collection = getattr(db, collection_name)
         
         result = await collection.delete_one({"_id": ObjectId(entity_id)})
+        content_cache.invalidate(collection_name)
+        await QuestionAncestryService.refresh_in_background(collection_name, entity_id)
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail=f"{collection_name.capitalize()} not found")
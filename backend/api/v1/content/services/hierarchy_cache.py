@@ -0,0 +1,157 @@
+"""
+Content Hierarchy Cache - Process-local snapshot of the seven content levels
+Exam -> Subject -> Chapter -> Topic -> SubTopic -> Section -> SubSection,
+indexed by id and by parent id so tree walks are served from memory
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional
+
+from core.config import settings
+from core.database import get_database
+
+# Collection -> field referencing the parent level (None for the root)
+HIERARCHY_LEVELS = (
+    ("exams", None),
+    ("subjects", "exam_id"),
+    ("chapters", "subject_id"),
+    ("topics", "chapter_id"),
+    ("sub_topics", "topic_id"),
+    ("sections", "sub_topic_id"),
+    ("sub_sections", "section_id"),
+)
+PARENT_FIELDS = dict(HIERARCHY_LEVELS)
+PARENT_COLLECTIONS = {
+    child: parent for (parent, _), (child, _) in zip(HIERARCHY_LEVELS, HIERARCHY_LEVELS[1:])
+}
+
+
+class ContentHierarchyCache:
+    """
+    Versioned in-memory copy of the content hierarchy
+
+    Every write bumps the version of its collection (after the write has
+    completed); the next read reloads only stale collections. A reload that
+    races with a write keeps the older version number, so it is reloaded
+    again on the following read. Documents are shared, treat them as read-only.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._versions: Dict[str, int] = {name: 0 for name, _ in HIERARCHY_LEVELS}
+        self._loaded: Dict[str, Dict[str, Any]] = {}
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.reloads = 0
+
+    def invalidate(self, collection_name: Optional[str] = None):
+        """Mark one collection (or the whole hierarchy) as stale"""
+        names = [collection_name] if collection_name else list(self._versions)
+        for name in names:
+            if name in self._versions:
+                self._versions[name] += 1
+
+    def _is_stale(self, name: str) -> bool:
+        snapshot = self._loaded.get(name)
+        return (
+            snapshot is None
+            or snapshot["version"] != self._versions[name]
+            or time.monotonic() - snapshot["loaded_at"] > self.ttl_seconds
+        )
+
+    async def _load(self, name: str):
+        version = self._versions[name]
+        docs = await get_database()[name].find().to_list(None)
+
+        by_id: Dict[str, Dict[str, Any]] = {}
+        by_parent: Dict[str, List[Dict[str, Any]]] = {}
+        parent_field = PARENT_FIELDS[name]
+        for doc in docs:
+            by_id[str(doc["_id"])] = doc
+            if parent_field:
+                by_parent.setdefault(doc.get(parent_field), []).append(doc)
+
+        self._loaded[name] = {
+            "version": version,
+            "loaded_at": time.monotonic(),
+            "docs": docs,
+            "by_id": by_id,
+            "by_parent": by_parent
+        }
+        self.reloads += 1
+
+    async def _snapshot(self, name: str) -> Dict[str, Any]:
+        if name not in PARENT_FIELDS:
+            raise KeyError(f"{name} is not a content hierarchy collection")
+        if self._is_stale(name):
+            async with self._lock:
+                if self._is_stale(name):
+                    await self._load(name)
+        else:
+            self.hits += 1
+        return self._loaded[name]
+
+    async def list(self, collection_name: str, parent_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        List documents of a level, optionally only the children of a parent
+
+        Args:
+            collection_name: Hierarchy collection (e.g. "chapters")
+            parent_id: Id of the parent entity; empty/None lists the whole level
+
+        Returns:
+            Cached documents in natural (insertion) order
+        """
+        snapshot = await self._snapshot(collection_name)
+        if not parent_id:
+            return snapshot["docs"]
+        return snapshot["by_parent"].get(parent_id, [])
+
+    async def get(self, collection_name: str, entity_id: Any) -> Optional[Dict[str, Any]]:
+        """Get a single cached document by id"""
+        if not entity_id:
+            return None
+        snapshot = await self._snapshot(collection_name)
+        return snapshot["by_id"].get(str(entity_id))
+
+    async def ancestors(self, collection_name: str, entity_id: Any) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve an entity and every ancestor up to its exam
+
+        Args:
+            collection_name: Hierarchy collection of the entity
+            entity_id: Entity id
+
+        Returns:
+            Collection name -> document, for the entity and each ancestor found
+        """
+        chain: Dict[str, Dict[str, Any]] = {}
+        name: Optional[str] = collection_name
+        current = await self.get(name, entity_id)
+        while current is not None:
+            chain[name] = current
+            parent_field = PARENT_FIELDS[name]
+            name = PARENT_COLLECTIONS.get(name)
+            if not name:
+                break
+            current = await self.get(name, current.get(parent_field))
+        return chain
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "reloads": self.reloads,
+            "collections": {
+                name: {
+                    "version": self._versions[name],
+                    "loaded_version": self._loaded[name]["version"] if name in self._loaded else None,
+                    "documents": len(self._loaded[name]["docs"]) if name in self._loaded else 0
+                }
+                for name, _ in HIERARCHY_LEVELS
+            }
+        }
+
+
+# Global instance
+content_cache = ContentHierarchyCache(ttl_seconds=settings.CONTENT_CACHE_TTL_SECONDS)
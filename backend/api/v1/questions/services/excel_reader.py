@@ -0,0 +1,168 @@
+"""
+Excel Reader - Streaming conversion of uploaded workbooks to CSV
+pandas.read_excel opens a workbook with openpyxl in normal mode, which
+builds a Cell object for every cell of the sheet before the first row is
+used. Here every worksheet is read by the parser of openpyxl's
+read-only mode, which streams the sheet XML and yields plain values, and
+is written to a CSV file as it is read; the CSV files then go through the
+same chunked path as a CSV upload (QuestionUploadService.upload_excel).
+
+Sheets are converted in parallel by a process pool, since the XML parsing
+is CPU bound and holds the GIL. The pool is created for one workbook and
+uses the spawn start method: workers start without the API process's
+threads and sockets, and the memory a large workbook took is given back
+when they exit.
+
+Imports openpyxl, so import this module inside the upload functions.
+"""
+import asyncio
+import csv
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple
+
+from fastapi.concurrency import run_in_threadpool
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.styles.stylesheet import apply_stylesheet
+from openpyxl.utils.exceptions import InvalidFileException
+from openpyxl.worksheet._reader import WorkSheetParser
+
+
+class SheetCsv(NamedTuple):
+    """A worksheet converted to CSV"""
+    name: str
+    path: str
+    rows: int  # data rows written (header and blank rows not counted)
+
+
+def _blank(values) -> bool:
+    return all(value is None or value == "" for value in values)
+
+
+def _open(path: str, strings: bool = False) -> ExcelReader:
+    """An ExcelReader with the workbook part (and the shared strings and styles) read"""
+    try:
+        reader = ExcelReader(path, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile) as e:
+        raise ValueError(f"Not an .xlsx workbook: {e}")
+    try:
+        reader.read_manifest()
+        if strings:
+            reader.read_strings()
+        reader.read_workbook()
+        if strings:
+            apply_stylesheet(reader.archive, reader.wb)  # number formats tell dates from numbers
+    except (KeyError, IndexError) as e:
+        reader.archive.close()
+        raise ValueError(f"Not an .xlsx workbook: {e}")
+    return reader
+
+
+def _worksheets(reader: ExcelReader) -> Dict[str, str]:
+    """Worksheet name -> part in the archive, in workbook order (chartsheets left out)"""
+    return {
+        sheet.name: rel.target for sheet, rel in reader.parser.find_sheets()
+        if rel.target in reader.valid_files and "chartsheet" not in rel.Type
+    }
+
+
+def sheet_names(path: str) -> List[str]:
+    """
+    Worksheet names in workbook order (reads the workbook part only, not the shared strings)
+
+    Raises:
+        ValueError: If the file is not an .xlsx workbook
+    """
+    reader = _open(path)
+    try:
+        return list(_worksheets(reader))
+    finally:
+        reader.archive.close()
+
+
+def sheet_to_csv(path: str, name: str, destination: str) -> SheetCsv:
+    """
+    Stream one worksheet into a CSV file (runs in a worker process)
+
+    Rows come from openpyxl's read-only worksheet parser, used on this
+    sheet alone: load_workbook(read_only=True) sizes every sheet as it
+    opens, and a sheet saved without a <dimension> element (openpyxl's
+    write-only mode, some exporters) is sized by parsing all of it.
+
+    The first non-blank row is the header; columns right of its last cell
+    are dropped. Blank and missing rows are written as blank lines, which
+    the upload drops (as read_excel does) after numbering the rows, so
+    reported row numbers are sheet rows. Formula cells give their cached values.
+    """
+    reader = _open(path, strings=True)
+    rows = 0
+    width = None
+    try:
+        with reader.archive.open(_worksheets(reader)[name]) as source, \
+                open(destination, "w", newline="", encoding="utf-8") as output:
+            parser = WorkSheetParser(
+                source,
+                reader.shared_strings,
+                data_only=True,
+                epoch=reader.wb.epoch,
+                date_formats=reader.wb._date_formats,
+                timedelta_formats=reader.wb._timedelta_formats
+            )
+            writer = csv.writer(output)
+            previous = 0
+            for index, cells in parser.parse():
+                writer.writerows([] for _ in range(index - previous - 1))
+                previous = index
+                values = [None] * (width or max((cell["column"] for cell in cells), default=0))
+                for cell in cells:
+                    if cell["column"] <= len(values):
+                        values[cell["column"] - 1] = cell["value"]
+                if _blank(values):
+                    writer.writerow([])
+                    continue
+                if width is None:
+                    # The header row
+                    width = max(i for i, value in enumerate(values) if value is not None and value != "") + 1
+                    values = values[:width]
+                else:
+                    rows += 1
+                writer.writerow(values)
+    finally:
+        reader.archive.close()
+    return SheetCsv(name, destination, rows)
+
+
+async def workbook_to_csv(path: str, directory: str, workers: int) -> List[SheetCsv]:
+    """
+    Convert every worksheet of a workbook to CSV, sheets in parallel
+
+    Args:
+        path: The .xlsx file
+        directory: Where the CSV files are written, one per sheet
+        workers: Most worker processes (never more than one per sheet or per CPU)
+
+    Returns:
+        The converted sheets, in workbook order
+    """
+    names = await run_in_threadpool(sheet_names, path)
+    if not names:
+        return []
+    loop = asyncio.get_running_loop()
+    pool = ProcessPoolExecutor(
+        max_workers=max(1, min(workers, len(names), os.cpu_count() or 1)),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    conversions = [
+        loop.run_in_executor(pool, sheet_to_csv, path, name, os.path.join(directory, f"sheet-{index}.csv"))
+        for index, name in enumerate(names)
+    ]
+    try:
+        return list(await asyncio.gather(*conversions))
+    finally:
+        # On failure or cancellation, sheets not started yet are dropped; shutting
+        # down without waiting keeps the event loop free while running ones finish
+        for conversion in conversions:
+            conversion.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,209 @@
+"""
+Question Ancestry Service - Denormalized hierarchy ids on questions
+Every question carries exam_id, subject_id, chapter_id, topic_id,
+sub_topic_id and section_id next to its sub_section_id, so analytics can
+group answers by any level without walking the hierarchy per question
+"""
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from core.database import get_database
+from core.jobs import JobContext, job_runner
+from api.v1.content.services.hierarchy_cache import PARENT_FIELDS, content_cache
+
+REFRESH_ANCESTRY = "questions.refresh_ancestry"
+
+# Hierarchy collection -> question field holding the id of that level
+QUESTION_FIELDS = {
+    "exams": "exam_id",
+    "subjects": "subject_id",
+    "chapters": "chapter_id",
+    "topics": "topic_id",
+    "sub_topics": "sub_topic_id",
+    "sections": "section_id",
+    "sub_sections": "sub_section_id",
+}
+ANCESTOR_FIELDS = tuple(field for field in QUESTION_FIELDS.values() if field != "sub_section_id")
+
+
+class QuestionAncestryService:
+    """Service keeping question ancestor ids in sync with the content hierarchy"""
+
+    @staticmethod
+    async def ancestor_ids(sub_section_id: Optional[str]) -> Dict[str, Optional[str]]:
+        """
+        Ancestor ids of a sub-section
+
+        Args:
+            sub_section_id: Sub-section the question belongs to
+
+        Returns:
+            Question field -> ancestor id (None where the chain is broken)
+        """
+        chain = await content_cache.ancestors("sub_sections", sub_section_id)
+        return {
+            QUESTION_FIELDS[name]: str(chain[name]["_id"]) if name in chain else None
+            for name in QUESTION_FIELDS if name != "sub_sections"
+        }
+
+    @staticmethod
+    async def stamp(question: Dict[str, Any]) -> Dict[str, Any]:
+        """Set the ancestor ids on a question (or update payload) carrying sub_section_id"""
+        if "sub_section_id" in question:
+            question.update(await QuestionAncestryService.ancestor_ids(question["sub_section_id"]))
+        return question
+
+    @staticmethod
+    async def stamp_many(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """stamp() for a bulk insert, resolving each sub-section once"""
+        resolved: Dict[Any, Dict[str, Optional[str]]] = {}
+        for question in questions:
+            if "sub_section_id" not in question:
+                continue
+            sub_section_id = question["sub_section_id"]
+            if sub_section_id not in resolved:
+                resolved[sub_section_id] = await QuestionAncestryService.ancestor_ids(sub_section_id)
+            question.update(resolved[sub_section_id])
+        return questions
+
+    @staticmethod
+    async def backfill(query: Optional[Dict[str, Any]] = None, batch_size: int = 500) -> Dict[str, int]:
+        """
+        Recompute ancestor ids for matching questions, writing only the changed ones
+
+        Args:
+            query: Questions to refresh (all when None)
+            batch_size: Documents per cursor batch and per bulk_write
+
+        Returns:
+            Number of questions scanned and updated
+        """
+        db = get_database()
+        projection = {"sub_section_id": 1, **{field: 1 for field in ANCESTOR_FIELDS}}
+        scanned = 0
+        updated = 0
+        operations: List[UpdateOne] = []
+
+        async for question in db.questions.find(query or {}, projection).batch_size(batch_size):
+            scanned += 1
+            ancestors = await QuestionAncestryService.ancestor_ids(question.get("sub_section_id"))
+            if any(question.get(field) != value for field, value in ancestors.items()):
+                operations.append(UpdateOne({"_id": question["_id"]}, {"$set": ancestors}))
+
+            if len(operations) >= batch_size:
+                await db.questions.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+
+        if operations:
+            await db.questions.bulk_write(operations, ordered=False)
+            updated += len(operations)
+
+        return {"scanned": scanned, "updated": updated}
+
+    @staticmethod
+    async def answer_stats(
+        result_query: Dict[str, Any],
+        field: str,
+        question_query: Optional[Dict[str, Any]] = None,
+        batch_size: int = 1000
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        Answers in matching test results, grouped by a question ancestor field
+
+        Answers are first grouped per question in one aggregation, then the
+        distinct questions are resolved in $in batches on _id.
+
+        Args:
+            result_query: Filter on test_results (e.g. {"user_id": ...})
+            field: Question field to group by (e.g. "subject_id")
+            question_query: Extra filter on the questions (e.g. a subject)
+            batch_size: Question ids per $in query
+
+        Returns:
+            Ancestor id -> {"correct", "total"}, questions without the field excluded
+        """
+        db = get_database()
+        per_question = await db.test_results.aggregate([
+            {"$match": result_query},
+            {"$unwind": "$questions"},
+            {"$group": {
+                "_id": "$questions.question_id",
+                "correct": {"$sum": {"$cond": ["$questions.is_correct", 1, 0]}},
+                "total": {"$sum": 1}
+            }}
+        ]).to_list(None)
+        answers = {row["_id"]: row for row in per_question if ObjectId.is_valid(row["_id"])}
+        object_ids = [ObjectId(question_id) for question_id in answers]
+
+        stats: Dict[str, Dict[str, int]] = {}
+        for start in range(0, len(object_ids), batch_size):
+            query = {"_id": {"$in": object_ids[start:start + batch_size]}, **(question_query or {})}
+            async for question in db.questions.find(query, {field: 1}):
+                level_id = question.get(field)
+                if not level_id:
+                    continue
+                row = answers[str(question["_id"])]
+                level = stats.setdefault(level_id, {"correct": 0, "total": 0})
+                level["correct"] += row["correct"]
+                level["total"] += row["total"]
+        return stats
+
+    @staticmethod
+    async def parent_of(collection_name: str, entity_id: str) -> Optional[str]:
+        """Stored parent id of a hierarchy node (None for exams and missing nodes)"""
+        field = PARENT_FIELDS.get(collection_name)
+        if not field or not ObjectId.is_valid(entity_id):
+            return None
+        node = await get_database()[collection_name].find_one({"_id": ObjectId(entity_id)}, {field: 1})
+        return node.get(field) if node else None
+
+    @staticmethod
+    async def refresh_if_moved(
+        collection_name: str,
+        entity_id: str,
+        previous_parent: Optional[str],
+        parent: Optional[str]
+    ):
+        """
+        refresh_in_background after an update, if it gave the node another parent
+
+        Renames and other edits keep every question's ancestor ids, so they
+        do not queue a backfill.
+
+        Args:
+            collection_name: Hierarchy collection of the node
+            entity_id: Node id
+            previous_parent: parent_of() the node, read before the update
+            parent: Parent id the update set (None when it did not set one)
+        """
+        if parent is not None and parent != previous_parent:
+            await QuestionAncestryService.refresh_in_background(collection_name, entity_id)
+
+    @staticmethod
+    async def refresh_in_background(collection_name: str, entity_id: str):
+        """
+        Re-stamp the questions under a hierarchy node after it was moved or deleted
+
+        Call after the write and its content_cache.invalidate() (updates go
+        through refresh_if_moved); the backfill is queued as a background
+        job so the admin request returns immediately, and a restart does
+        not lose it.
+
+        Args:
+            collection_name: Hierarchy collection of the node
+            entity_id: Node id
+        """
+        if collection_name not in QUESTION_FIELDS:
+            return
+        await job_runner.submit(REFRESH_ANCESTRY, {"collection": collection_name, "entity_id": str(entity_id)})
+
+
+@job_runner.handler(REFRESH_ANCESTRY)
+async def refresh_ancestry_job(context: JobContext) -> Dict[str, int]:
+    # The job may run in another process, whose hierarchy cache predates the write
+    content_cache.invalidate()
+    field = QUESTION_FIELDS[context.params["collection"]]
+    return await QuestionAncestryService.backfill({field: context.params["entity_id"]})
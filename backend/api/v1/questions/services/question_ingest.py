@@ -0,0 +1,232 @@
+"""
+Question Ingest - Column-wise transformation of uploaded question sheets
+Turns a DataFrame in the 24-column format or the legacy format into
+insert-ready question documents. Every field is derived for the whole
+column at once (options, correct-answer index, tags, numbers) instead of
+per row with iterrows; only the final zip into dicts is per row.
+
+Imports pandas at module level, so import this module inside the endpoint
+or function that uploads (see scripts/benchmark_startup.py).
+"""
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+
+from core.serialization import dumps
+
+NEW_FORMAT = "new_24_column"
+LEGACY_FORMAT = "legacy"
+
+NEW_FORMAT_REQUIRED = ["UID", "Exam", "Subject", "QuestionType", "QuestionText", "OptionA", "OptionB", "CorrectAnswer"]
+LEGACY_REQUIRED = [
+    "sub_section_id", "question_text", "option1", "option2", "option3", "option4", "correct_answer", "difficulty"
+]
+
+LEGACY_OPTION_COLUMNS = ["option1", "option2", "option3", "option4"]
+ANSWER_LETTERS = {"A": 0, "B": 1, "C": 2, "D": 3}
+
+# Record fields left out of the content hash (they change on every upload)
+UNHASHED_FIELDS = ("created_at", "content_hash")
+
+
+def detect_format(columns: Sequence[str]) -> str:
+    """NEW_FORMAT when the sheet has the 24-column headers, else LEGACY_FORMAT"""
+    return NEW_FORMAT if "UID" in columns and "QuestionText" in columns else LEGACY_FORMAT
+
+
+def require_columns(df: pd.DataFrame, required: List[str], message: str = "CSV must contain columns"):
+    """Raise HTTPException 400 unless every required column is present"""
+    if not all(col in df.columns for col in required):
+        raise HTTPException(status_code=400, detail=f"{message}: {required}")
+
+
+def _text(df: pd.DataFrame, column: str, default: str = "") -> List[str]:
+    """Column as strings, empty cells -> default; whole-number floats lose their .0 (2024.0 -> 2024)"""
+    if column not in df.columns:
+        return [default] * len(df)
+    values = df[column]
+    if values.dtype.kind == "f" and (values.dropna() % 1 == 0).all():
+        values = values.astype("Int64")
+    return values.astype(str).where(values.notna(), default).tolist()
+
+
+def _number(df: pd.DataFrame, column: str, default: float) -> pd.Series:
+    """Column as floats, empty or non-numeric cells -> default"""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype="float64")
+    return pd.to_numeric(df[column], errors="coerce").fillna(default)
+
+
+def _tags(df: pd.DataFrame, column: str) -> List[List[str]]:
+    """Comma-separated tags, stripped, empty entries dropped"""
+    if column not in df.columns:
+        return [[] for _ in range(len(df))]
+    # Parse each distinct cell once; sheets repeat a small set of tag strings
+    codes, cells = pd.factorize(df[column].fillna("").astype(str))
+    parsed = [[tag.strip() for tag in cell.split(",") if tag.strip()] for cell in cells]
+    return [parsed[code].copy() for code in codes]
+
+
+def _records(columns: Dict[str, Any], count: int) -> List[Dict[str, Any]]:
+    """Zip per-field columns (lists, or scalars repeated on every row) into documents"""
+    keys = list(columns)
+    values = [value if isinstance(value, list) else [value] * count for value in columns.values()]
+    return [dict(zip(keys, row)) for row in zip(*values)]
+
+
+def new_format_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Question documents from a sheet in the 24-column format
+
+    Args:
+        df: Uploaded sheet (callers check the required columns)
+
+    Returns:
+        Insert-ready question dicts, in row order
+    """
+    count = len(df)
+    answer_choices = _number(df, "AnswerChoicesCount", 4).astype("int64")
+
+    # Options beyond AnswerChoicesCount or with an empty cell are left out
+    option_columns = []
+    for i in range(26):
+        column = f"Option{chr(65 + i)}"  # OptionA, OptionB, ...
+        if column in df.columns:
+            keep = (df[column].notna() & (answer_choices > i)).to_numpy()
+            option_columns.append(np.where(keep, np.array(_text(df, column), dtype=object), None))
+    options = [[option for option in row if option is not None] for row in zip(*option_columns)]
+
+    correct_answer = (
+        df["CorrectAnswer"].astype(str).str.strip().str.upper().map(ANSWER_LETTERS).fillna(0).astype("int64")
+    )
+    subject = _text(df, "Subject")
+    explanation = _text(df, "Explanation")
+    formula = _text(df, "FormulaLaTeX")
+
+    return _records({
+        "sub_section_id": subject,  # Map to existing field
+        "question_text": _text(df, "QuestionText"),
+        "options": options,
+        "correct_answer": correct_answer.tolist(),
+        "difficulty": [value.lower() for value in _text(df, "Difficulty", "medium")],
+        "tags": _tags(df, "Tags"),
+        "explanation": explanation,
+        "hint": "",  # Not in 24-column format, use solution
+        "solution": explanation,  # Use explanation as solution
+        "code_snippet": "",
+        "image_url": _text(df, "ImageUploadThingURL"),
+        "formula": formula,
+        # Extended fields
+        "uid": _text(df, "UID"),
+        "exam": _text(df, "Exam"),
+        "year": _text(df, "Year"),
+        "subject": subject,
+        "chapter": _text(df, "Chapter"),
+        "topic": _text(df, "Topic"),
+        "question_type": _text(df, "QuestionType", "MCQ-SC"),
+        "answer_choices_count": answer_choices.tolist(),
+        "marks": _number(df, "Marks", 1.0).tolist(),
+        "negative_marks": _number(df, "NegativeMarks", 0.0).tolist(),
+        "time_limit_seconds": _number(df, "TimeLimitSeconds", 120).astype("int64").tolist(),
+        "formula_latex": formula,
+        "image_alt_text": _text(df, "ImageAltText"),
+        "confidence_score": _number(df, "ConfidenceScore", 1.0).tolist(),
+        "source_notes": _text(df, "SourceNotes"),
+        "created_at": datetime.utcnow()
+    }, count)
+
+
+def legacy_format_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Question documents from a sheet in the legacy format
+
+    Args:
+        df: Uploaded sheet (callers check the required columns)
+
+    Returns:
+        Insert-ready question dicts, in row order
+
+    Raises:
+        ValueError: If a correct_answer cell is not a whole number
+    """
+    count = len(df)
+    correct_answer = pd.to_numeric(df["correct_answer"], errors="coerce")
+    invalid = correct_answer.isna() | (correct_answer % 1 != 0)
+    if invalid.any():
+        rows = (np.flatnonzero(invalid.to_numpy())[:5] + 2).tolist()  # 1-based, after the header
+        raise ValueError(f"correct_answer must be a whole number (rows {rows})")
+
+    formula = _text(df, "formula")
+    return _records({
+        "sub_section_id": _text(df, "sub_section_id"),
+        "question_text": _text(df, "question_text"),
+        "options": [list(row) for row in zip(*(_text(df, column) for column in LEGACY_OPTION_COLUMNS))],
+        "correct_answer": correct_answer.astype("int64").tolist(),
+        "difficulty": _text(df, "difficulty"),
+        "tags": _tags(df, "tags"),
+        "explanation": _text(df, "explanation"),
+        "hint": _text(df, "hint"),
+        "solution": _text(df, "solution"),
+        "code_snippet": _text(df, "code_snippet"),
+        "image_url": _text(df, "image_url"),
+        "formula": formula,
+        # Default extended fields
+        "uid": "",
+        "exam": "",
+        "year": "",
+        "subject": "",
+        "chapter": "",
+        "topic": "",
+        "question_type": "MCQ-SC",
+        "answer_choices_count": 4,
+        "marks": 1.0,
+        "negative_marks": 0.0,
+        "time_limit_seconds": 120,
+        "formula_latex": formula,
+        "image_alt_text": "",
+        "confidence_score": 1.0,
+        "source_notes": "",
+        "created_at": datetime.utcnow()
+    }, count)
+
+
+def _blank(df: pd.DataFrame, column: str) -> pd.Series:
+    if column not in df.columns:
+        return pd.Series(True, index=df.index)
+    return df[column].isna() | (df[column].astype(str).str.strip() == "")
+
+
+def row_errors(df: pd.DataFrame, sheet_format: str) -> pd.Series:
+    """
+    Why each row cannot become a question ("" for valid rows)
+
+    Args:
+        df: Sheet or chunk (columns already checked)
+        sheet_format: NEW_FORMAT or LEGACY_FORMAT
+
+    Returns:
+        Error message per row, aligned with df.index
+    """
+    errors = pd.Series("", index=df.index, dtype=object)
+    if sheet_format == NEW_FORMAT:
+        errors[_blank(df, "QuestionText")] = "QuestionText is empty"
+    else:
+        correct_answer = pd.to_numeric(df["correct_answer"], errors="coerce")
+        errors[correct_answer.isna() | (correct_answer % 1 != 0)] = "correct_answer must be a whole number"
+        errors[_blank(df, "question_text")] = "question_text is empty"
+    return errors
+
+
+def format_records(df: pd.DataFrame, sheet_format: str) -> List[Dict[str, Any]]:
+    """new_format_records or legacy_format_records"""
+    return new_format_records(df) if sheet_format == NEW_FORMAT else legacy_format_records(df)
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """Digest of a record's sheet-derived fields; equal digests mean an unchanged row"""
+    content = {key: value for key, value in record.items() if key not in UNHASHED_FIELDS}
+    return hashlib.blake2b(dumps(content), digest_size=16).hexdigest()
@@ -0,0 +1,99 @@
+"""
+Question Jobs - Bulk uploads run by the background job runner
+An upload endpoint called with background=true stores the file with the
+job and answers 202 with the job id; a worker then runs the same chunked
+upload as the request would (question_upload) and stores its summary as
+the job result. UID-keyed rows are upserted, so re-running an interrupted
+upload of such a sheet does not duplicate them.
+"""
+from typing import Any, Dict, Optional
+
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from core.jobs import JobContext, JobFailed, accepted, job_runner
+
+BULK_UPLOAD = "questions.bulk_upload"
+
+EXCEL_EXTENSIONS = (".xlsx", ".xls")
+
+
+async def submit_bulk_upload(file: UploadFile, admin: dict, **options):
+    """
+    Queue a bulk upload of an uploaded sheet
+
+    Only sheets forced to the 24-column format are retried: other sheets may
+    have no UIDs, and re-running them would insert their rows again.
+
+    Args:
+        file: The uploaded CSV or Excel file
+        admin: Submitting admin
+        **options: QuestionUploadService.upload options (sheet_format, required, message, mode)
+
+    Returns:
+        202 response with the job id
+    """
+    from api.v1.questions.services import question_ingest
+
+    max_attempts: Optional[int] = None if options.get("sheet_format") == question_ingest.NEW_FORMAT else 1
+    job = await job_runner.submit(
+        BULK_UPLOAD,
+        {"filename": file.filename, "options": options},
+        submitted_by=str(admin.get("_id")),
+        files={"file": (file.filename, file.file)},
+        max_attempts=max_attempts
+    )
+    return accepted(job)
+
+
+@job_runner.handler(BULK_UPLOAD)
+async def bulk_upload(context: JobContext) -> Dict[str, Any]:
+    """Upload the job's sheet; the result is the upload summary"""
+    import pandas as pd
+    from fastapi import HTTPException
+    from api.v1.questions.services.question_upload import QuestionUploadService
+
+    filename = context.params["filename"] or ""
+    options = context.params.get("options") or {}
+    file = await context.open_file("file")
+    try:
+        size = max(file.seek(0, 2), 1)
+        file.seek(0)
+
+        if filename.endswith(".xlsx"):
+            async def report(summary: Dict[str, Any]):
+                expected = sum(sheet["rows"] for sheet in summary["sheets"])
+                await context.progress(100 * summary["total_rows"] / max(expected, 1),
+                                       f"{summary['total_rows']} rows read", "uploading")
+
+            await context.progress(0, "Reading workbook", "reading")
+            summary = await QuestionUploadService.upload_excel(file, progress=report, **options)
+        elif filename.endswith(EXCEL_EXTENSIONS):
+            df = await run_in_threadpool(pd.read_excel, file)
+
+            async def report(summary: Dict[str, Any]):
+                await context.progress(100 * summary["total_rows"] / max(len(df), 1),
+                                       f"{summary['total_rows']} rows read", "uploading")
+
+            summary = await QuestionUploadService.upload_dataframe(df, progress=report, **options)
+        else:
+            async def report(summary: Dict[str, Any]):
+                # Parser read-ahead makes the file position a close upper bound
+                await context.progress(min(99, 100 * file.tell() / size),
+                                       f"{summary['total_rows']} rows read", "uploading")
+
+            summary = await QuestionUploadService.upload_csv(file, progress=report, **options)
+    except HTTPException as e:
+        raise JobFailed(e.detail)
+    except ValueError as e:  # includes pandas' EmptyDataError
+        raise JobFailed(f"Error processing file: {e}")
+    finally:
+        file.close()
+
+    if not summary["total_rows"]:
+        raise JobFailed("No valid questions found in file")
+    return {
+        "message": QuestionUploadService.message(summary),
+        "count": QuestionUploadService.written_count(summary),
+        **summary
+    }
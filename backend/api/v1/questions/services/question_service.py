@@ -2,13 +2,31 @@
 Question Service - Business logic for question management
 Handles question CRUD, bulk upload, and filtering
 """
-from typing import List, Optional, Dict, Any
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 from datetime import datetime
 from bson import ObjectId
 from fastapi import HTTPException
-import pandas as pd
+from pymongo.errors import DuplicateKeyError
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 from core.database import get_database
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
+from api.v1.tests.services.question_pool import question_pools
+from api.v1.tests.services.answer_keys import answer_keys
+
+
+@contextmanager
+def uid_conflict():
+    """Turn a write rejected by the unique index on questions.uid into a 409"""
+    try:
+        yield
+    except DuplicateKeyError as e:
+        if "uid" not in (e.details or {}).get("keyPattern", {}):
+            raise
+        raise HTTPException(status_code=409, detail="UID already exists")
 
 
 class QuestionService:
@@ -32,7 +50,10 @@ class QuestionService:
             "created_at": datetime.utcnow()
         }
         
-        result = await db.questions.insert_one(question_dict)
+        await QuestionAncestryService.stamp(question_dict)
+        with uid_conflict():
+            result = await db.questions.insert_one(question_dict)
+        question_pools.invalidate()
         question_dict["_id"] = result.inserted_id
         
         return question_dict
@@ -88,14 +109,17 @@ class QuestionService:
             Updated question
             
         Raises:
-            HTTPException: If question not found
+            HTTPException: If question not found (404) or the UID is taken (409)
         """
         db = get_database()
         
-        result = await db.questions.update_one(
-            {"_id": ObjectId(question_id)},
-            {"$set": update_data}
-        )
+        with uid_conflict():
+            result = await db.questions.update_one(
+                {"_id": ObjectId(question_id)},
+                {"$set": await QuestionAncestryService.stamp(dict(update_data))}
+            )
+        answer_keys.discard([question_id])
+        question_pools.invalidate()
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="Question not found")
@@ -120,6 +144,8 @@ class QuestionService:
         db = get_database()
         
         result = await db.questions.delete_one({"_id": ObjectId(question_id)})
+        answer_keys.discard([question_id])
+        question_pools.invalidate()
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Question not found")
@@ -142,7 +168,9 @@ class QuestionService:
         if not questions:
             raise HTTPException(status_code=400, detail="No questions provided")
         
+        await QuestionAncestryService.stamp_many(questions)
         result = await db.questions.insert_many(questions)
+        question_pools.invalidate()
         
         return {
             "inserted_count": len(result.inserted_ids),
@@ -150,7 +178,7 @@ class QuestionService:
         }
     
     @staticmethod
-    def parse_csv_new_format(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def parse_csv_new_format(df: "pd.DataFrame") -> List[Dict[str, Any]]:
         """
         Parse CSV in new 24-column format
         
@@ -160,68 +188,13 @@ class QuestionService:
         Returns:
             List of question dicts
         """
-        required_columns = ["UID", "Exam", "Subject", "QuestionType", "QuestionText", "OptionA", "OptionB", "CorrectAnswer"]
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail=f"New CSV format must contain columns: {required_columns}")
-        
-        questions = []
-        for _, row in df.iterrows():
-            # Build options array based on AnswerChoicesCount
-            answer_choices = int(row.get("AnswerChoicesCount", 4))
-            options = []
-            for i in range(answer_choices):
-                option_key = f"Option{chr(65+i)}"  # OptionA, OptionB, OptionC, OptionD
-                if option_key in df.columns and pd.notna(row.get(option_key)):
-                    options.append(str(row[option_key]))
-            
-            # Convert CorrectAnswer (A/B/C/D) to index (0/1/2/3)
-            correct_answer_letter = str(row["CorrectAnswer"]).upper()
-            correct_answer_index = ord(correct_answer_letter) - ord('A') if correct_answer_letter in 'ABCD' else 0
-            
-            # Parse tags
-            tags_str = row.get("Tags", "")
-            tags = [tag.strip() for tag in str(tags_str).split(",") if tag.strip()] if pd.notna(tags_str) else []
-            
-            # Map difficulty
-            difficulty = str(row.get("Difficulty", "medium")).lower()
-            
-            question_dict = {
-                "sub_section_id": str(row.get("Subject", "")),  # Map to existing field
-                "question_text": str(row["QuestionText"]),
-                "options": options,
-                "correct_answer": correct_answer_index,
-                "difficulty": difficulty,
-                "tags": tags,
-                "explanation": str(row.get("Explanation", "")),
-                "hint": "",
-                "solution": str(row.get("Explanation", "")),
-                "code_snippet": "",
-                "image_url": str(row.get("ImageUploadThingURL", "")),
-                "formula": str(row.get("FormulaLaTeX", "")),
-                # Extended fields
-                "uid": str(row.get("UID", "")),
-                "exam": str(row.get("Exam", "")),
-                "year": str(row.get("Year", "")),
-                "subject": str(row.get("Subject", "")),
-                "chapter": str(row.get("Chapter", "")),
-                "topic": str(row.get("Topic", "")),
-                "question_type": str(row.get("QuestionType", "MCQ-SC")),
-                "answer_choices_count": answer_choices,
-                "marks": float(row.get("Marks", 1.0)),
-                "negative_marks": float(row.get("NegativeMarks", 0.0)),
-                "time_limit_seconds": int(row.get("TimeLimitSeconds", 120)),
-                "formula_latex": str(row.get("FormulaLaTeX", "")),
-                "image_alt_text": str(row.get("ImageAltText", "")),
-                "confidence_score": float(row.get("ConfidenceScore", 1.0)),
-                "source_notes": str(row.get("SourceNotes", "")),
-                "created_at": datetime.utcnow()
-            }
-            questions.append(question_dict)
-        
-        return questions
+        from api.v1.questions.services import question_ingest
+
+        question_ingest.require_columns(df, question_ingest.NEW_FORMAT_REQUIRED, "New CSV format must contain columns")
+        return question_ingest.new_format_records(df)
     
     @staticmethod
-    def parse_csv_legacy_format(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def parse_csv_legacy_format(df: "pd.DataFrame") -> List[Dict[str, Any]]:
         """
         Parse CSV in legacy format
         
@@ -231,47 +204,7 @@ class QuestionService:
         Returns:
             List of question dicts
         """
-        required_columns = ["sub_section_id", "question_text", "option1", "option2", "option3", "option4", "correct_answer", "difficulty"]
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail=f"CSV must contain columns: {required_columns}")
-        
-        questions = []
-        for _, row in df.iterrows():
-            options = [row["option1"], row["option2"], row["option3"], row["option4"]]
-            tags = row.get("tags", "").split(",") if pd.notna(row.get("tags")) else []
-            tags = [tag.strip() for tag in tags if tag.strip()]
-            
-            question_dict = {
-                "sub_section_id": str(row["sub_section_id"]),
-                "question_text": row["question_text"],
-                "options": options,
-                "correct_answer": int(row["correct_answer"]),
-                "difficulty": row["difficulty"],
-                "tags": tags,
-                "explanation": row.get("explanation", ""),
-                "hint": row.get("hint", ""),
-                "solution": row.get("solution", ""),
-                "code_snippet": row.get("code_snippet", ""),
-                "image_url": row.get("image_url", ""),
-                "formula": row.get("formula", ""),
-                # Default extended fields
-                "uid": "",
-                "exam": "",
-                "year": "",
-                "subject": "",
-                "chapter": "",
-                "topic": "",
-                "question_type": "MCQ-SC",
-                "answer_choices_count": 4,
-                "marks": 1.0,
-                "negative_marks": 0.0,
-                "time_limit_seconds": 120,
-                "formula_latex": row.get("formula", ""),
-                "image_alt_text": "",
-                "confidence_score": 1.0,
-                "source_notes": "",
-                "created_at": datetime.utcnow()
-            }
-            questions.append(question_dict)
-        
-        return questions
+        from api.v1.questions.services import question_ingest
+
+        question_ingest.require_columns(df, question_ingest.LEGACY_REQUIRED)
+        return question_ingest.legacy_format_records(df)
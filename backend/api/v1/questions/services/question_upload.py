@@ -0,0 +1,382 @@
+"""
+Question Upload Service - Chunked bulk upload of question sheets
+A CSV upload is parsed from the spooled upload file UPLOAD_CHUNK_ROWS rows
+at a time; each chunk is validated and transformed column-wise
+(question_ingest) and written with one unordered bulk_write, so peak
+memory depends on the chunk size, not on the file size, and one bad row
+only costs that row. Parsing and transformation run in the threadpool.
+
+An .xlsx workbook is first streamed to one CSV file per worksheet by a
+process pool (excel_reader), and every sheet is then uploaded as a CSV.
+
+Rows with a UID are keyed by it (unique index on questions.uid): the mode
+decides whether an existing question is left alone, updated or replaced,
+and rows whose content hash matches the stored one are not written at
+all, so re-uploading a sheet only touches the rows that changed. A UID
+repeated in an upload (also across chunks and the sheets of a workbook)
+is taken from its first row; later rows with it are skipped and reported.
+
+Imports pandas through question_ingest, so import this module inside the
+upload endpoints.
+"""
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pymongo import InsertOne, ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from core.config import settings
+from core.database import get_database
+from api.v1.questions.services import question_ingest
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
+from api.v1.tests.services.answer_keys import answer_keys
+from api.v1.tests.services.question_pool import question_pools
+
+# Columns every sheet of a format must have, with the message for a sheet that lacks them
+REQUIRED_COLUMNS = {
+    question_ingest.NEW_FORMAT: (question_ingest.NEW_FORMAT_REQUIRED, "New CSV format must contain columns"),
+    question_ingest.LEGACY_FORMAT: (question_ingest.LEGACY_REQUIRED, "CSV must contain columns"),
+}
+
+HEADER_ROWS = 1  # sheet row numbers in reports are 1-based and count the header
+
+# What happens to a row whose UID is already in the bank
+INSERT_MODE = "insert"    # leave the existing question as it is
+UPSERT_MODE = "upsert"    # overwrite the sheet's fields, keep the others (review status, ...)
+REPLACE_MODE = "replace"  # replace the whole document, keeping only _id and created_at
+
+EXISTING_PROJECTION = {"uid": 1, "content_hash": 1, "created_at": 1}
+
+COUNT_FIELDS = ("total_rows", "created_count", "updated_count", "unchanged_count", "failed_count", "skipped_count")
+
+
+def _header_row(file: BinaryIO) -> int:
+    """Sheet row of the header: skips the blank lines before it, leaving the file at the header"""
+    row = HEADER_ROWS
+    while True:
+        position = file.tell()
+        line = file.readline()
+        if not line or line.strip():
+            file.seek(position)
+            return row
+        row += 1
+
+
+def _prepare(
+    chunk: pd.DataFrame,
+    sheet_format: str,
+    header_row: int,
+    seen_uids: Dict[str, Tuple[Optional[str], int]],
+    sheet_name: Optional[str] = None
+):
+    """
+    (records, sheet row of each record, [(row, error)] of skipped rows) for a chunk
+
+    seen_uids maps every UID kept so far in the upload to its (sheet, row)
+    and is extended with this chunk's.
+    """
+    errors = question_ingest.row_errors(chunk, sheet_format)
+    invalid = errors != ""
+    skipped = [(int(index) + 1 + header_row, error) for index, error in errors[invalid].items()]
+    valid = chunk[~invalid]
+    rows = (valid.index + 1 + header_row).tolist()
+    records = question_ingest.format_records(valid, sheet_format)
+
+    # A UID already kept (here, in an earlier chunk or on an earlier sheet): the first row wins
+    kept_records, kept_rows = [], []
+    for record, row in zip(records, rows):
+        uid = record["uid"]
+        if uid:
+            if uid in seen_uids:
+                first_sheet, first_row = seen_uids[uid]
+                where = f"row {first_row}" if first_sheet is None else f"sheet {first_sheet}, row {first_row}"
+                skipped.append((row, f"UID {uid} is repeated, first on {where}"))
+                continue
+            seen_uids[uid] = (sheet_name, row)
+        record["content_hash"] = question_ingest.content_hash(record)
+        kept_records.append(record)
+        kept_rows.append(row)
+    return kept_records, kept_rows, skipped
+
+
+def _changed(records: List[Dict[str, Any]], existing: Dict[str, Dict[str, Any]], mode: str) -> List[int]:
+    """Positions of the records to write; the rest are unchanged (same content hash, or insert mode)"""
+    positions = []
+    for position, record in enumerate(records):
+        current = existing.get(record["uid"]) if record["uid"] else None
+        if current is None or (mode != INSERT_MODE and current.get("content_hash") != record["content_hash"]):
+            positions.append(position)
+    return positions
+
+
+def _operation(record: Dict[str, Any], current: Optional[Dict[str, Any]], mode: str, now: datetime):
+    """The bulk write operation storing one record"""
+    if not record["uid"] or mode == INSERT_MODE:
+        # Nothing to match on (legacy sheets, blank UID), or a new UID in insert mode
+        return InsertOne(record)
+    if mode == UPSERT_MODE:
+        created_at = record.pop("created_at")
+        return UpdateOne(
+            {"uid": record["uid"]},
+            {"$set": {**record, "updated_at": now}, "$setOnInsert": {"created_at": created_at}},
+            upsert=True
+        )
+    if current is not None:
+        record["created_at"] = current.get("created_at", record["created_at"])
+        record["updated_at"] = now
+    return ReplaceOne({"uid": record["uid"]}, record, upsert=True)
+
+
+class QuestionUploadService:
+    """Service for chunked bulk question uploads"""
+
+    @staticmethod
+    async def upload_csv(file: BinaryIO, **options) -> Dict[str, Any]:
+        """
+        Upload a CSV file in chunks (see upload for options and the summary)
+
+        Blank lines are read as empty rows, which upload drops, so the
+        DataFrame index keeps matching the line of the file (the sheet row
+        of a workbook converted by excel_reader) in error reports.
+
+        Raises:
+            pandas.errors.EmptyDataError: If the file has no header
+        """
+        header_row = await run_in_threadpool(_header_row, file)
+        chunks = await run_in_threadpool(
+            pd.read_csv, file, chunksize=settings.UPLOAD_CHUNK_ROWS, skip_blank_lines=False
+        )
+        try:
+            return await QuestionUploadService.upload(chunks, header_row=header_row, **options)
+        finally:
+            chunks.close()
+
+    @staticmethod
+    async def upload_excel(
+        file: BinaryIO,
+        progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        **options
+    ) -> Dict[str, Any]:
+        """
+        Upload every worksheet of an .xlsx workbook (see upload for options)
+
+        The sheets are streamed to CSV in parallel (excel_reader) and then
+        uploaded one after the other with upload_csv. Sheets without data
+        rows are ignored. The first sheet with data must have the required
+        columns (HTTPException 400, nothing written); a later one that lacks
+        them is skipped and reported. Errors carry the sheet name.
+
+        Args:
+            file: The uploaded workbook
+            progress: Awaited with the workbook summary so far as each chunk is read
+            **options: upload options (sheet_format, required, message, mode)
+
+        Returns:
+            The upload summary totalled over the sheets, plus "sheets": name,
+            rows and format (None if skipped) of every sheet with data
+        """
+        from api.v1.questions.services import excel_reader
+
+        summary: Dict[str, Any] = {
+            "format": options.get("sheet_format"), "mode": options.get("mode", UPSERT_MODE),
+            **{field: 0 for field in COUNT_FIELDS}, "errors": [], "sheets": []
+        }
+
+        seen_uids: Dict[str, Tuple[Optional[str], int]] = {}
+
+        def report_error(error: Dict[str, Any]):
+            if len(summary["errors"]) < settings.UPLOAD_MAX_REPORTED_ERRORS:
+                summary["errors"].append(error)
+
+        with tempfile.TemporaryDirectory(prefix="question-upload-") as directory:
+            workbook = os.path.join(directory, "upload.xlsx")
+
+            def save():
+                with open(workbook, "wb") as output:
+                    shutil.copyfileobj(file, output)
+
+            await run_in_threadpool(save)
+            sheets = [
+                sheet for sheet in await excel_reader.workbook_to_csv(workbook, directory, settings.EXCEL_READ_WORKERS)
+                if sheet.rows
+            ]
+            summary["sheets"] = [{"name": sheet.name, "rows": sheet.rows, "format": None} for sheet in sheets]
+
+            for position, sheet in enumerate(sheets):
+                async def report(sheet_summary: Dict[str, Any]):
+                    if progress:
+                        await progress({**summary, "total_rows": summary["total_rows"] + sheet_summary["total_rows"]})
+
+                with open(sheet.path, "rb") as csv_file:
+                    try:
+                        sheet_summary = await QuestionUploadService.upload_csv(
+                            csv_file, progress=report, seen_uids=seen_uids, sheet_name=sheet.name, **options
+                        )
+                    except HTTPException as e:
+                        if position == 0:
+                            raise
+                        report_error({"sheet": sheet.name, "row": None, "error": f"Sheet skipped: {e.detail}"})
+                        continue
+
+                summary["format"] = summary["format"] or sheet_summary["format"]
+                summary["sheets"][position]["format"] = sheet_summary["format"]
+                for field in COUNT_FIELDS:
+                    summary[field] += sheet_summary[field]
+                for error in sheet_summary["errors"]:
+                    report_error({"sheet": sheet.name, **error})
+        return summary
+
+    @staticmethod
+    async def upload_dataframe(df: pd.DataFrame, **options) -> Dict[str, Any]:
+        """Upload an already parsed sheet (e.g. .xls Excel) in chunks (see upload)"""
+        size = settings.UPLOAD_CHUNK_ROWS
+        chunks = (df.iloc[start:start + size] for start in range(0, max(len(df), 1), size))
+        return await QuestionUploadService.upload(chunks, **options)
+
+    @staticmethod
+    async def upload(
+        chunks: Iterator[pd.DataFrame],
+        sheet_format: Optional[str] = None,
+        required: Optional[List[str]] = None,
+        message: Optional[str] = None,
+        mode: str = UPSERT_MODE,
+        progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None,
+        header_row: int = HEADER_ROWS,
+        seen_uids: Optional[Dict[str, Tuple[Optional[str], int]]] = None,
+        sheet_name: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Validate, transform and write a sheet chunk by chunk
+
+        Empty rows are dropped. Rows that fail validation are skipped; rows
+        the database rejects are failed; both are listed (up to
+        UPLOAD_MAX_REPORTED_ERRORS) with their sheet row number. Chunks
+        written before a failure stay written, and the answer keys of the
+        questions a chunk updated are discarded once it is written.
+
+        Args:
+            chunks: DataFrames with a continuous index (as read_csv chunks have)
+            sheet_format: Force NEW_FORMAT or LEGACY_FORMAT instead of detecting it
+            required: Required columns instead of the format's own
+            message: Error message prefix for missing columns
+            mode: INSERT_MODE, UPSERT_MODE or REPLACE_MODE for rows whose UID exists
+            progress: Awaited with the summary so far as each chunk is read
+            header_row: Sheet row of the header (row numbers count from it)
+            seen_uids: UIDs kept by earlier sheets of the same upload, extended with this one's
+            sheet_name: Name of the sheet, for repeated-UID errors on later sheets
+
+        Returns:
+            format, mode, total_rows, created_count, updated_count, unchanged_count,
+            failed_count, skipped_count, errors
+
+        Raises:
+            HTTPException 400: If required columns are missing (nothing is written)
+        """
+        db = get_database()
+        summary: Dict[str, Any] = {
+            "format": sheet_format, "mode": mode, "total_rows": 0,
+            "created_count": 0, "updated_count": 0, "unchanged_count": 0,
+            "failed_count": 0, "skipped_count": 0, "errors": []
+        }
+        last_row = header_row
+        if seen_uids is None:
+            seen_uids = {}
+
+        def report(row: Optional[int], error: str):
+            if len(summary["errors"]) < settings.UPLOAD_MAX_REPORTED_ERRORS:
+                summary["errors"].append({"row": row, "error": error})
+
+        while True:
+            try:
+                chunk = await run_in_threadpool(next, chunks, None)
+            except pd.errors.ParserError as e:
+                # Malformed CSV: keep what was written, report where parsing stopped
+                report(None, f"Parsing stopped after row {last_row}: {e}")
+                break
+            if chunk is None:
+                break
+            if not chunk.empty:
+                last_row = int(chunk.index[-1]) + 1 + header_row
+            chunk = chunk.dropna(how="all")  # blank lines; the index keeps the rows' positions
+
+            if summary["total_rows"] == 0:
+                summary["format"] = summary["format"] or question_ingest.detect_format(chunk.columns)
+                default_required, default_message = REQUIRED_COLUMNS[summary["format"]]
+                question_ingest.require_columns(chunk, required or default_required, message or default_message)
+            if chunk.empty:
+                continue
+            summary["total_rows"] += len(chunk)
+            if progress:
+                await progress(summary)
+
+            records, rows, skipped = await run_in_threadpool(
+                _prepare, chunk, summary["format"], header_row, seen_uids, sheet_name
+            )
+            summary["skipped_count"] += len(skipped)
+            for row, error in skipped:
+                report(row, error)
+
+            uids = [record["uid"] for record in records if record["uid"]]
+            existing: Dict[str, Dict[str, Any]] = {}
+            if uids:
+                # $gt "" lets the partial unique uid index serve the lookup
+                async for question in db.questions.find({"uid": {"$in": uids, "$gt": ""}}, EXISTING_PROJECTION):
+                    existing[question["uid"]] = question
+            positions = _changed(records, existing, mode)
+            summary["unchanged_count"] += len(records) - len(positions)
+            if not positions:
+                continue
+
+            await QuestionAncestryService.stamp_many([records[position] for position in positions])
+            now = datetime.utcnow()
+            operations = []
+            changed_ids = []
+            for position in positions:
+                current = existing.get(records[position]["uid"])
+                if current is not None:
+                    changed_ids.append(current["_id"])
+                operations.append(_operation(records[position], current, mode, now))
+
+            try:
+                result = (await db.questions.bulk_write(operations, ordered=False)).bulk_api_result
+            except BulkWriteError as e:
+                result = e.details
+                summary["failed_count"] += len(e.details["writeErrors"])
+                for error in e.details["writeErrors"]:
+                    report(rows[positions[error["index"]]], error["errmsg"])
+            except PyMongoError as e:
+                summary["failed_count"] += len(operations)
+                first, last = rows[positions[0]], rows[positions[-1]]
+                report(first, f"Rows {first}-{last} were not written: {e}")
+                continue
+            finally:
+                answer_keys.discard(changed_ids)
+            summary["created_count"] += result["nInserted"] + result["nUpserted"]
+            summary["updated_count"] += result["nMatched"]
+
+        if summary["created_count"] or summary["updated_count"]:
+            question_pools.invalidate()
+        return summary
+
+    @staticmethod
+    def message(summary: Dict[str, Any]) -> str:
+        """One-line outcome of an upload"""
+        text = (
+            f"Successfully uploaded {QuestionUploadService.written_count(summary)} questions "
+            f"({summary['created_count']} created, {summary['updated_count']} updated, "
+            f"{summary['unchanged_count']} unchanged"
+        )
+        if summary["failed_count"] or summary["skipped_count"]:
+            text += f", {summary['failed_count']} failed, {summary['skipped_count']} skipped"
+        return text + ")"
+
+    @staticmethod
+    def written_count(summary: Dict[str, Any]) -> int:
+        """Questions created or updated by an upload (the routes' "count")"""
+        return summary["created_count"] + summary["updated_count"]
@@ -1,3 +1,9 @@
-from .test_models import TestSubmission, TestResultResponse
+from .test_models import (
+    TestSubmission, TestResultResponse, TestResultSummary,
+    TestSessionCreate, TestSessionResponse, TestSessionSubmit
+)
 
-__all__ = ['TestSubmission', 'TestResultResponse']
+__all__ = [
+    'TestSubmission', 'TestResultResponse', 'TestResultSummary',
+    'TestSessionCreate', 'TestSessionResponse', 'TestSessionSubmit'
+]
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class TestSubmission(BaseModel):
     question_ids: List[str]
@@ -13,5 +13,31 @@ class TestResultResponse(BaseModel):
     total_questions: int
     correct_answers: int
     percentile: float
+    exam_percentile: Optional[float] = None
+    subject_percentile: Optional[float] = None
     questions: List[Dict[str, Any]]
     timestamp: datetime
+
+class TestResultSummary(BaseModel):
+    id: str
+    score: float
+    total_questions: int
+    correct_answers: int
+    percentile: float
+    timestamp: datetime
+
+class TestSessionCreate(BaseModel):
+    # Exactly one scope
+    sub_section_id: Optional[str] = None
+    chapter_id: Optional[str] = None
+    count: int = Field(10, ge=1, le=100)
+    # Questions per difficulty, e.g. {"easy": 3, "medium": 5, "hard": 2}; replaces count
+    difficulty_mix: Optional[Dict[str, int]] = None
+
+class TestSessionResponse(BaseModel):
+    session_id: str
+    expires_at: datetime
+    questions: List[Dict[str, Any]]  # QuestionResponse without correct_answer/explanation/solution
+
+class TestSessionSubmit(BaseModel):
+    answers: List[int]  # Option indices in the order the questions were served (-1 = skipped)
@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException, Depends
-from datetime import datetime
+from fastapi import APIRouter, HTTPException, Depends, Query
 from bson import ObjectId
-from typing import List
+from pymongo import DESCENDING
+from typing import List, Optional
 
-from api.v1.tests.models import TestSubmission, TestResultResponse
+from api.v1.tests.models import (
+    TestSubmission, TestResultResponse, TestResultSummary,
+    TestSessionCreate, TestSessionResponse, TestSessionSubmit
+)
 from core.security import get_current_user
 from core.database import get_database
+from core.pagination import paginate
+from core.serialization import (
+    FastJSONResponse, result_to_dict, result_summary_to_dict, TEST_RESULT_SUMMARY_PROJECTION
+)
+from api.v1.tests.services.attempt_storage import AttemptStorageService
+from api.v1.tests.services.question_pool import SCOPE_FIELDS
+from api.v1.tests.services.session_service import SessionService
 
 router = APIRouter(prefix="/tests", tags=["tests"])
 
@@ -17,78 +27,93 @@ async def submit_test(submission: TestSubmission, current_user: dict = Depends(g
     if len(submission.question_ids) != len(submission.answers):
         raise HTTPException(status_code=400, detail="Mismatch between questions and answers")
     
-    # Fetch questions
+    # Fetch questions, in the order they were answered
     question_objects = await db.questions.find({
         "_id": {"$in": [ObjectId(qid) for qid in submission.question_ids]}
     }).to_list(1000)
+    by_id = {str(q["_id"]): q for q in question_objects}
     
-    if len(question_objects) != len(submission.question_ids):
+    if any(qid not in by_id for qid in submission.question_ids):
         raise HTTPException(status_code=404, detail="Some questions not found")
     
-    # Calculate score
-    correct_count = 0
-    questions_with_results = []
-    
-    for i, q in enumerate(question_objects):
-        is_correct = submission.answers[i] == q["correct_answer"]
-        if is_correct:
-            correct_count += 1
-        
-        questions_with_results.append({
-            "question_id": str(q["_id"]),
-            "question_text": q["question_text"],
-            "options": q["options"],
-            "user_answer": submission.answers[i],
-            "correct_answer": q["correct_answer"],
-            "is_correct": is_correct,
-            "explanation": q.get("explanation", "")
-        })
-    
-    score = (correct_count / len(submission.question_ids)) * 100
-    
-    # Calculate percentile
-    all_scores = await db.test_results.find({}, {"score": 1}).to_list(10000)
-    scores_lower = sum(1 for s in all_scores if s["score"] < score)
-    percentile = (scores_lower / len(all_scores) * 100) if all_scores else 50.0
-    
-    # Save result
-    result_dict = {
-        "user_id": str(current_user["_id"]),
-        "score": score,
-        "total_questions": len(submission.question_ids),
-        "correct_answers": correct_count,
-        "percentile": percentile,
-        "questions": questions_with_results,
-        "timestamp": datetime.utcnow()
-    }
+    result = await SessionService.grade(
+        str(current_user["_id"]), [by_id[qid] for qid in submission.question_ids], submission.answers
+    )
+    return FastJSONResponse(result_to_dict(result))
+
+# ==================== TEST SESSIONS ====================
+
+@router.post("/sessions", response_model=TestSessionResponse)
+async def start_test_session(request: TestSessionCreate, current_user: dict = Depends(get_current_user)):
+    """Draw a test from a sub-section or chapter; questions come without answers"""
+    scopes = [(field, getattr(request, field)) for field in SCOPE_FIELDS if getattr(request, field)]
+    if len(scopes) != 1:
+        raise HTTPException(status_code=400, detail="Provide exactly one of sub_section_id or chapter_id")
+    field, scope_id = scopes[0]
     
-    result = await db.test_results.insert_one(result_dict)
-    result_dict["_id"] = result.inserted_id
+    if request.difficulty_mix:
+        counts = {difficulty: count for difficulty, count in request.difficulty_mix.items() if count}
+        if any(count < 0 for count in counts.values()) or not 0 < sum(counts.values()) <= 100:
+            raise HTTPException(status_code=400, detail="difficulty_mix must ask for 1 to 100 questions")
+    else:
+        counts = {None: request.count}
     
-    return TestResultResponse(
-        id=str(result_dict["_id"]),
-        user_id=result_dict["user_id"],
-        score=result_dict["score"],
-        total_questions=result_dict["total_questions"],
-        correct_answers=result_dict["correct_answers"],
-        percentile=result_dict["percentile"],
-        questions=result_dict["questions"],
-        timestamp=result_dict["timestamp"]
+    session = await SessionService.start(str(current_user["_id"]), field, scope_id, counts)
+    return FastJSONResponse(session)
+
+@router.post("/sessions/{session_id}/submit", response_model=TestResultResponse)
+async def submit_test_session(
+    session_id: str,
+    submission: TestSessionSubmit,
+    current_user: dict = Depends(get_current_user)
+):
+    """Submit the answers of a test session and get results"""
+    result = await SessionService.submit(str(current_user["_id"]), session_id, submission.answers)
+    return FastJSONResponse(result_to_dict(result))
+
+# ==================== HISTORY ====================
+
+@router.get("/history", response_model=List[TestResultSummary])
+async def get_test_history(
+    view: str = Query("summary", regex="^(summary|full)$"),
+    limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get test history for current user, newest first
+
+    The default summary view leaves out the embedded questions; fetch them per
+    attempt from /tests/history/{result_id}, or pass view=full. The next page
+    is requested by sending the X-Next-Cursor response header back as cursor.
+    """
+    db = get_database()
+    summary = view == "summary"
+    page = await paginate(
+        db.test_results, {"user_id": str(current_user["_id"])}, "timestamp", DESCENDING, limit,
+        cursor=cursor, projection=TEST_RESULT_SUMMARY_PROJECTION if summary else None, include_total=False
     )
+    if not summary:
+        await AttemptStorageService.hydrate_many(page["items"])
+    to_dict = result_summary_to_dict if summary else result_to_dict
 
-@router.get("/history", response_model=List[TestResultResponse])
-async def get_test_history(current_user: dict = Depends(get_current_user)):
-    """Get test history for current user"""
+    headers = {"X-Has-More": "true" if page["has_more"] else "false"}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    return FastJSONResponse([to_dict(r) for r in page["items"]], headers=headers)
+
+@router.get("/history/{result_id}", response_model=TestResultResponse)
+async def get_test_result(result_id: str, current_user: dict = Depends(get_current_user)):
+    """Get one attempt of the current user with its questions"""
     db = get_database()
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).sort("timestamp", -1).to_list(100)
     
-    return [TestResultResponse(
-        id=str(r["_id"]),
-        user_id=r["user_id"],
-        score=r["score"],
-        total_questions=r["total_questions"],
-        correct_answers=r["correct_answers"],
-        percentile=r["percentile"],
-        questions=r["questions"],
-        timestamp=r["timestamp"]
-    ) for r in results]
+    try:
+        obj_id = ObjectId(result_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid result ID")
+    
+    result = await db.test_results.find_one({"_id": obj_id, "user_id": str(current_user["_id"])})
+    if not result:
+        raise HTTPException(status_code=404, detail="Test result not found")
+    
+    return FastJSONResponse(result_to_dict(await AttemptStorageService.hydrate(result)))
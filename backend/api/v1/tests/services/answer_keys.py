@@ -0,0 +1,234 @@
+"""
+Answer Key Store - Process-local, array-backed answer keys
+Correct option, marks, negative marks and question type of every question
+are held in typed arrays sorted by ObjectId (15 bytes per question, see
+scripts.benchmark_answer_keys), so checking a practice answer is a binary
+search in memory instead of a database read. Test grading already has the
+question documents and reads the keys from them (key_of): the store can be
+up to a TTL behind edits made in another worker.
+
+The arrays are loaded in the background at startup and reloaded after a
+TTL (writes made by other workers). Writes in this worker discard the
+affected ids; a discarded or unknown id is read through from MongoDB once
+and kept in a small overlay until the next reload.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from array import array
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from bson import ObjectId
+
+from core.config import settings
+from core.database import get_database
+
+logger = logging.getLogger(__name__)
+
+KEY_PROJECTION = {"correct_answer": 1, "marks": 1, "negative_marks": 1, "question_type": 1}
+
+NO_KEY = -1  # stored when a question has no usable correct_answer
+
+
+class AnswerKey(NamedTuple):
+    correct_answer: int
+    marks: float
+    negative_marks: float
+    question_type: str
+
+    def check(self, user_answer: int) -> bool:
+        return self.correct_answer != NO_KEY and user_answer == self.correct_answer
+
+
+def key_of(question: Dict[str, Any]) -> AnswerKey:
+    """Answer key of a question document"""
+    correct = question.get("correct_answer")
+    if type(correct) is float and correct.is_integer():
+        correct = int(correct)
+    return AnswerKey(
+        correct_answer=correct if type(correct) is int and 0 <= correct <= 127 else NO_KEY,
+        marks=float(question.get("marks", 1.0)),
+        negative_marks=float(question.get("negative_marks", 0.0)),
+        question_type=question.get("question_type") or "MCQ-SC"
+    )
+
+
+class AnswerKeyColumns:
+    """
+    Immutable snapshot, ordered by ObjectId: each id split into its first 8
+    and last 4 bytes (so bisect runs on plain arrays), the correct option,
+    and a code into the table of distinct marking schemes (marks, negative
+    marks, question type), of which a bank has a handful
+    """
+
+    def __init__(self):
+        self.ids_high = array("Q")
+        self.ids_low = array("I")
+        self.correct = array("b")
+        self.schemes = array("H")
+        self.scheme_table: List[Tuple[float, float, str]] = []
+        self._scheme_codes: Dict[Tuple[float, float, str], int] = {}
+
+    @staticmethod
+    def split(question_id: ObjectId) -> Tuple[int, int]:
+        binary = question_id.binary
+        return int.from_bytes(binary[:8], "big"), int.from_bytes(binary[8:], "big")
+
+    def append(self, question_id: ObjectId, key: AnswerKey):
+        """Add a key; ids must arrive in ascending order"""
+        scheme = key[1:]
+        code = self._scheme_codes.get(scheme)
+        if code is None:
+            code = self._scheme_codes[scheme] = len(self.scheme_table)
+            self.scheme_table.append(scheme)
+            if code > 0xFFFF and self.schemes.typecode == "H":
+                self.schemes = array("I", self.schemes)
+        high, low = self.split(question_id)
+        self.ids_high.append(high)
+        self.ids_low.append(low)
+        self.correct.append(key.correct_answer)
+        self.schemes.append(code)
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+    def find(self, question_id: ObjectId) -> Optional[AnswerKey]:
+        high, low = self.split(question_id)
+        start = bisect.bisect_left(self.ids_high, high)
+        if start == len(self) or self.ids_high[start] != high:
+            return None
+        # Ids created by one process in the same second share their first 8 bytes
+        end = bisect.bisect_right(self.ids_high, high, start)
+        index = bisect.bisect_left(self.ids_low, low, start, end)
+        if index == end or self.ids_low[index] != low:
+            return None
+        return AnswerKey(self.correct[index], *self.scheme_table[self.schemes[index]])
+
+    def nbytes(self) -> int:
+        """Size of the arrays (the scheme table is negligible)"""
+        return sum(column.itemsize * len(column) for column in (self.ids_high, self.ids_low, self.correct, self.schemes))
+
+
+class AnswerKeyStore:
+    """
+    Answer keys of the whole question bank
+
+    Overlay entries carry the write sequence number they were made at, so
+    a reload that started before a discard does not resurrect the old key.
+    """
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._columns: Optional[AnswerKeyColumns] = None
+        self._loaded_at = 0.0
+        self._loading: Optional[asyncio.Task] = None
+        self._overlay: Dict[bytes, Tuple[int, Optional[AnswerKey]]] = {}
+        self._sequence = 0
+        self.hits = 0
+        self.read_through = 0
+        self.loads = 0
+
+    async def load(self, batch_size: int = 5000) -> int:
+        """
+        (Re)build the arrays from the questions collection
+
+        Returns:
+            Number of keys loaded
+        """
+        started_at = self._sequence
+        columns = AnswerKeyColumns()
+        async for question in get_database().questions.find({}, KEY_PROJECTION).sort("_id", 1).batch_size(batch_size):
+            columns.append(question["_id"], key_of(question))
+
+        self._columns = columns
+        self._loaded_at = time.monotonic()
+        self._overlay = {k: v for k, v in self._overlay.items() if v[0] > started_at}
+        self.loads += 1
+        return len(columns)
+
+    def reload(self) -> asyncio.Task:
+        """Start a background load unless one is running; returns its task"""
+        if self._loading is None or self._loading.done():
+            self._loading = asyncio.create_task(self.load())
+            self._loading.add_done_callback(_on_load_done)
+        return self._loading
+
+    def discard(self, question_ids: Iterable[Any]):
+        """Forget the keys of written (updated, restored or deleted) questions"""
+        for question_id in question_ids:
+            if ObjectId.is_valid(question_id):
+                self._sequence += 1
+                self._overlay[ObjectId(question_id).binary] = (self._sequence, None)
+
+    async def get_many(self, question_ids: Iterable[Any]) -> Dict[str, AnswerKey]:
+        """
+        Answer keys of many questions
+
+        Served from memory; ids missing from the arrays or discarded since
+        the last load are read from MongoDB in one $in query.
+
+        Args:
+            question_ids: Question ids (str or ObjectId)
+
+        Returns:
+            Question id (str) -> key, for the questions that exist
+        """
+        if self._columns is None or time.monotonic() - self._loaded_at > self.ttl_seconds:
+            self.reload()
+
+        keys: Dict[str, AnswerKey] = {}
+        misses: List[ObjectId] = []
+        for question_id in question_ids:
+            if not ObjectId.is_valid(question_id):
+                continue
+            object_id = ObjectId(question_id)
+            overlay = self._overlay.get(object_id.binary)
+            if overlay is not None:
+                key = overlay[1]
+            elif self._columns is not None:
+                key = self._columns.find(object_id)
+            else:
+                key = None
+            if key is None:
+                misses.append(object_id)
+            else:
+                self.hits += 1
+                keys[str(object_id)] = key
+
+        if misses:
+            self.read_through += len(misses)
+            sequence = self._sequence
+            async for question in get_database().questions.find({"_id": {"$in": misses}}, KEY_PROJECTION):
+                key = key_of(question)
+                keys[str(question["_id"])] = key
+                current = self._overlay.get(question["_id"].binary)
+                if current is None or current[0] <= sequence:
+                    self._overlay[question["_id"].binary] = (sequence, key)
+        return keys
+
+    async def get(self, question_id: Any) -> Optional[AnswerKey]:
+        """Answer key of one question (None if it does not exist)"""
+        return (await self.get_many([question_id])).get(str(question_id))
+
+    def stats(self) -> Dict[str, Any]:
+        columns = self._columns
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "loaded": columns is not None,
+            "keys": len(columns) if columns else 0,
+            "bytes": columns.nbytes() if columns else 0,
+            "overlay": len(self._overlay),
+            "hits": self.hits,
+            "read_through": self.read_through,
+            "loads": self.loads
+        }
+
+
+def _on_load_done(task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        logger.error(f"Answer key load failed: {task.exception()}")
+
+
+# Global instance
+answer_keys = AnswerKeyStore(ttl_seconds=settings.ANSWER_KEY_TTL_SECONDS)
@@ -0,0 +1,200 @@
+"""
+Attempt Storage - Compact answered-question entries in test_results
+Each entry keeps only question_id, user_answer, is_correct and the marks
+awarded; question text, options, correct answer and explanation are
+hydrated from the question bank (or the latest version snapshot of a
+deleted question) when a result is read, so edits reach old attempts.
+Entries that could not be resolved when compacted keep their embedded copy.
+"""
+from typing import Any, Dict, List, Optional
+
+import bson
+from bson import ObjectId
+from pymongo import ASCENDING, UpdateOne
+
+from core.database import get_database
+from api.v1.tests.services.answer_keys import AnswerKey, key_of
+
+# Fields an embedded (pre-compaction) entry copied from the question
+EMBEDDED_FIELDS = ("question_text", "options", "correct_answer", "explanation")
+# Also carries the marking scheme, used when compacting an embedded entry
+HYDRATION_PROJECTION = {field: 1 for field in EMBEDDED_FIELDS + ("marks", "negative_marks")}
+
+UNANSWERED = -1
+
+
+def awarded_marks(key: AnswerKey, user_answer: int, is_correct: bool) -> float:
+    """Marks of one answer: full marks, minus negative marks when wrong, 0 when skipped"""
+    if is_correct:
+        return key.marks
+    if user_answer == UNANSWERED:
+        return 0.0
+    return 0.0 - key.negative_marks
+
+
+def compact_answer(question_id: str, key: AnswerKey, user_answer: int) -> Dict[str, Any]:
+    """Stored form of an answered question, graded against its answer key"""
+    is_correct = key.check(user_answer)
+    return {
+        "question_id": question_id,
+        "user_answer": user_answer,
+        "is_correct": is_correct,
+        "marks": awarded_marks(key, user_answer, is_correct)
+    }
+
+
+def full_answer(question: Optional[Dict[str, Any]], entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Response form of an answered question (the shape results used to embed)"""
+    question = question or {}
+    answer = {
+        "question_id": entry["question_id"],
+        "question_text": question.get("question_text", ""),
+        "options": question.get("options", []),
+        "user_answer": entry.get("user_answer"),
+        "correct_answer": question.get("correct_answer"),
+        "is_correct": entry.get("is_correct", False),
+        "explanation": question.get("explanation", "")
+    }
+    if "marks" in entry:
+        answer["marks"] = entry["marks"]
+    return answer
+
+
+def is_compact(entry: Dict[str, Any]) -> bool:
+    return "question_text" not in entry
+
+
+class AttemptStorageService:
+    """Service encoding and hydrating the questions of test results"""
+
+    @staticmethod
+    async def resolve_questions(question_ids: List[str], batch_size: int = 1000) -> Dict[str, Dict[str, Any]]:
+        """
+        Question content for hydration, by id
+
+        Questions missing from the bank fall back to their latest snapshot
+        in question_versions.
+
+        Args:
+            question_ids: Question ids (duplicates and invalid ids are ignored)
+            batch_size: Ids per $in query
+
+        Returns:
+            Question id -> document with the EMBEDDED_FIELDS
+        """
+        db = get_database()
+        object_ids = list({ObjectId(qid) for qid in question_ids if ObjectId.is_valid(qid)})
+        questions: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(object_ids), batch_size):
+            async for question in db.questions.find(
+                {"_id": {"$in": object_ids[start:start + batch_size]}}, HYDRATION_PROJECTION
+            ):
+                questions[str(question["_id"])] = question
+
+        missing = list({qid for qid in question_ids if qid not in questions})
+        for start in range(0, len(missing), batch_size):
+            snapshots = await db.question_versions.aggregate([
+                {"$match": {"question_id": {"$in": missing[start:start + batch_size]}}},
+                {"$sort": {"version_number": -1}},
+                {"$group": {"_id": "$question_id", "snapshot": {"$first": "$snapshot"}}}
+            ]).to_list(None)
+            for row in snapshots:
+                questions[row["_id"]] = row["snapshot"]
+        return questions
+
+    @staticmethod
+    async def hydrate_many(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Expand the compact entries of many results in place, with one lookup
+
+        Args:
+            results: test_results documents (with their questions field)
+
+        Returns:
+            The same documents, every entry in the full response form
+        """
+        question_ids = [
+            entry["question_id"]
+            for result in results for entry in result.get("questions", []) if is_compact(entry)
+        ]
+        questions = await AttemptStorageService.resolve_questions(question_ids) if question_ids else {}
+
+        for result in results:
+            result["questions"] = [
+                full_answer(questions.get(entry["question_id"]), entry) if is_compact(entry) else entry
+                for entry in result.get("questions", [])
+            ]
+        return results
+
+    @staticmethod
+    async def hydrate(result: Dict[str, Any]) -> Dict[str, Any]:
+        """hydrate_many() for a single result"""
+        return (await AttemptStorageService.hydrate_many([result]))[0]
+
+    @staticmethod
+    async def migrate(batch_size: int = 500, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Rewrite results that still embed question content into the compact form
+
+        Runs online: results are read in _id order, batch by batch, and each
+        batch is written with one unordered bulk_write. Entries whose
+        question is neither in the bank nor in question_versions keep their
+        embedded copy. Safe to re-run; compacted results are skipped.
+
+        Args:
+            batch_size: Results per cursor batch and per bulk_write
+            dry_run: Measure the savings without writing
+
+        Returns:
+            Results scanned and rewritten, entries kept embedded, and BSON
+            bytes before/after for the rewritten results
+        """
+        db = get_database()
+        summary = {"scanned": 0, "compacted": 0, "kept_embedded": 0, "bytes_before": 0, "bytes_after": 0}
+        query = {"questions.question_text": {"$exists": True}}
+
+        async def flush(batch: List[Dict[str, Any]]):
+            questions = await AttemptStorageService.resolve_questions([
+                entry["question_id"]
+                for result in batch for entry in result["questions"] if not is_compact(entry)
+            ])
+            operations = []
+            for result in batch:
+                entries = []
+                for entry in result["questions"]:
+                    question = questions.get(entry["question_id"])
+                    if is_compact(entry):
+                        entries.append(entry)
+                    elif question is None:
+                        entries.append(entry)
+                        summary["kept_embedded"] += 1
+                    else:
+                        user_answer = entry.get("user_answer", UNANSWERED)
+                        is_correct = entry.get("is_correct", False)
+                        entries.append({
+                            "question_id": entry["question_id"],
+                            "user_answer": user_answer,
+                            "is_correct": is_correct,
+                            "marks": awarded_marks(key_of(question), user_answer, is_correct)
+                        })
+                if entries == result["questions"]:
+                    continue
+                summary["compacted"] += 1
+                summary["bytes_before"] += len(bson.encode(result))
+                summary["bytes_after"] += len(bson.encode({**result, "questions": entries}))
+                operations.append(UpdateOne({"_id": result["_id"]}, {"$set": {"questions": entries}}))
+
+            if operations and not dry_run:
+                await db.test_results.bulk_write(operations, ordered=False)
+
+        batch: List[Dict[str, Any]] = []
+        async for result in db.test_results.find(query).sort("_id", ASCENDING).batch_size(batch_size):
+            summary["scanned"] += 1
+            batch.append(result)
+            if len(batch) >= batch_size:
+                await flush(batch)
+                batch = []
+        if batch:
+            await flush(batch)
+
+        return summary
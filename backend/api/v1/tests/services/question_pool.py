@@ -0,0 +1,134 @@
+"""
+Question Pool Cache - Process-local id pools for drawing tests
+For each scope (a sub-section or chapter) the active question ids are kept
+in memory, bucketed by difficulty, so a random draw of k questions costs
+O(k) instead of a collection scan. Pools load lazily from the ancestor-id
+indexes, expire after a TTL and are dropped on every question write that
+can change them (insert, update, delete, (de)activation); the draw is
+still validated for writes made by other processes.
+"""
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from core.config import settings
+from core.database import get_database
+
+# Question fields a test can be drawn from
+SCOPE_FIELDS = ("sub_section_id", "chapter_id")
+
+ACTIVE = {"is_active": {"$ne": False}}
+
+
+class QuestionPoolCache:
+    """
+    LRU of per-scope id pools
+
+    invalidate() bumps a version instead of clearing, so a pool loading
+    concurrently with a write is reloaded on its next use.
+    """
+
+    def __init__(self, ttl_seconds: int, max_pools: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_pools = max_pools
+        self._version = 0
+        self._pools: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.loads = 0
+
+    def invalidate(self):
+        """Mark every pool as stale (e.g. after questions were inserted)"""
+        self._version += 1
+
+    def discard(self, field: str, scope_id: str):
+        """Drop one pool"""
+        self._pools.pop((field, scope_id), None)
+
+    def _is_stale(self, pool: Optional[Dict[str, Any]]) -> bool:
+        return (
+            pool is None
+            or pool["version"] != self._version
+            or time.monotonic() - pool["loaded_at"] > self.ttl_seconds
+        )
+
+    async def pool(self, field: str, scope_id: str) -> Dict[Optional[str], List[ObjectId]]:
+        """
+        Active question ids of a scope, by difficulty
+
+        Args:
+            field: One of SCOPE_FIELDS
+            scope_id: Sub-section or chapter id
+
+        Returns:
+            Difficulty -> ids, plus None -> every id (treat as read-only)
+        """
+        key = (field, scope_id)
+        pool = self._pools.get(key)
+        if not self._is_stale(pool):
+            self.hits += 1
+            self._pools.move_to_end(key)
+            return pool["by_difficulty"]
+
+        version = self._version
+        by_difficulty: Dict[Optional[str], List[ObjectId]] = {None: []}
+        async for question in get_database().questions.find({field: scope_id, **ACTIVE}, {"difficulty": 1}):
+            by_difficulty.setdefault(question.get("difficulty") or "", []).append(question["_id"])
+            by_difficulty[None].append(question["_id"])
+
+        self._pools[key] = {"version": version, "loaded_at": time.monotonic(), "by_difficulty": by_difficulty}
+        self._pools.move_to_end(key)
+        while len(self._pools) > self.max_pools:
+            self._pools.popitem(last=False)
+        self.loads += 1
+        return by_difficulty
+
+    async def draw(self, field: str, scope_id: str, counts: Dict[Optional[str], int]) -> List[ObjectId]:
+        """
+        Draw distinct random question ids from a scope
+
+        Args:
+            field: One of SCOPE_FIELDS
+            scope_id: Sub-section or chapter id
+            counts: Difficulty -> number of questions; the key None draws
+                from every difficulty
+
+        Returns:
+            Shuffled question ids
+
+        Raises:
+            HTTPException 400 if a difficulty has fewer questions than requested
+        """
+        pool = await self.pool(field, scope_id)
+        drawn: List[ObjectId] = []
+        for difficulty, count in counts.items():
+            candidates = pool.get(difficulty, [])
+            if count > len(candidates):
+                label = f"{difficulty} questions" if difficulty else "questions"
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Not enough {label} in this scope (requested {count}, available {len(candidates)})"
+                )
+            drawn.extend(random.sample(candidates, count))
+        random.shuffle(drawn)
+        return drawn
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ttl_seconds": self.ttl_seconds,
+            "max_pools": self.max_pools,
+            "hits": self.hits,
+            "loads": self.loads,
+            "pools": len(self._pools),
+            "question_ids": sum(len(pool["by_difficulty"][None]) for pool in self._pools.values())
+        }
+
+
+# Global instance
+question_pools = QuestionPoolCache(
+    ttl_seconds=settings.QUESTION_POOL_TTL_SECONDS,
+    max_pools=settings.QUESTION_POOL_MAX_SCOPES
+)
@@ -0,0 +1,194 @@
+"""
+Score Distribution Service - Incrementally maintained test score histograms
+One document per scope (global, exam, subject) holding bucketed counts that
+every submission bumps with $inc, so the percentiles of a result (overall,
+within its exam and within its subject) are one read
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from core.database import get_database
+from api.v1.content.services.hierarchy_cache import content_cache
+
+# Scores are percentages (0-100) kept at 0.1 resolution: buckets 0..1000
+BUCKETS_PER_POINT = 10
+MAX_BUCKET = 100 * BUCKETS_PER_POINT
+
+GLOBAL_SCOPE = "global"
+
+
+def bucket_of(score: float) -> int:
+    """Histogram bucket holding a score"""
+    return min(max(int(round(score * BUCKETS_PER_POINT, 6)), 0), MAX_BUCKET)
+
+
+def _share_below(distribution: Optional[Dict[str, Any]], score: float) -> float:
+    """Percent of a distribution's scores strictly below `score` (50.0 when it is empty)"""
+    if not distribution or not distribution.get("total"):
+        return 50.0
+    target = bucket_of(score)
+    lower = sum(count for bucket, count in distribution["buckets"].items() if int(bucket) < target)
+    return lower / distribution["total"] * 100
+
+
+def scope_keys(exam_id: Optional[str] = None, subject_id: Optional[str] = None) -> List[str]:
+    """Distribution documents a result counts towards"""
+    keys = [GLOBAL_SCOPE]
+    if exam_id:
+        keys.append(f"exam:{exam_id}")
+    if subject_id:
+        keys.append(f"subject:{subject_id}")
+    return keys
+
+
+class ScoreDistributionService:
+    """Service for the score_distributions collection"""
+
+    @staticmethod
+    async def resolve_scope(questions: Iterable[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+        """
+        Exam and subject shared by every question of a test
+
+        Args:
+            questions: Question documents of the test
+
+        Returns:
+            {"exam_id", "subject_id"}; a level is None when the questions
+            span several entities (or are not linked to the hierarchy)
+        """
+        exam_ids = set()
+        subject_ids = set()
+        for sub_section_id in {q.get("sub_section_id") for q in questions}:
+            chain = await content_cache.ancestors("sub_sections", sub_section_id)
+            exam_ids.add(str(chain["exams"]["_id"]) if "exams" in chain else None)
+            subject_ids.add(str(chain["subjects"]["_id"]) if "subjects" in chain else None)
+
+        return {
+            "exam_id": exam_ids.pop() if len(exam_ids) == 1 else None,
+            "subject_id": subject_ids.pop() if len(subject_ids) == 1 else None
+        }
+
+    @staticmethod
+    async def percentile(score: float, scope: str = GLOBAL_SCOPE) -> float:
+        """
+        Share of recorded scores strictly below `score`
+
+        Args:
+            score: Score in percent
+            scope: Distribution key (see scope_keys)
+
+        Returns:
+            Percentile in percent, 50.0 when nothing has been recorded yet
+        """
+        db = get_database()
+        return _share_below(await db.score_distributions.find_one({"_id": scope}), score)
+
+    @staticmethod
+    async def percentiles(
+        score: float,
+        exam_id: Optional[str] = None,
+        subject_id: Optional[str] = None
+    ) -> Dict[str, Optional[float]]:
+        """
+        Percentile of a score overall and within its exam and subject, in one query
+
+        Args:
+            score: Score in percent
+            exam_id: Exam scope of the test (see resolve_scope), if any
+            subject_id: Subject scope of the test, if any
+
+        Returns:
+            percentile, exam_percentile and subject_percentile (None for a
+            scope the test does not have)
+        """
+        db = get_database()
+        keys = scope_keys(exam_id, subject_id)
+        distributions = {
+            distribution["_id"]: distribution
+            async for distribution in db.score_distributions.find({"_id": {"$in": keys}})
+        }
+        names = {
+            GLOBAL_SCOPE: "percentile",
+            f"exam:{exam_id}": "exam_percentile",
+            f"subject:{subject_id}": "subject_percentile"
+        }
+        result: Dict[str, Optional[float]] = {name: None for name in names.values()}
+        for key in keys:
+            result[names[key]] = _share_below(distributions.get(key), score)
+        return result
+
+    @staticmethod
+    async def record(score: float, scopes: List[str]):
+        """
+        Count one result in every scope
+
+        Args:
+            score: Score in percent
+            scopes: Distribution keys (see scope_keys)
+        """
+        db = get_database()
+        increment = {"total": 1, f"buckets.{bucket_of(score)}": 1}
+        await db.score_distributions.bulk_write(
+            [UpdateOne({"_id": scope}, {"$inc": increment}, upsert=True) for scope in scopes],
+            ordered=False
+        )
+
+    @staticmethod
+    async def rebuild(batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Recompute every distribution from test_results
+
+        Results saved before scopes were stored on them are resolved through
+        their questions and back-filled with exam_id/subject_id. Submissions
+        made while it runs may be dropped, so run it during low traffic.
+
+        Args:
+            batch_size: Results processed per round trip
+
+        Returns:
+            Number of results counted and of scopes written
+        """
+        db = get_database()
+        histograms: Dict[str, Dict[str, int]] = {}
+        totals: Dict[str, int] = {}
+        counted = 0
+
+        cursor = db.test_results.find(
+            {}, {"score": 1, "exam_id": 1, "subject_id": 1, "questions.question_id": 1}
+        ).batch_size(batch_size)
+        backfill: List[UpdateOne] = []
+
+        async for result in cursor:
+            if "exam_id" not in result:
+                question_ids = [q["question_id"] for q in result.get("questions", [])]
+                questions = await db.questions.find(
+                    {"_id": {"$in": [ObjectId(qid) for qid in question_ids if ObjectId.is_valid(qid)]}},
+                    {"sub_section_id": 1}
+                ).to_list(None)
+                scope = await ScoreDistributionService.resolve_scope(questions) if questions else {"exam_id": None, "subject_id": None}
+                result.update(scope)
+                backfill.append(UpdateOne({"_id": result["_id"]}, {"$set": scope}))
+                if len(backfill) >= batch_size:
+                    await db.test_results.bulk_write(backfill, ordered=False)
+                    backfill = []
+
+            bucket = str(bucket_of(result.get("score", 0)))
+            for key in scope_keys(result.get("exam_id"), result.get("subject_id")):
+                buckets = histograms.setdefault(key, {})
+                buckets[bucket] = buckets.get(bucket, 0) + 1
+                totals[key] = totals.get(key, 0) + 1
+            counted += 1
+
+        if backfill:
+            await db.test_results.bulk_write(backfill, ordered=False)
+
+        await db.score_distributions.delete_many({})
+        if histograms:
+            await db.score_distributions.insert_many([
+                {"_id": key, "total": totals[key], "buckets": buckets}
+                for key, buckets in histograms.items()
+            ])
+
+        return {"results": counted, "scopes": len(histograms)}
@@ -0,0 +1,209 @@
+"""
+Session Service - Server-drawn tests and grading
+A session stores the drawn question ids (as ObjectIds) and expires through
+a TTL index on expires_at; the client receives the questions without their
+answers and submits against the session, so answer keys never leave the
+server before grading.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+
+from core.config import settings
+from core.database import get_database
+from core.serialization import question_to_dict
+from api.v1.tests.services.answer_keys import key_of
+from api.v1.tests.services.attempt_storage import compact_answer, full_answer
+from api.v1.tests.services.question_pool import question_pools, ACTIVE
+from api.v1.tests.services.score_distribution import ScoreDistributionService, scope_keys
+from api.v1.user.services.user_stats_service import UserStatsService
+from api.v1.user.services.leaderboard_service import LeaderboardService
+
+# Question fields withheld until the session is submitted
+ANSWER_FIELDS = ("correct_answer", "explanation", "solution")
+
+# Draw attempts before giving up when the pool turns out to be stale
+DRAW_ATTEMPTS = 2
+
+
+def question_for_session(question: Dict[str, Any]) -> Dict[str, Any]:
+    """QuestionResponse shape without the answer fields"""
+    data = question_to_dict(question)
+    for field in ANSWER_FIELDS:
+        data.pop(field, None)
+    return data
+
+
+class SessionService:
+    """Service for test_sessions and test grading"""
+
+    @staticmethod
+    async def grade(
+        user_id: str,
+        questions: List[Dict[str, Any]],
+        answers: List[int],
+        extra: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Grade a test, store its result and update the derived read models
+
+        Correctness and marks come from the question documents themselves
+        (not the answer key store, which may hold a key another process has
+        since corrected); they are also needed for the response, the
+        percentile scope and the user stats rollups.
+
+        Args:
+            user_id: User id
+            questions: Question documents, in the order they were answered
+            answers: Chosen option indices (-1 when skipped), aligned with questions
+            extra: Additional fields stored on the result (e.g. session_id)
+
+        Returns:
+            The stored result with its questions in the full response form
+        """
+        db = get_database()
+        question_ids = [str(q["_id"]) for q in questions]
+        entries = [
+            compact_answer(qid, key_of(question), answer)
+            for qid, question, answer in zip(question_ids, questions, answers)
+        ]
+        correct_count = sum(entry["is_correct"] for entry in entries)
+
+        score = (correct_count / len(questions)) * 100
+
+        # Percentiles (overall, in the test's exam and subject) from the maintained score histograms
+        scope = await ScoreDistributionService.resolve_scope(questions)
+        percentiles = await ScoreDistributionService.percentiles(score, **scope)
+
+        result_dict = {
+            "user_id": user_id,
+            "score": score,
+            "total_questions": len(questions),
+            "correct_answers": correct_count,
+            **percentiles,
+            "questions": entries,
+            "exam_id": scope["exam_id"],
+            "subject_id": scope["subject_id"],
+            "timestamp": datetime.utcnow(),
+            **(extra or {})
+        }
+
+        result = await db.test_results.insert_one(result_dict)
+        result_dict["_id"] = result.inserted_id
+        await ScoreDistributionService.record(score, scope_keys(**scope))
+        await UserStatsService.record_test(
+            user_id, questions, [entry["is_correct"] for entry in entries], score, result_dict["timestamp"]
+        )
+        await LeaderboardService.record(user_id, score, result_dict["timestamp"], **scope)
+
+        result_dict["questions"] = [full_answer(q, entry) for q, entry in zip(questions, entries)]
+        return result_dict
+
+    @staticmethod
+    async def start(user_id: str, field: str, scope_id: str, counts: Dict[Optional[str], int]) -> Dict[str, Any]:
+        """
+        Draw a test from a scope and open a session for it
+
+        Args:
+            user_id: User id
+            field: "sub_section_id" or "chapter_id"
+            scope_id: Sub-section or chapter id
+            counts: Difficulty -> number of questions (None for any difficulty)
+
+        Returns:
+            session_id, expires_at and the questions without their answers
+        """
+        db = get_database()
+        for _ in range(DRAW_ATTEMPTS):
+            question_ids = await question_pools.draw(field, scope_id, counts)
+            found = await db.questions.find(
+                {"_id": {"$in": question_ids}, field: scope_id, **ACTIVE}
+            ).to_list(len(question_ids))
+
+            drawn = Counter(q.get("difficulty") or "" for q in found)
+            if len(found) == len(question_ids) and all(
+                difficulty is None or drawn[difficulty] == count for difficulty, count in counts.items()
+            ):
+                break
+            # A question was deleted, deactivated, moved or re-graded since the pool loaded
+            question_pools.discard(field, scope_id)
+        else:
+            raise HTTPException(status_code=409, detail="Questions changed while drawing the test, please retry")
+
+        by_id = {q["_id"]: q for q in found}
+        now = datetime.utcnow()
+        session = {
+            "user_id": user_id,
+            "scope_field": field,
+            "scope_id": scope_id,
+            "question_ids": question_ids,
+            "created_at": now,
+            "expires_at": now + timedelta(minutes=settings.TEST_SESSION_TTL_MINUTES)
+        }
+        result = await db.test_sessions.insert_one(session)
+
+        return {
+            "session_id": str(result.inserted_id),
+            "expires_at": session["expires_at"],
+            "questions": [question_for_session(by_id[qid]) for qid in question_ids]
+        }
+
+    @staticmethod
+    async def submit(user_id: str, session_id: str, answers: List[int]) -> Dict[str, Any]:
+        """
+        Grade the answers of a session (once)
+
+        The session is claimed by setting submitted_at before grading; if
+        grading fails before the result is stored, the claim is released.
+
+        Args:
+            user_id: Owner of the session
+            session_id: Session id
+            answers: Chosen option indices, in the order the questions were served
+
+        Returns:
+            The stored result (see grade)
+        """
+        db = get_database()
+        try:
+            obj_id = ObjectId(session_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid session ID")
+
+        now = datetime.utcnow()
+        session = await db.test_sessions.find_one({"_id": obj_id, "user_id": user_id})
+        if not session or session["expires_at"] <= now:
+            raise HTTPException(status_code=404, detail="Test session not found or expired")
+        if session.get("submitted_at"):
+            raise HTTPException(status_code=409, detail="Test session already submitted")
+        if len(answers) != len(session["question_ids"]):
+            raise HTTPException(status_code=400, detail="Mismatch between questions and answers")
+
+        found = await db.questions.find({"_id": {"$in": session["question_ids"]}}).to_list(len(answers))
+        by_id = {q["_id"]: q for q in found}
+        if len(by_id) != len(session["question_ids"]):
+            raise HTTPException(status_code=409, detail="Some questions of this session were deleted")
+
+        claimed = await db.test_sessions.update_one(
+            {"_id": obj_id, "submitted_at": {"$exists": False}},
+            {"$set": {"submitted_at": now}}
+        )
+        if claimed.modified_count == 0:
+            raise HTTPException(status_code=409, detail="Test session already submitted")
+
+        try:
+            result = await SessionService.grade(
+                user_id, [by_id[qid] for qid in session["question_ids"]], answers, extra={"session_id": session_id}
+            )
+        except Exception:
+            # Release the claim so the answers can be sent again, unless the result was stored
+            if not await db.test_results.find_one({"user_id": user_id, "session_id": session_id}, {"_id": 1}):
+                await db.test_sessions.update_one(
+                    {"_id": obj_id, "submitted_at": now}, {"$unset": {"submitted_at": ""}}
+                )
+            raise
+        await db.test_sessions.update_one({"_id": obj_id}, {"$set": {"result_id": str(result["_id"])}})
+        return result
@@ -1,36 +1,36 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from datetime import datetime
 from bson import ObjectId
-from typing import List
-import os
-import google.generativeai as genai
+from typing import List, Optional
 
 from api.v1.user.models import (
     BookmarkCreate, BookmarkResponse, AnalyticsResponse,
     ProfileUpdate, ExamSelectionUpdate, UserProfileResponse
 )
-from core.security import get_current_user
+from core.security import get_current_user, user_cache
 from core.database import get_database
+from core.export import (
+    stream_export, date_range_query, test_result_row,
+    TEST_RESULT_EXPORT_FIELDS, TEST_RESULT_EXPORT_PROJECTION
+)
+from api.v1.content.services.hierarchy_cache import content_cache
+from api.v1.user.services.recommendation_service import RecommendationService
+from api.v1.user.services.user_stats_service import UserStatsService
+from api.v1.user.services.bookmark_service import BookmarkService
+from api.v1.user.services.leaderboard_service import LeaderboardService, PERIODS, SCOPES, board_id
 
 router = APIRouter(tags=["user"])
 
-# Configure Gemini AI for recommendations
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if gemini_api_key:
-    genai.configure(api_key=gemini_api_key)
-
 # ==================== USER PROFILE (with /user prefix) ====================
 
 @router.get("/user/profile", response_model=UserProfileResponse)
 async def get_user_profile(current_user: dict = Depends(get_current_user)):
     """Get user profile with selected exam details"""
-    db = get_database()
-    
     # Get selected exam name if exists
     selected_exam_name = None
     if current_user.get("selected_exam_id"):
         try:
-            exam = await db.exams.find_one({"_id": ObjectId(current_user["selected_exam_id"])})
+            exam = await content_cache.get("exams", current_user["selected_exam_id"])
             if exam:
                 selected_exam_name = exam.get("name")
         except:
@@ -72,6 +72,7 @@ async def update_user_profile(profile: ProfileUpdate, current_user: dict = Depen
             {"_id": current_user["_id"]},
             {"$set": update_data}
         )
+        user_cache.invalidate(current_user["_id"])
     
     # Get updated user
     updated_user = await db.users.find_one({"_id": current_user["_id"]})
@@ -80,7 +81,7 @@ async def update_user_profile(profile: ProfileUpdate, current_user: dict = Depen
     selected_exam_name = None
     if updated_user.get("selected_exam_id"):
         try:
-            exam = await db.exams.find_one({"_id": ObjectId(updated_user["selected_exam_id"])})
+            exam = await content_cache.get("exams", updated_user["selected_exam_id"])
             if exam:
                 selected_exam_name = exam.get("name")
         except:
@@ -102,8 +103,12 @@ async def select_user_exam(exam_selection: ExamSelectionUpdate, current_user: di
     """Update user's selected exam"""
     db = get_database()
     
-    # Verify exam exists
-    exam = await db.exams.find_one({"_id": ObjectId(exam_selection.exam_id)})
+    # Verify exam exists; the cache may predate an exam created by another worker
+    exam = await content_cache.get("exams", exam_selection.exam_id)
+    if not exam and ObjectId.is_valid(exam_selection.exam_id):
+        exam = await db.exams.find_one({"_id": ObjectId(exam_selection.exam_id)}, {"name": 1})
+        if exam:
+            content_cache.invalidate("exams")
     if not exam:
         raise HTTPException(status_code=404, detail="Exam not found")
     
@@ -112,6 +117,7 @@ async def select_user_exam(exam_selection: ExamSelectionUpdate, current_user: di
         {"_id": current_user["_id"]},
         {"$set": {"selected_exam_id": exam_selection.exam_id, "updated_at": datetime.utcnow()}}
     )
+    user_cache.invalidate(current_user["_id"])
     
     return {
         "success": True,
@@ -124,37 +130,14 @@ async def select_user_exam(exam_selection: ExamSelectionUpdate, current_user: di
 
 @router.post("/bookmarks", response_model=BookmarkResponse)
 async def create_bookmark(bookmark: BookmarkCreate, current_user: dict = Depends(get_current_user)):
-    """Create a bookmark"""
-    db = get_database()
-    
-    # Check if already bookmarked
-    existing = await db.bookmarks.find_one({
-        "user_id": str(current_user["_id"]),
-        "question_id": bookmark.question_id
-    })
-    
-    if existing:
-        return BookmarkResponse(
-            id=str(existing["_id"]),
-            user_id=existing["user_id"],
-            question_id=existing["question_id"],
-            created_at=existing["created_at"]
-        )
-    
-    bookmark_dict = {
-        "user_id": str(current_user["_id"]),
-        "question_id": bookmark.question_id,
-        "created_at": datetime.utcnow()
-    }
-    
-    result = await db.bookmarks.insert_one(bookmark_dict)
-    bookmark_dict["_id"] = result.inserted_id
+    """Create a bookmark (returns the existing one if the question is already bookmarked)"""
+    existing = await BookmarkService.add(str(current_user["_id"]), bookmark.question_id)
     
     return BookmarkResponse(
-        id=str(bookmark_dict["_id"]),
-        user_id=bookmark_dict["user_id"],
-        question_id=bookmark_dict["question_id"],
-        created_at=bookmark_dict["created_at"]
+        id=str(existing["_id"]),
+        user_id=existing["user_id"],
+        question_id=existing["question_id"],
+        created_at=existing["created_at"]
     )
 
 @router.get("/bookmarks", response_model=List[BookmarkResponse])
@@ -189,12 +172,10 @@ async def delete_bookmark(bookmark_id: str, current_user: dict = Depends(get_cur
 @router.get("/analytics/performance", response_model=AnalyticsResponse)
 async def get_user_analytics(current_user: dict = Depends(get_current_user)):
     """Get user performance analytics"""
-    db = get_database()
-    
-    # Get all test results for user
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).to_list(1000)
+    stats = await UserStatsService.get(str(current_user["_id"]))
+    total_tests, average_score = UserStatsService.summary(stats)
     
-    if not results:
+    if not total_tests:
         return AnalyticsResponse(
             user_id=str(current_user["_id"]),
             total_tests=0,
@@ -204,10 +185,6 @@ async def get_user_analytics(current_user: dict = Depends(get_current_user)):
             improvement_suggestions=[]
         )
     
-    # Calculate average score
-    total_tests = len(results)
-    average_score = sum(r["score"] for r in results) / total_tests
-    
     # Simplified topic analysis
     strong_topics = []
     weak_topics = []
@@ -228,167 +205,88 @@ async def get_user_analytics(current_user: dict = Depends(get_current_user)):
         improvement_suggestions=suggestions
     )
 
+@router.get("/analytics/score-trend")
+async def get_score_trend(current_user: dict = Depends(get_current_user)):
+    """Get the user's most recent test scores, oldest first"""
+    stats = await UserStatsService.get(str(current_user["_id"]))
+    return {
+        "trend": [
+            {"score": point["score"], "timestamp": point["timestamp"].isoformat()}
+            for point in stats.get("trend", [])
+        ]
+    }
+
 
 @router.get("/analytics/export")
-async def export_analytics(format: str = "json", current_user: dict = Depends(get_current_user)):
-    """Export user analytics data"""
+async def export_analytics(
+    format: str = Query("json", regex="^(json|csv|ndjson)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Export user test history, streamed from the database cursor"""
     db = get_database()
-    from fastapi.responses import StreamingResponse
-    import io
-    import csv
-    
-    # Get all test results for user
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).to_list(1000)
-    
-    if format == "csv":
-        # Create CSV
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(["Test ID", "Date", "Score", "Total Questions", "Correct Answers", "Percentile"])
-        
-        # Write data
-        for result in results:
-            writer.writerow([
-                str(result["_id"]),
-                result["timestamp"].strftime("%Y-%m-%d %H:%M:%S"),
-                result["score"],
-                result["total_questions"],
-                result["correct_answers"],
-                result["percentile"]
-            ])
-        
-        output.seek(0)
-        return StreamingResponse(
-            iter([output.getvalue()]),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename=analytics_export.csv"}
-        )
-    else:
-        # Return JSON
-        return {
-            "user_id": str(current_user["_id"]),
+    user_id = str(current_user["_id"])
+    query = {"user_id": user_id, **date_range_query("timestamp", start_date, end_date)}
+
+    document = None
+    if format == "json":
+        document = {
+            "user_id": user_id,
             "export_date": datetime.utcnow().isoformat(),
-            "total_tests": len(results),
-            "tests": [
-                {
-                    "test_id": str(r["_id"]),
-                    "timestamp": r["timestamp"].isoformat(),
-                    "score": r["score"],
-                    "total_questions": r["total_questions"],
-                    "correct_answers": r["correct_answers"],
-                    "percentile": r["percentile"]
-                } for r in results
-            ]
+            "total_tests": await db.test_results.count_documents(query)
         }
 
+    cursor = db.test_results.find(query, TEST_RESULT_EXPORT_PROJECTION).sort("timestamp", -1)
+    return stream_export(
+        cursor, format, TEST_RESULT_EXPORT_FIELDS, test_result_row, "analytics_export",
+        document=document, path=("tests",)
+    )
+
 
 # ==================== LEADERBOARD ====================
 
+def _leaderboard_board(period: str, scope: str, scope_id: Optional[str]) -> str:
+    """Validate leaderboard filters and return the board id"""
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(PERIODS)}")
+    if scope not in SCOPES:
+        raise HTTPException(status_code=400, detail=f"scope must be one of {', '.join(SCOPES)}")
+    if scope != "global" and not scope_id:
+        raise HTTPException(status_code=400, detail="scope_id is required for exam and subject leaderboards")
+    return board_id(period, scope, scope_id)
+
 @router.get("/leaderboard")
-async def get_leaderboard(limit: int = 50):
-    """Get leaderboard"""
-    db = get_database()
-    
-    # Aggregate to get average scores per user
-    pipeline = [
-        {"$group": {
-            "_id": "$user_id",
-            "average_score": {"$avg": "$score"},
-            "total_tests": {"$sum": 1}
-        }},
-        {"$sort": {"average_score": -1}},
-        {"$limit": limit}
-    ]
-    
-    leaderboard_data = await db.test_results.aggregate(pipeline).to_list(limit)
-    
-    # Get user details
-    leaderboard = []
-    for idx, entry in enumerate(leaderboard_data):
-        try:
-            user = await db.users.find_one({"_id": ObjectId(entry["_id"])})
-            if user:
-                leaderboard.append({
-                    "rank": idx + 1,
-                    "user_id": entry["_id"],
-                    "user_email": user.get("email", "Unknown"),
-                    "average_score": round(entry["average_score"], 2),
-                    "total_tests": entry["total_tests"]
-                })
-        except:
-            continue
-    
-    return {"leaderboard": leaderboard}
+async def get_leaderboard(
+    limit: int = 50,
+    period: str = "all_time",
+    scope: str = "global",
+    scope_id: Optional[str] = None
+):
+    """Get leaderboard (period: all_time/weekly/monthly, scope: global/exam/subject)"""
+    board = _leaderboard_board(period, scope, scope_id)
+    return {"leaderboard": await LeaderboardService.top(board, limit)}
+
+@router.get("/leaderboard/me")
+async def get_my_leaderboard_rank(
+    period: str = "all_time",
+    scope: str = "global",
+    scope_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the current user's rank on a leaderboard"""
+    board = _leaderboard_board(period, scope, scope_id)
+    return {
+        "period": period,
+        "scope": scope,
+        "scope_id": scope_id,
+        **await LeaderboardService.rank(board, str(current_user["_id"]))
+    }
 
 # ==================== RECOMMENDATIONS ====================
 
 @router.get("/recommendations/tests")
 async def get_test_recommendations(current_user: dict = Depends(get_current_user)):
     """Get test recommendations based on user performance"""
-    db = get_database()
-    
-    # Get user's test results
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).to_list(100)
-    
-    if not results:
-        # If no history, recommend popular topics
-        popular_topics = await db.topics.find().limit(5).to_list(5)
-        return {
-            "message": "Get started with these popular topics",
-            "recommended_topics": [
-                {
-                    "topic_id": str(t["_id"]),
-                    "topic_name": t["name"],
-                    "reason": "Popular among students"
-                } for t in popular_topics
-            ]
-        }
-    
-    # Analyze weak areas
-    topic_performance = {}
-    for result in results:
-        for q in result.get("questions", []):
-            question = await db.questions.find_one({"_id": ObjectId(q["question_id"])})
-            if question and question.get("topic_id"):
-                topic_id = question["topic_id"]
-                if topic_id not in topic_performance:
-                    topic_performance[topic_id] = {"correct": 0, "total": 0}
-                
-                topic_performance[topic_id]["total"] += 1
-                if q.get("is_correct"):
-                    topic_performance[topic_id]["correct"] += 1
-    
-    # Calculate percentages and identify weak topics
-    topic_scores = []
-    for topic_id, performance in topic_performance.items():
-        percentage = (performance["correct"] / performance["total"]) * 100
-        topic = await db.topics.find_one({"_id": ObjectId(topic_id)})
-        
-        if topic:
-            topic_scores.append({
-                "topic_id": topic_id,
-                "topic_name": topic["name"],
-                "percentage": percentage,
-                "correct": performance["correct"],
-                "total": performance["total"]
-            })
-    
-    topic_scores.sort(key=lambda x: x["percentage"])
-    weak_topics = topic_scores[:3]  # Get 3 weakest topics
-    
-    recommendations = []
-    for weak_topic in weak_topics:
-        recommendations.append({
-            "topic_id": weak_topic["topic_id"],
-            "topic_name": weak_topic["topic_name"],
-            "reason": f"Practice needed - Current accuracy: {weak_topic['percentage']:.1f}%",
-            "current_performance": weak_topic["percentage"]
-        })
-    
-    return {
-        "message": "Based on your performance, we recommend focusing on these topics",
-        "recommended_topics": recommendations
-    }
+    return await RecommendationService.recommend_topics(str(current_user["_id"]))
 
@@ -0,0 +1,146 @@
+"""
+Bookmark Service - Idempotent bookmark writes and bookmark-set filters
+A unique (user_id, question_id) index makes every add an upsert, so batches
+are written with one unordered bulk_write and concurrent adds of the same
+bookmark cannot create duplicates. Question listings filter on the user's
+bookmark set inside the questions query, read covered by that index.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from core.database import get_database
+
+DUPLICATE_KEY = 11000
+
+
+class BookmarkService:
+    """Service for the bookmarks collection"""
+
+    @staticmethod
+    async def add(user_id: str, question_id: str) -> Dict[str, Any]:
+        """
+        Bookmark a question (returns the existing bookmark if there is one)
+
+        Args:
+            user_id: User id
+            question_id: Question id
+
+        Returns:
+            The bookmark document
+        """
+        db = get_database()
+        return await db.bookmarks.find_one_and_update(
+            {"user_id": user_id, "question_id": question_id},
+            {"$setOnInsert": {"created_at": datetime.utcnow()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    @staticmethod
+    async def add_many(user_id: str, question_ids: List[str]) -> int:
+        """
+        Bookmark many questions with one unordered bulk upsert
+
+        Args:
+            user_id: User id
+            question_ids: Question ids (already bookmarked ones are left as is)
+
+        Returns:
+            Number of bookmarks created
+        """
+        if not question_ids:
+            return 0
+        db = get_database()
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "question_id": question_id},
+                {"$setOnInsert": {"created_at": now}},
+                upsert=True
+            )
+            for question_id in dict.fromkeys(question_ids)
+        ]
+        try:
+            result = await db.bookmarks.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent request inserted the same bookmark first
+            if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+                raise
+            return e.details["nUpserted"]
+        return result.upserted_count
+
+    @staticmethod
+    async def remove_many(user_id: str, question_ids: List[str]) -> int:
+        """
+        Remove the bookmarks of many questions
+
+        Returns:
+            Number of bookmarks removed
+        """
+        db = get_database()
+        result = await db.bookmarks.delete_many({"user_id": user_id, "question_id": {"$in": question_ids}})
+        return result.deleted_count
+
+    @staticmethod
+    async def question_ids(user_id: str) -> List[ObjectId]:
+        """Ids of the questions a user bookmarked (a covered index read)"""
+        db = get_database()
+        cursor = db.bookmarks.find({"user_id": user_id}, {"question_id": 1, "_id": 0})
+        return [ObjectId(b["question_id"]) async for b in cursor if ObjectId.is_valid(b["question_id"])]
+
+    @staticmethod
+    async def filter_clause(user_id: str, bookmarked: Optional[bool]) -> Dict[str, Any]:
+        """
+        Questions query clause keeping only (or leaving out) bookmarked questions
+
+        Args:
+            user_id: User id
+            bookmarked: True for bookmarked only, False to exclude them, None for no filter
+
+        Returns:
+            A condition on _id to merge into the questions query (empty for None)
+        """
+        if bookmarked is None:
+            return {}
+        question_ids = await BookmarkService.question_ids(user_id)
+        return {"_id": {"$in" if bookmarked else "$nin": question_ids}}
+
+    @staticmethod
+    async def deduplicate(dry_run: bool = False, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Delete repeated (user_id, question_id) bookmarks, keeping the oldest
+
+        Needed once before the unique index can be built on older data.
+
+        Args:
+            dry_run: Count the duplicates without deleting them
+            batch_size: Bookmark ids per delete_many
+
+        Returns:
+            Duplicated pairs and bookmarks deleted (or to delete)
+        """
+        db = get_database()
+        summary = {"pairs": 0, "deleted": 0}
+        extra_ids: List[ObjectId] = []
+
+        async def flush():
+            if extra_ids and not dry_run:
+                await db.bookmarks.delete_many({"_id": {"$in": extra_ids}})
+            extra_ids.clear()
+
+        async for group in db.bookmarks.aggregate([
+            {"$sort": {"_id": 1}},
+            {"$group": {"_id": {"user_id": "$user_id", "question_id": "$question_id"}, "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}}
+        ], allowDiskUse=True):
+            summary["pairs"] += 1
+            summary["deleted"] += len(group["ids"]) - 1
+            extra_ids.extend(group["ids"][1:])
+            if len(extra_ids) >= batch_size:
+                await flush()
+        await flush()
+        return summary
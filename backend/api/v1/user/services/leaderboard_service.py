@@ -0,0 +1,254 @@
+"""
+Leaderboard Service - Incrementally maintained, scoped leaderboards
+Every submission updates one entry per (board, user), where a board is a
+period bucket (all-time, ISO week, calendar month) crossed with a scope
+(global, exam, subject). Top-N and "my rank" are indexed reads on
+leaderboard_entries; users are hydrated with one $in query. Weekly and
+monthly entries carry an expires_at and are removed by a TTL index once
+their period is over.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import DESCENDING, ReplaceOne, UpdateOne
+
+from core.config import settings
+from core.database import get_database
+
+PERIODS = ("all_time", "weekly", "monthly")
+SCOPES = ("global", "exam", "subject")
+
+
+def period_key(period: str, at: datetime) -> str:
+    """Bucket of a period containing `at` (weeks are ISO weeks)"""
+    if period == "weekly":
+        year, week, _ = at.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "monthly":
+        return f"{at.year}-{at.month:02d}"
+    return "all"
+
+
+def period_end(period: str, at: datetime) -> Optional[datetime]:
+    """End of the period bucket containing `at` (None for all-time)"""
+    day = datetime(at.year, at.month, at.day)
+    if period == "weekly":
+        return day + timedelta(days=7 - day.weekday())
+    if period == "monthly":
+        return datetime(at.year + at.month // 12, at.month % 12 + 1, 1)
+    return None
+
+
+def board_expiry(board: str, at: datetime) -> Optional[datetime]:
+    """When entries of a board are removed: LEADERBOARD_RETENTION_DAYS after its period ends"""
+    end = period_end(board.split(":", 1)[0], at)
+    return end + timedelta(days=settings.LEADERBOARD_RETENTION_DAYS) if end else None
+
+
+def board_id(period: str, scope: str = "global", scope_id: Optional[str] = None, at: Optional[datetime] = None) -> str:
+    """Identifier of a leaderboard, e.g. weekly:2024-W07:exam:<exam_id>"""
+    board = f"{period}:{period_key(period, at or datetime.utcnow())}:{scope}"
+    return f"{board}:{scope_id}" if scope != "global" else board
+
+
+def result_boards(timestamp: datetime, exam_id: Optional[str] = None, subject_id: Optional[str] = None) -> List[str]:
+    """Every board a test result counts towards"""
+    scopes = [("global", None)]
+    if exam_id:
+        scopes.append(("exam", exam_id))
+    if subject_id:
+        scopes.append(("subject", subject_id))
+    return [
+        board_id(period, scope, scope_id, timestamp)
+        for period in PERIODS for scope, scope_id in scopes
+    ]
+
+
+class LeaderboardService:
+    """Service for the leaderboard_entries collection"""
+
+    @staticmethod
+    async def record(
+        user_id: str,
+        score: float,
+        timestamp: datetime,
+        exam_id: Optional[str] = None,
+        subject_id: Optional[str] = None
+    ):
+        """
+        Count a test result on every board it belongs to
+
+        Each entry is updated atomically with a pipeline update that adds the
+        score and recomputes the average, all boards in one bulk_write.
+        Weekly and monthly entries also get their expires_at.
+
+        Args:
+            user_id: User id
+            score: Test score in percent
+            timestamp: Submission time
+            exam_id: Exam shared by the test's questions, if any
+            subject_id: Subject shared by the test's questions, if any
+        """
+        db = get_database()
+        operations = []
+        for board in result_boards(timestamp, exam_id, subject_id):
+            fields = {
+                "board": board,
+                "user_id": user_id,
+                "score_sum": {"$add": [{"$ifNull": ["$score_sum", 0]}, score]},
+                "total_tests": {"$add": [{"$ifNull": ["$total_tests", 0]}, 1]},
+                "updated_at": timestamp
+            }
+            expires_at = board_expiry(board, timestamp)
+            if expires_at:
+                fields["expires_at"] = expires_at
+            operations.append(UpdateOne(
+                {"_id": f"{board}|{user_id}"},
+                [
+                    {"$set": fields},
+                    {"$set": {"average_score": {"$divide": ["$score_sum", "$total_tests"]}}}
+                ],
+                upsert=True
+            ))
+        await db.leaderboard_entries.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    async def hydrate_users(user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Display data of many users in one query"""
+        db = get_database()
+        object_ids = [ObjectId(uid) for uid in user_ids if ObjectId.is_valid(uid)]
+        users = await db.users.find(
+            {"_id": {"$in": object_ids}}, {"email": 1, "name": 1}
+        ).to_list(None)
+        return {str(user["_id"]): user for user in users}
+
+    @staticmethod
+    async def top(board: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Best average scores of a board
+
+        Args:
+            board: Board id (see board_id)
+            limit: Number of entries
+
+        Returns:
+            Ranked entries of users that still exist; ties on the average
+            share a rank, as in rank() (total_tests only orders them)
+        """
+        db = get_database()
+        entries = await db.leaderboard_entries.find({"board": board}).sort(
+            [("average_score", DESCENDING), ("total_tests", DESCENDING)]
+        ).limit(limit).to_list(limit)
+        users = await LeaderboardService.hydrate_users([entry["user_id"] for entry in entries])
+
+        leaderboard = []
+        rank = 0
+        for idx, entry in enumerate(entries):
+            if idx == 0 or entry["average_score"] < entries[idx - 1]["average_score"]:
+                rank = idx + 1
+            user = users.get(entry["user_id"])
+            if user:
+                email = user.get("email", "Unknown")
+                leaderboard.append({
+                    "rank": rank,
+                    "user_id": entry["user_id"],
+                    "user_email": email,
+                    "user_name": user.get("name") or email.split("@")[0],
+                    "average_score": round(entry["average_score"], 2),
+                    "total_tests": entry["total_tests"]
+                })
+        return leaderboard
+
+    @staticmethod
+    async def rank(board: str, user_id: str) -> Dict[str, Any]:
+        """
+        Position of a user on a board (ties share a rank)
+
+        Args:
+            board: Board id (see board_id)
+            user_id: User id
+
+        Returns:
+            rank (None when the user has no result on the board), average
+            score, tests and number of ranked users
+        """
+        db = get_database()
+        total_users = await db.leaderboard_entries.count_documents({"board": board})
+        entry = await db.leaderboard_entries.find_one({"_id": f"{board}|{user_id}"})
+        if not entry:
+            return {"rank": None, "average_score": None, "total_tests": 0, "total_users": total_users}
+
+        ahead = await db.leaderboard_entries.count_documents({
+            "board": board,
+            "average_score": {"$gt": entry["average_score"]}
+        })
+        return {
+            "rank": ahead + 1,
+            "average_score": round(entry["average_score"], 2),
+            "total_tests": entry["total_tests"],
+            "total_users": total_users
+        }
+
+    @staticmethod
+    async def rebuild(batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Recompute every board from test_results
+
+        Uses the exam_id/subject_id stored on results (back-filled by
+        scripts.rebuild_score_distributions). Entries are replaced in place,
+        so boards stay readable while it runs, and entries no result counts
+        towards any more are deleted afterwards. Entries of periods whose
+        retention has passed are not written. A submission made while it
+        runs can still be overwritten by the recomputed entry, so run it
+        during low traffic.
+
+        Returns:
+            Number of results counted and entries written
+        """
+        db = get_database()
+        entries: Dict[str, Dict[str, Any]] = {}
+        counted = 0
+        started_at = datetime.utcnow()
+
+        async for result in db.test_results.find(
+            {}, {"user_id": 1, "score": 1, "timestamp": 1, "exam_id": 1, "subject_id": 1}
+        ).batch_size(batch_size):
+            timestamp = result.get("timestamp") or started_at
+            for board in result_boards(timestamp, result.get("exam_id"), result.get("subject_id")):
+                expires_at = board_expiry(board, timestamp)
+                if expires_at and expires_at <= started_at:
+                    continue
+                key = f"{board}|{result['user_id']}"
+                entry = entries.setdefault(key, {
+                    "_id": key,
+                    "board": board,
+                    "user_id": result["user_id"],
+                    "score_sum": 0,
+                    "total_tests": 0,
+                    "updated_at": timestamp
+                })
+                if expires_at:
+                    entry["expires_at"] = expires_at
+                entry["score_sum"] += result.get("score", 0)
+                entry["total_tests"] += 1
+                entry["updated_at"] = max(entry["updated_at"], timestamp)
+            counted += 1
+
+        documents = list(entries.values())
+        for document in documents:
+            document["average_score"] = document["score_sum"] / document["total_tests"]
+            document["rebuilt_at"] = started_at
+        for start in range(0, len(documents), batch_size):
+            await db.leaderboard_entries.bulk_write([
+                ReplaceOne({"_id": document["_id"]}, document, upsert=True)
+                for document in documents[start:start + batch_size]
+            ], ordered=False)
+
+        # Stale: not rebuilt now, and not recorded by a submission since the rebuild started
+        await db.leaderboard_entries.delete_many({
+            "rebuilt_at": {"$ne": started_at},
+            "updated_at": {"$lt": started_at}
+        })
+
+        return {"results": counted, "entries": len(documents)}
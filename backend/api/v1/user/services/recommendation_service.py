@@ -0,0 +1,127 @@
+"""
+Recommendation Service - Weak-topic recommendations from test history
+Resolves every answered question in $in batches and topics from the
+content hierarchy cache, so the number of round trips depends on how many
+distinct questions a user answered, not on how many answers they gave
+"""
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+from core.database import get_database
+from api.v1.content.services.hierarchy_cache import content_cache
+
+# Question ids per $in query
+QUESTION_BATCH_SIZE = 1000
+
+
+class RecommendationService:
+    """Service for performance-based topic recommendations"""
+
+    @staticmethod
+    async def get_question_topics(question_ids: List[str]) -> Dict[str, str]:
+        """
+        Map question id -> topic id for the questions that have one
+
+        Args:
+            question_ids: Question ids (invalid ids are ignored)
+
+        Returns:
+            Topic id of each question linked to a topic
+        """
+        db = get_database()
+        object_ids = [ObjectId(qid) for qid in question_ids if ObjectId.is_valid(qid)]
+
+        topics: Dict[str, str] = {}
+        for start in range(0, len(object_ids), QUESTION_BATCH_SIZE):
+            batch = object_ids[start:start + QUESTION_BATCH_SIZE]
+            async for question in db.questions.find({"_id": {"$in": batch}}, {"topic_id": 1}):
+                if question.get("topic_id"):
+                    topics[str(question["_id"])] = question["topic_id"]
+        return topics
+
+    @staticmethod
+    async def get_topic_performance(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Accuracy per topic over a set of test results
+
+        Args:
+            results: Test results (only questions.question_id/is_correct are read)
+
+        Returns:
+            Topic scores sorted from weakest to strongest
+        """
+        answers = [q for result in results for q in result.get("questions", [])]
+        question_topics = await RecommendationService.get_question_topics(
+            list({q["question_id"] for q in answers})
+        )
+
+        topic_performance: Dict[str, Dict[str, int]] = {}
+        for q in answers:
+            topic_id = question_topics.get(q["question_id"])
+            if not topic_id:
+                continue
+            performance = topic_performance.setdefault(topic_id, {"correct": 0, "total": 0})
+            performance["total"] += 1
+            if q.get("is_correct"):
+                performance["correct"] += 1
+
+        topic_scores = []
+        for topic_id, performance in topic_performance.items():
+            topic = await content_cache.get("topics", topic_id)
+            if topic:
+                topic_scores.append({
+                    "topic_id": topic_id,
+                    "topic_name": topic["name"],
+                    "percentage": (performance["correct"] / performance["total"]) * 100,
+                    "correct": performance["correct"],
+                    "total": performance["total"]
+                })
+
+        topic_scores.sort(key=lambda x: x["percentage"])
+        return topic_scores
+
+    @staticmethod
+    async def recommend_topics(user_id: str, weakest: int = 3) -> Dict[str, Any]:
+        """
+        Recommend the weakest topics of a user (popular topics without history)
+
+        Args:
+            user_id: User id
+            weakest: Number of topics to recommend
+
+        Returns:
+            Response body of /recommendations/tests
+        """
+        db = get_database()
+        results = await db.test_results.find(
+            {"user_id": user_id},
+            {"questions.question_id": 1, "questions.is_correct": 1}
+        ).to_list(100)
+
+        if not results:
+            # If no history, recommend popular topics
+            popular_topics = (await content_cache.list("topics"))[:5]
+            return {
+                "message": "Get started with these popular topics",
+                "recommended_topics": [
+                    {
+                        "topic_id": str(t["_id"]),
+                        "topic_name": t["name"],
+                        "reason": "Popular among students"
+                    } for t in popular_topics
+                ]
+            }
+
+        weak_topics = (await RecommendationService.get_topic_performance(results))[:weakest]
+        return {
+            "message": "Based on your performance, we recommend focusing on these topics",
+            "recommended_topics": [
+                {
+                    "topic_id": weak_topic["topic_id"],
+                    "topic_name": weak_topic["topic_name"],
+                    "reason": f"Practice needed - Current accuracy: {weak_topic['percentage']:.1f}%",
+                    "current_performance": weak_topic["percentage"]
+                } for weak_topic in weak_topics
+            ]
+        }
@@ -0,0 +1,231 @@
+"""
+User Stats Service - Materialized per-user performance rollups
+One user_stats document per user holds correct/total counters by difficulty,
+subject, chapter and topic plus a recent score trend. Test submissions and
+practice answers update it with a single atomic $inc, so analytics read
+one document instead of replaying the whole history.
+"""
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+from core.database import get_database
+
+# Question field -> counter group in a user_stats section
+DIMENSIONS = {
+    "difficulty": "difficulty",
+    "subject_id": "subjects",
+    "chapter_id": "chapters",
+    "topic_id": "topics",
+}
+QUESTION_PROJECTION = {field: 1 for field in DIMENSIONS}
+
+# Test scores kept for the trend (most recent last)
+TREND_LENGTH = 50
+
+# Sections: answers given in submitted tests vs. in practice mode
+TESTS = "tests"
+PRACTICE = "practice"
+
+
+def _counter_key(value: Any) -> Optional[str]:
+    """Field-name-safe counter key for a dimension value"""
+    if value is None or value == "":
+        return None
+    key = str(value)
+    if "." in key or key.startswith("$"):
+        return None
+    return key
+
+
+def _answer_increments(section: str, answers: Iterable[Tuple[Dict[str, Any], bool]]) -> Dict[str, int]:
+    """$inc document counting (question, is_correct) pairs into a section"""
+    increments: Dict[str, int] = {}
+
+    def bump(path: str, is_correct: bool):
+        increments[f"{path}.total"] = increments.get(f"{path}.total", 0) + 1
+        if is_correct:
+            increments[f"{path}.correct"] = increments.get(f"{path}.correct", 0) + 1
+
+    for question, is_correct in answers:
+        bump(section, is_correct)
+        for field, group in DIMENSIONS.items():
+            key = _counter_key(question.get(field))
+            if key:
+                bump(f"{section}.{group}.{key}", is_correct)
+    return increments
+
+
+def _apply(stats: Dict[str, Any], increments: Dict[str, int]):
+    """Apply a $inc document to an in-memory user_stats document"""
+    for path, amount in increments.items():
+        node = stats
+        *parents, leaf = path.split(".")
+        for part in parents:
+            node = node.setdefault(part, {})
+        node[leaf] = node.get(leaf, 0) + amount
+
+
+def _with_percentage(counter: Dict[str, int]) -> Dict[str, Any]:
+    correct = counter.get("correct", 0)
+    total = counter.get("total", 0)
+    return {
+        "correct": correct,
+        "total": total,
+        "percentage": round((correct / total) * 100, 2) if total > 0 else 0
+    }
+
+
+class UserStatsService:
+    """Service for the user_stats read model"""
+
+    @staticmethod
+    async def record_test(
+        user_id: str,
+        questions: List[Dict[str, Any]],
+        correctness: List[bool],
+        score: float,
+        timestamp: datetime
+    ):
+        """
+        Count a submitted test
+
+        Args:
+            user_id: User id
+            questions: Question documents of the test
+            correctness: is_correct of each answer, aligned with questions
+            score: Test score in percent
+            timestamp: Submission time
+        """
+        db = get_database()
+        increments = _answer_increments(TESTS, zip(questions, correctness))
+        increments["tests.count"] = 1
+        increments["tests.score_sum"] = score
+
+        await db.user_stats.update_one(
+            {"_id": user_id},
+            {
+                "$inc": increments,
+                "$push": {"trend": {
+                    "$each": [{"score": score, "timestamp": timestamp}],
+                    "$slice": -TREND_LENGTH
+                }},
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    async def record_practice(user_id: str, question: Dict[str, Any], is_correct: bool):
+        """
+        Count a practice-mode answer
+
+        Args:
+            user_id: User id
+            question: Question document
+            is_correct: Whether the answer was correct
+        """
+        db = get_database()
+        await db.user_stats.update_one(
+            {"_id": user_id},
+            {
+                "$inc": _answer_increments(PRACTICE, [(question, is_correct)]),
+                "$set": {"updated_at": datetime.utcnow()}
+            },
+            upsert=True
+        )
+
+    @staticmethod
+    async def get(user_id: str) -> Dict[str, Any]:
+        """User stats document (empty rollup when the user has no history)"""
+        db = get_database()
+        stats = await db.user_stats.find_one({"_id": user_id})
+        return stats or {"_id": user_id, TESTS: {}, PRACTICE: {}, "trend": []}
+
+    @staticmethod
+    def summary(stats: Dict[str, Any]) -> Tuple[int, float]:
+        """(total tests, average score) of a user stats document"""
+        tests = stats.get(TESTS, {})
+        count = tests.get("count", 0)
+        return count, (tests.get("score_sum", 0) / count if count else 0.0)
+
+    @staticmethod
+    def breakdown(stats: Dict[str, Any], group: str, section: str = TESTS) -> Dict[str, Dict[str, Any]]:
+        """
+        Counters of one group with percentages
+
+        Args:
+            stats: User stats document
+            group: "difficulty", "subjects", "chapters" or "topics"
+            section: TESTS or PRACTICE
+
+        Returns:
+            Key -> {"correct", "total", "percentage"}
+        """
+        counters = stats.get(section, {}).get(group, {})
+        return {key: _with_percentage(counter) for key, counter in counters.items()}
+
+    @staticmethod
+    async def rebuild(user_id: Optional[str] = None, batch_size: int = 1000) -> Dict[str, int]:
+        """
+        Recompute user_stats from test_results and practice_attempts
+
+        Each user's document is replaced in one write; a submission landing
+        between the read of that user's history and the write can be lost,
+        so run it during low traffic (or per user).
+
+        Args:
+            user_id: Rebuild a single user (all users when None)
+            batch_size: Question ids per $in query
+
+        Returns:
+            Number of users rebuilt
+        """
+        db = get_database()
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = sorted(
+                set(await db.test_results.distinct("user_id")) | set(await db.practice_attempts.distinct("user_id"))
+            )
+
+        for uid in user_ids:
+            results = await db.test_results.find(
+                {"user_id": uid},
+                {"score": 1, "timestamp": 1, "questions.question_id": 1, "questions.is_correct": 1}
+            ).sort("timestamp", 1).to_list(None)
+            attempts = await db.practice_attempts.find(
+                {"user_id": uid}, {"question_id": 1, "is_correct": 1}
+            ).to_list(None)
+
+            question_ids = {q["question_id"] for r in results for q in r.get("questions", [])}
+            question_ids |= {a["question_id"] for a in attempts}
+            object_ids = [ObjectId(qid) for qid in question_ids if ObjectId.is_valid(qid)]
+            questions: Dict[str, Dict[str, Any]] = {}
+            for start in range(0, len(object_ids), batch_size):
+                async for question in db.questions.find(
+                    {"_id": {"$in": object_ids[start:start + batch_size]}}, QUESTION_PROJECTION
+                ):
+                    questions[str(question["_id"])] = question
+
+            stats: Dict[str, Any] = {"_id": uid, TESTS: {}, PRACTICE: {}, "trend": []}
+            for result in results:
+                answers = [
+                    (questions[q["question_id"]], q.get("is_correct", False))
+                    for q in result.get("questions", []) if q["question_id"] in questions
+                ]
+                _apply(stats, _answer_increments(TESTS, answers))
+                _apply(stats, {"tests.count": 1, "tests.score_sum": result.get("score", 0)})
+                stats["trend"].append({"score": result.get("score", 0), "timestamp": result.get("timestamp")})
+            stats["trend"] = stats["trend"][-TREND_LENGTH:]
+
+            _apply(stats, _answer_increments(PRACTICE, [
+                (questions[a["question_id"]], a.get("is_correct", False))
+                for a in attempts if a["question_id"] in questions
+            ]))
+            stats["updated_at"] = datetime.utcnow()
+
+            await db.user_stats.replace_one({"_id": uid}, stats, upsert=True)
+
+        return {"users": len(user_ids)}
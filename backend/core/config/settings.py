@@ -17,15 +17,40 @@ class Settings(BaseSettings):
     # Database
     MONGO_URL: str = os.getenv('MONGO_URL', 'mongodb://localhost:27017')
     DB_NAME: str = os.getenv('DB_NAME', 'quiz_app_db')
+    AUTO_CREATE_INDEXES: bool = os.getenv('AUTO_CREATE_INDEXES', 'true').lower() == 'true'
+    MONGO_MAX_POOL_SIZE: int = int(os.getenv('MONGO_MAX_POOL_SIZE', 100))
+    MONGO_MIN_POOL_SIZE: int = int(os.getenv('MONGO_MIN_POOL_SIZE', 5))
+    MONGO_MAX_IDLE_TIME_MS: int = int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000))  # 5 minutes
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 10000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000))
+    PAGINATION_COUNT_CAP: int = int(os.getenv('PAGINATION_COUNT_CAP', 10000))  # estimated totals stop counting here
+    EXPORT_BATCH_SIZE: int = int(os.getenv('EXPORT_BATCH_SIZE', 500))  # documents per cursor batch in streaming exports
     
     # Security
     JWT_SECRET: str = os.getenv('JWT_SECRET', 'quiz_admin_jwt_secret_key_2024_secure')
     JWT_ALGORITHM: str = os.getenv('JWT_ALGORITHM', 'HS256')
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv('ACCESS_TOKEN_EXPIRE_MINUTES', 10080))  # 7 days
+    PASSWORD_HASH_WORKERS: int = int(os.getenv('PASSWORD_HASH_WORKERS', 4))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv('USER_CACHE_TTL_SECONDS', 60))
+    USER_CACHE_MAX_SIZE: int = int(os.getenv('USER_CACHE_MAX_SIZE', 10000))
+    
+    # Content hierarchy cache (safety TTL for writes made by other workers)
+    CONTENT_CACHE_TTL_SECONDS: int = int(os.getenv('CONTENT_CACHE_TTL_SECONDS', 300))
+    
+    # Test sessions (question id pools are per scope and per worker)
+    QUESTION_POOL_TTL_SECONDS: int = int(os.getenv('QUESTION_POOL_TTL_SECONDS', 300))
+    QUESTION_POOL_MAX_SCOPES: int = int(os.getenv('QUESTION_POOL_MAX_SCOPES', 1000))
+    TEST_SESSION_TTL_MINUTES: int = int(os.getenv('TEST_SESSION_TTL_MINUTES', 180))
+    ANSWER_KEY_TTL_SECONDS: int = int(os.getenv('ANSWER_KEY_TTL_SECONDS', 600))
+    LEADERBOARD_RETENTION_DAYS: int = int(os.getenv('LEADERBOARD_RETENTION_DAYS', 7))  # weekly/monthly boards kept after their period
     
     # AI
     GEMINI_API_KEY: str = os.getenv('GEMINI_API_KEY', '')
     
+    # Monitoring
+    METRICS_ENABLED: bool = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    STARTUP_IMPORT_BUDGET_SECONDS: float = float(os.getenv('STARTUP_IMPORT_BUDGET_SECONDS', 2.0))
+    
     # CORS
     ALLOWED_ORIGINS: str = os.getenv("ALLOWED_ORIGINS", '')
 
@@ -44,6 +69,17 @@ class Settings(BaseSettings):
     # File Upload
     MAX_FILE_SIZE: str = "10mb"
     UPLOAD_PATH: str = "./uploads"
+    UPLOAD_CHUNK_ROWS: int = int(os.getenv('UPLOAD_CHUNK_ROWS', 5000))  # rows parsed, transformed and inserted at a time
+    UPLOAD_MAX_REPORTED_ERRORS: int = int(os.getenv('UPLOAD_MAX_REPORTED_ERRORS', 100))
+    EXCEL_READ_WORKERS: int = int(os.getenv('EXCEL_READ_WORKERS', 4))  # processes streaming an upload's sheets (capped at the CPU count)
+    
+    # Background jobs (core/jobs.py)
+    JOB_WORKERS: int = int(os.getenv('JOB_WORKERS', 2))  # concurrent jobs per process; 0 runs none here
+    JOB_LEASE_SECONDS: int = int(os.getenv('JOB_LEASE_SECONDS', 60))  # a job is re-leased this long after its worker stops renewing
+    JOB_POLL_SECONDS: float = float(os.getenv('JOB_POLL_SECONDS', 2.0))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv('JOB_MAX_ATTEMPTS', 3))
+    JOB_RETRY_DELAY_SECONDS: int = int(os.getenv('JOB_RETRY_DELAY_SECONDS', 30))  # doubled on every further attempt
+    JOB_RETENTION_DAYS: int = int(os.getenv('JOB_RETENTION_DAYS', 7))  # finished jobs and their files are purged after this
     
     # SMTP
     SMTP_HOST: str = os.getenv('SMTP_HOST', 'smtp.gmail.com')
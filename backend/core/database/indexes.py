@@ -0,0 +1,212 @@
+"""
+Declarative MongoDB index registry
+Every index the API relies on is declared here, created at startup and
+checked for drift (declared but missing, or present but undeclared)
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+
+
+def _index(keys: List[Tuple[str, int]], **options) -> IndexModel:
+    """Build an IndexModel with a stable name and background build"""
+    name = options.pop("name", "_".join(f"{field}_{direction}" for field, direction in keys))
+    return IndexModel(keys, name=name, background=True, **options)
+
+
+# Collection name -> indexes the routes in api/v1 and server_old.py query by
+INDEX_REGISTRY: Dict[str, List[IndexModel]] = {
+    "users": [
+        _index([("email", ASCENDING)], unique=True),
+        _index([("role", ASCENDING)]),
+    ],
+    # Content hierarchy: every level is listed by its parent id
+    "subjects": [_index([("exam_id", ASCENDING)])],
+    "chapters": [_index([("subject_id", ASCENDING)])],
+    "topics": [_index([("chapter_id", ASCENDING)])],
+    "sub_topics": [_index([("topic_id", ASCENDING)])],
+    "sections": [_index([("sub_topic_id", ASCENDING)])],
+    "sub_sections": [_index([("section_id", ASCENDING)])],
+    "questions": [
+        # Admin listings seek on _id (core/pagination.py) after the equality filters
+        _index([("sub_section_id", ASCENDING), ("difficulty", ASCENDING), ("_id", ASCENDING)]),
+        _index([("difficulty", ASCENDING), ("_id", ASCENDING)]),
+        _index([("review_status", ASCENDING), ("_id", ASCENDING)]),
+        _index([("subject", ASCENDING), ("is_active", ASCENDING)]),
+        _index([("exam", ASCENDING)]),
+        # Bulk uploads upsert by UID (question_upload.py); questions without one are not indexed
+        _index([("uid", ASCENDING)], unique=True, partialFilterExpression={"uid": {"$gt": ""}}),
+        # Denormalized ancestor ids (question_ancestry.py): re-stamping and analytics
+        _index([("exam_id", ASCENDING)]),
+        _index([("subject_id", ASCENDING)]),
+        _index([("chapter_id", ASCENDING)]),
+        _index([("topic_id", ASCENDING)]),
+        _index([("sub_topic_id", ASCENDING)]),
+        _index([("section_id", ASCENDING)]),
+    ],
+    "test_results": [
+        _index([("user_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        _index([("timestamp", DESCENDING)]),
+    ],
+    # Unique: bookmark adds are upserts (scripts/dedupe_bookmarks.py migrates old data)
+    "bookmarks": [_index([("user_id", ASCENDING), ("question_id", ASCENDING)], unique=True)],
+    "question_versions": [_index([("question_id", ASCENDING), ("version_number", DESCENDING)])],
+    "audit_logs": [
+        _index([("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        _index([("action", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+        _index([("admin_id", ASCENDING), ("timestamp", DESCENDING), ("_id", DESCENDING)]),
+    ],
+    "leaderboard_entries": [
+        _index([("board", ASCENDING), ("average_score", DESCENDING), ("total_tests", DESCENDING)]),
+        # Weekly/monthly entries are removed once expires_at has passed (all-time ones have none)
+        _index([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+    "practice_attempts": [_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])],
+    # Sessions are removed by MongoDB once expires_at has passed
+    "test_sessions": [_index([("expires_at", ASCENDING)], expireAfterSeconds=0)],
+    "notifications": [
+        _index([("created_at", DESCENDING)]),
+        _index([("sent_at", DESCENDING)]),
+    ],
+    "push_tokens": [_index([("user_id", ASCENDING)])],
+    "password_resets": [_index([("email", ASCENDING)])],
+    "syllabuses": [_index([("exam_id", ASCENDING)])],
+    # Background jobs (core/jobs.py): leasing due and stale jobs, purging, admin listings
+    "jobs": [
+        _index([("status", ASCENDING), ("run_after", ASCENDING)]),
+        _index([("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+        _index([("status", ASCENDING), ("finished_at", ASCENDING)]),
+        _index([("kind", ASCENDING), ("created_at", DESCENDING)]),
+        _index([("created_at", DESCENDING)]),
+    ],
+}
+
+# Last bootstrap/drift result, served by the /health/indexes endpoint
+_last_report: Optional[Dict[str, Any]] = None
+
+
+def _key_signature(keys) -> Tuple[Tuple[str, Any], ...]:
+    """Normalize an index key spec so declared and live indexes compare equal"""
+    return tuple((field, direction) for field, direction in dict(keys).items())
+
+
+# Index options that change what an index holds or does, compared by the drift check
+COMPARED_OPTIONS = ("unique", "partialFilterExpression", "expireAfterSeconds")
+
+
+def _options(info: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Compared options of a declared or live index (unique normalized to a bool)"""
+    return tuple(bool(info.get(option)) if option == "unique" else info.get(option) for option in COMPARED_OPTIONS)
+
+
+async def _live_indexes(collection) -> Dict[Tuple, Dict[str, Any]]:
+    """Map key signature -> index info for every index on a collection"""
+    live = {}
+    async for info in collection.list_indexes():
+        live[_key_signature(info["key"])] = dict(info)
+    return live
+
+
+async def check_index_drift(db) -> Dict[str, Any]:
+    """
+    Compare declared indexes with the ones present in the database
+
+    Args:
+        db: Motor database handle
+
+    Returns:
+        Report with missing/extra/mismatched indexes per collection
+    """
+    collections: Dict[str, Dict[str, Any]] = {}
+    in_sync = True
+
+    for collection_name, declared in INDEX_REGISTRY.items():
+        live = await _live_indexes(db[collection_name])
+        declared_by_key = {_key_signature(model.document["key"]): model for model in declared}
+
+        missing = [
+            model.document["name"]
+            for key, model in declared_by_key.items()
+            if key not in live
+        ]
+        extra = [
+            info["name"]
+            for key, info in live.items()
+            if info["name"] != "_id_" and key not in declared_by_key
+        ]
+        # Same keys, but built with other options (unique, partial filter, TTL)
+        mismatched = [
+            model.document["name"]
+            for key, model in declared_by_key.items()
+            if key in live and _options(live[key]) != _options(model.document)
+        ]
+
+        if missing or extra or mismatched:
+            in_sync = False
+        collections[collection_name] = {"missing": missing, "extra": extra, "mismatched": mismatched}
+
+    return {
+        "in_sync": in_sync,
+        "checked_at": datetime.utcnow().isoformat(),
+        "collections": collections
+    }
+
+
+async def ensure_indexes(db) -> Dict[str, Any]:
+    """
+    Create every declared index that is missing, then report drift
+
+    Indexes are built one at a time so a single failure (e.g. a unique index
+    over existing duplicates) is reported without blocking the others.
+
+    Args:
+        db: Motor database handle
+
+    Returns:
+        Drift report including the indexes created and any creation errors
+    """
+    global _last_report
+
+    created: List[str] = []
+    errors: Dict[str, str] = {}
+
+    for collection_name, declared in INDEX_REGISTRY.items():
+        collection = db[collection_name]
+        try:
+            live = await _live_indexes(collection)
+        except PyMongoError as e:
+            errors[collection_name] = str(e)
+            continue
+
+        for model in declared:
+            if _key_signature(model.document["key"]) in live:
+                continue
+            index_name = f"{collection_name}.{model.document['name']}"
+            try:
+                await collection.create_indexes([model])
+                created.append(index_name)
+            except PyMongoError as e:
+                logger.error(f"Failed to create index {index_name}: {e}")
+                errors[index_name] = str(e)
+
+    report = await check_index_drift(db)
+    report["created"] = created
+    report["errors"] = errors
+    _last_report = report
+
+    if created:
+        logger.info(f"Created {len(created)} MongoDB indexes: {', '.join(created)}")
+    if not report["in_sync"]:
+        logger.warning("MongoDB index drift detected, see /health/indexes")
+
+    return report
+
+
+def get_index_report() -> Optional[Dict[str, Any]]:
+    """Return the result of the most recent index bootstrap or drift check"""
+    return _last_report
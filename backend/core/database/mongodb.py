@@ -1,21 +1,48 @@
 from motor.motor_asyncio import AsyncIOMotorClient
 from typing import Optional
 from core.config import settings
+from core.database.monitoring import pool_telemetry
 
 class Database:
+    """Process-wide MongoDB client shared by the v1 API and legacy routes"""
     client: Optional[AsyncIOMotorClient] = None
-    
+
     @classmethod
     def get_client(cls) -> AsyncIOMotorClient:
         if cls.client is None:
-            cls.client = AsyncIOMotorClient(settings.MONGO_URL)
+            cls.client = AsyncIOMotorClient(
+                settings.MONGO_URL,
+                maxPoolSize=settings.MONGO_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGO_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGO_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                event_listeners=[pool_telemetry]
+            )
         return cls.client
-    
+
     @classmethod
     def get_database(cls):
         client = cls.get_client()
         return client[settings.DB_NAME]
-    
+
+    @classmethod
+    async def ping(cls) -> bool:
+        """Round-trip to the server so the pool is connected before traffic arrives"""
+        await cls.get_client().admin.command("ping")
+        return True
+
+    @classmethod
+    def pool_options(cls) -> dict:
+        """Configured pool limits, reported next to the live telemetry"""
+        return {
+            "max_pool_size": settings.MONGO_MAX_POOL_SIZE,
+            "min_pool_size": settings.MONGO_MIN_POOL_SIZE,
+            "max_idle_time_ms": settings.MONGO_MAX_IDLE_TIME_MS,
+            "wait_queue_timeout_ms": settings.MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "server_selection_timeout_ms": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS
+        }
+
     @classmethod
     async def close(cls):
         if cls.client:
@@ -0,0 +1,161 @@
+"""
+MongoDB driver telemetry
+PyMongo command and connection-pool listeners that keep live pool usage
+and per-operation latency for the shared client
+"""
+from contextvars import ContextVar
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from pymongo import monitoring
+
+
+class RequestCommandStats:
+    """MongoDB commands issued while serving a single HTTP request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration_seconds = 0.0
+        self.by_command: Dict[str, int] = {}
+
+    def record(self, command_name: str, duration_seconds: float):
+        self.count += 1
+        self.duration_seconds += duration_seconds
+        self.by_command[command_name] = self.by_command.get(command_name, 0) + 1
+
+
+# Set by the metrics middleware; Motor copies the context into its executor
+# threads, so listener callbacks see the stats of the request that issued them
+request_command_stats: ContextVar[Optional[RequestCommandStats]] = ContextVar(
+    "request_command_stats", default=None
+)
+
+
+class PoolTelemetry(monitoring.CommandListener, monitoring.ConnectionPoolListener):
+    """Collects pool occupancy and command latency from PyMongo monitoring events
+
+    Listeners are invoked from the driver's executor threads, so every
+    counter update happens under a lock.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self.pools: Dict[str, Dict[str, int]] = {}
+        self.commands: Dict[str, Dict[str, float]] = {}
+
+    def reset_commands(self):
+        """Clear command latency counters; pool occupancy keeps tracking live state"""
+        with self._lock:
+            self.commands = {}
+
+    def _pool(self, address) -> Dict[str, int]:
+        key = f"{address[0]}:{address[1]}" if isinstance(address, tuple) else str(address)
+        if key not in self.pools:
+            self.pools[key] = {
+                "open_connections": 0,
+                "checked_out": 0,
+                "wait_queue_depth": 0,
+                "checkout_failures": 0,
+                "pool_clears": 0
+            }
+        return self.pools[key]
+
+    # ---- Command events ----
+
+    def started(self, event):
+        pass
+
+    def _record_command(self, event, failed: bool):
+        duration_ms = event.duration_micros / 1000.0
+        request_stats = request_command_stats.get()
+        if request_stats is not None:
+            request_stats.record(event.command_name, duration_ms / 1000.0)
+        with self._lock:
+            stats = self.commands.setdefault(event.command_name, {
+                "count": 0,
+                "failures": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0
+            })
+            stats["count"] += 1
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            if failed:
+                stats["failures"] += 1
+
+    def succeeded(self, event):
+        self._record_command(event, failed=False)
+
+    def failed(self, event):
+        self._record_command(event, failed=True)
+
+    # ---- Connection pool events ----
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self._pool(event.address)["pool_clears"] += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address)["open_connections"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["open_connections"] = max(0, pool["open_connections"] - 1)
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self._pool(event.address)["wait_queue_depth"] += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["wait_queue_depth"] = max(0, pool["wait_queue_depth"] - 1)
+            pool["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["wait_queue_depth"] = max(0, pool["wait_queue_depth"] - 1)
+            pool["checked_out"] += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checked_out"] = max(0, pool["checked_out"] - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable copy of the current telemetry"""
+        with self._lock:
+            commands = {
+                name: {
+                    "count": int(stats["count"]),
+                    "failures": int(stats["failures"]),
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3) if stats["count"] else 0.0,
+                    "max_ms": round(stats["max_ms"], 3)
+                }
+                for name, stats in self.commands.items()
+            }
+            return {
+                "pools": {address: dict(pool) for address, pool in self.pools.items()},
+                "commands": commands
+            }
+
+
+# Global instance registered on the shared client
+pool_telemetry = PoolTelemetry()
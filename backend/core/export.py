@@ -0,0 +1,201 @@
+"""
+Streaming exports
+Rows are read from a Motor cursor in batches and encoded into CSV, NDJSON
+or a JSON document as they arrive, so an export holds one cursor batch
+and one output chunk in memory however long the history is.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+from core.config import settings
+from core.serialization import dumps
+
+EXPORT_FORMATS = ("json", "csv", "ndjson")
+MEDIA_TYPES = {
+    "json": "application/json",
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Output is flushed to the client once a chunk grows past this size
+CHUNK_BYTES = 64 * 1024
+
+# (row key, CSV header) pairs
+Fields = Sequence[Tuple[str, str]]
+Row = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+def date_range_query(field: str, start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict[str, Any]:
+    """
+    Filter on `field` between two optional bounds (both inclusive)
+
+    Raises:
+        HTTPException 400 if start_date is after end_date
+    """
+    if start_date and end_date and start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must be before end_date")
+    bounds = {}
+    if start_date:
+        bounds["$gte"] = start_date
+    if end_date:
+        bounds["$lte"] = end_date
+    return {field: bounds} if bounds else {}
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return "" if value is None else value
+
+
+async def _close(cursor):
+    """Release the server-side cursor when the client disconnects mid-export"""
+    close = getattr(cursor, "close", None)
+    if close:
+        result = close()
+        if hasattr(result, "__await__"):
+            await result
+
+
+async def csv_chunks(cursor, fields: Fields, row: Row) -> AsyncIterator[bytes]:
+    """CSV with a header line, one line per document"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([header for _, header in fields])
+    try:
+        async for document in cursor:
+            values = row(document)
+            writer.writerow([_csv_value(values.get(key)) for key, _ in fields])
+            if buffer.tell() >= CHUNK_BYTES:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+    finally:
+        await _close(cursor)
+    yield buffer.getvalue().encode("utf-8")
+
+
+async def ndjson_chunks(cursor, fields: Fields, row: Row) -> AsyncIterator[bytes]:
+    """One JSON object per line"""
+    chunk = bytearray()
+    try:
+        async for document in cursor:
+            values = row(document)
+            chunk += dumps({key: values.get(key) for key, _ in fields})
+            chunk += b"\n"
+            if len(chunk) >= CHUNK_BYTES:
+                yield bytes(chunk)
+                chunk.clear()
+    finally:
+        await _close(cursor)
+    yield bytes(chunk)
+
+
+async def json_chunks(cursor, fields: Fields, row: Row, document: Dict[str, Any], path: Sequence[str]) -> AsyncIterator[bytes]:
+    """
+    A JSON document whose list at `path` is filled from the cursor
+
+    Args:
+        document: Envelope (e.g. export metadata); its value at `path` is replaced
+        path: Keys leading to the list of rows, e.g. ("data", "test_history")
+    """
+    sentinel = "\x00rows\x00"
+    envelope = dict(document)
+    node = envelope
+    for key in path[:-1]:
+        node[key] = dict(node.get(key, {}))
+        node = node[key]
+    node[path[-1]] = sentinel
+    head, tail = dumps(envelope).split(dumps(sentinel), 1)
+
+    chunk = bytearray(head + b"[")
+    first = True
+    try:
+        async for item in cursor:
+            values = row(item)
+            if not first:
+                chunk += b","
+            chunk += dumps({key: values.get(key) for key, _ in fields})
+            first = False
+            if len(chunk) >= CHUNK_BYTES:
+                yield bytes(chunk)
+                chunk.clear()
+    finally:
+        await _close(cursor)
+    yield bytes(chunk + b"]" + tail)
+
+
+def stream_export(
+    cursor,
+    format: str,
+    fields: Fields,
+    row: Row,
+    filename: str,
+    document: Optional[Dict[str, Any]] = None,
+    path: Sequence[str] = ("rows",)
+) -> StreamingResponse:
+    """
+    Stream a cursor as a CSV, NDJSON or JSON download
+
+    Args:
+        cursor: Motor cursor (its batch size is set here)
+        format: "csv", "ndjson" or "json"
+        fields: (row key, CSV header) pairs, in column order
+        row: Maps a document to a dict with the field keys
+        filename: Download name without extension
+        document: JSON envelope for format "json"
+        path: Location of the rows inside `document`
+
+    Returns:
+        StreamingResponse with a Content-Disposition attachment header
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}")
+    cursor = cursor.batch_size(settings.EXPORT_BATCH_SIZE)
+
+    if format == "csv":
+        body = csv_chunks(cursor, fields, row)
+    elif format == "ndjson":
+        body = ndjson_chunks(cursor, fields, row)
+    else:
+        body = json_chunks(cursor, fields, row, document or {}, path)
+
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{format}"}
+    )
+
+
+# ==================== TEST RESULTS ====================
+
+TEST_RESULT_EXPORT_PROJECTION = {
+    "user_id": 1, "score": 1, "total_questions": 1, "correct_answers": 1, "percentile": 1, "timestamp": 1
+}
+
+TEST_RESULT_EXPORT_FIELDS = (
+    ("test_id", "Test ID"),
+    ("timestamp", "Date"),
+    ("score", "Score"),
+    ("total_questions", "Total Questions"),
+    ("correct_answers", "Correct Answers"),
+    ("percentile", "Percentile"),
+)
+
+
+def test_result_row(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Export row of a test_results document"""
+    return {
+        "test_id": str(result["_id"]),
+        "user_id": result.get("user_id"),
+        "timestamp": result.get("timestamp"),
+        "score": result.get("score"),
+        "total_questions": result.get("total_questions"),
+        "correct_answers": result.get("correct_answers"),
+        "percentile": result.get("percentile"),
+    }
@@ -0,0 +1,479 @@
+"""
+Background jobs
+Long admin operations are stored as documents in the jobs collection and
+run by a pool of asyncio workers, so the request that submits one returns
+a job id at once and the work no longer dies with the client connection.
+
+A worker leases a job and renews the lease while the handler runs; a job
+whose lease expired (its process crashed or was killed) is leased again by
+the next idle worker, here or in another process, until it runs out of
+attempts. Status, progress and the result are kept on the job document
+and served by /api/admin/jobs/{job_id}. Uploaded files a job needs are
+stored in GridFS (bucket job_files) next to it.
+"""
+import asyncio
+import logging
+import os
+import socket
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from core.config import settings
+from core.database import get_database
+from core.metrics import jobs_total, job_duration_seconds
+from core.serialization import FastJSONResponse
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+FILES_BUCKET = "job_files"
+SPOOL_MAX_BYTES = 8 * 1024 * 1024  # downloaded job files larger than this go to a temp file
+PURGE_INTERVAL_SECONDS = 3600
+
+# Job fields returned by the API (params can hold large inputs, files are internal)
+PUBLIC_FIELDS = (
+    "kind", "status", "progress", "result", "error", "attempts", "max_attempts", "cancel_requested",
+    "submitted_by", "created_at", "started_at", "finished_at", "run_after"
+)
+
+Handler = Callable[["JobContext"], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobFailed(Exception):
+    """Raised by a handler for a failure that a retry cannot fix (bad input, ...)"""
+
+
+class JobContext:
+    """What a handler gets: the job's params and files, and a way to report progress"""
+
+    def __init__(self, runner: "JobRunner", job: Dict[str, Any], owner: str):
+        self.runner = runner
+        self.job = job
+        self.id: ObjectId = job["_id"]
+        self.params: Dict[str, Any] = job.get("params") or {}
+        self.owner = owner
+        self.cancel_requested = False
+        self.lease_lost = False
+
+    async def progress(self, percentage: float, message: str = "", step: Optional[str] = None):
+        """
+        Store the job's progress; raises CancelledError if a cancel was requested
+
+        Args:
+            percentage: 0-100
+            message: Human readable status
+            step: Machine readable stage name
+        """
+        job = await get_database().jobs.find_one_and_update(
+            {"_id": self.id, "lease_owner": self.owner},
+            {"$set": {
+                "progress": {"percentage": round(percentage, 1), "message": message, "step": step},
+                "updated_at": datetime.utcnow()
+            }},
+            projection={"cancel_requested": 1}
+        )
+        if job is None:
+            self.lease_lost = True
+            raise asyncio.CancelledError()
+        if job.get("cancel_requested"):
+            self.cancel_requested = True
+            raise asyncio.CancelledError()
+
+    async def open_file(self, name: str) -> BinaryIO:
+        """
+        Download a file submitted with the job into a spooled temporary file
+
+        The caller closes it.
+        """
+        file_id = (self.job.get("files") or {})[name]
+        destination = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+        await self.runner.files_bucket().download_to_stream(file_id, destination)
+        destination.seek(0)
+        return destination
+
+
+class JobRunner:
+    """Persistent job queue on MongoDB with an in-process asyncio worker pool"""
+
+    def __init__(self, workers: int, lease_seconds: int, poll_seconds: float, max_attempts: int,
+                 retry_delay_seconds: int, retention_days: int):
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self.retry_delay_seconds = retry_delay_seconds
+        self.retention_days = retention_days
+        self._handlers: Dict[str, Tuple[Handler, Optional[int]]] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._purged_at = 0.0
+        self._instance = f"{socket.gethostname()}:{os.getpid()}"
+        self.running: Dict[str, str] = {}  # worker -> job id
+
+    # ==================== HANDLERS ====================
+
+    def handler(self, kind: str, max_attempts: Optional[int] = None):
+        """
+        Register the coroutine that runs jobs of a kind
+
+        The handler gets a JobContext and returns the job's result (a dict).
+        Any exception but JobFailed is retried, so a handler must be safe to
+        run again after a partial run.
+
+        Args:
+            kind: Job kind, e.g. "questions.bulk_upload"
+            max_attempts: Attempts for this kind instead of JOB_MAX_ATTEMPTS
+        """
+        def register(function: Handler) -> Handler:
+            self._handlers[kind] = (function, max_attempts)
+            return function
+        return register
+
+    def kinds(self) -> List[str]:
+        return list(self._handlers)
+
+    # ==================== SUBMISSION AND CONTROL ====================
+
+    def files_bucket(self) -> AsyncIOMotorGridFSBucket:
+        return AsyncIOMotorGridFSBucket(get_database(), bucket_name=FILES_BUCKET)
+
+    async def submit(
+        self,
+        kind: str,
+        params: Optional[Dict[str, Any]] = None,
+        submitted_by: Optional[str] = None,
+        files: Optional[Dict[str, Tuple[str, BinaryIO]]] = None,
+        max_attempts: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Queue a job
+
+        Args:
+            kind: A registered job kind
+            params: JSON-like arguments for the handler
+            submitted_by: Id of the admin submitting it
+            files: name -> (filename, readable file) stored in GridFS for the handler
+            max_attempts: Attempts for this job instead of the kind's default
+
+        Returns:
+            The job document
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        db = get_database()
+        job_id = ObjectId()
+        stored_files = {}
+        for name, (filename, source) in (files or {}).items():
+            stored_files[name] = await self.files_bucket().upload_from_stream(
+                filename, source, metadata={"job_id": job_id}
+            )
+
+        now = datetime.utcnow()
+        job = {
+            "_id": job_id,
+            "kind": kind,
+            "params": params or {},
+            "files": stored_files,
+            "status": QUEUED,
+            "progress": {"percentage": 0, "message": "Queued", "step": None},
+            "result": None,
+            "error": None,
+            "attempts": 0,
+            "max_attempts": max_attempts or self._handlers[kind][1] or self.max_attempts,
+            "cancel_requested": False,
+            "submitted_by": submitted_by,
+            "created_at": now,
+            "updated_at": now,
+            "run_after": now
+        }
+        await db.jobs.insert_one(job)
+        self._notify()
+        return job
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        if not ObjectId.is_valid(job_id):
+            return None
+        return await get_database().jobs.find_one({"_id": ObjectId(job_id)}, {"params": 0, "files": 0})
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a job: a queued job at once, a running one at its next progress
+        report or lease renewal. Finished jobs are returned unchanged.
+        """
+        if not ObjectId.is_valid(job_id):
+            return None
+        db = get_database()
+        now = datetime.utcnow()
+        job = await db.jobs.find_one_and_update(
+            {"_id": ObjectId(job_id), "status": QUEUED},
+            {"$set": {"status": CANCELLED, "cancel_requested": True, "finished_at": now, "updated_at": now}},
+            projection={"params": 0, "files": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            job = await db.jobs.find_one_and_update(
+                {"_id": ObjectId(job_id), "status": RUNNING},
+                {"$set": {"cancel_requested": True, "updated_at": now}},
+                projection={"params": 0, "files": 0},
+                return_document=ReturnDocument.AFTER
+            )
+        return job or await self.get(job_id)
+
+    async def retry(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Queue a failed or cancelled job again with a fresh set of attempts (None if it is not one)"""
+        if not ObjectId.is_valid(job_id):
+            return None
+        now = datetime.utcnow()
+        job = await get_database().jobs.find_one_and_update(
+            {"_id": ObjectId(job_id), "status": {"$in": [FAILED, CANCELLED]}},
+            {
+                "$set": {
+                    "status": QUEUED, "attempts": 0, "error": None, "cancel_requested": False,
+                    "progress": {"percentage": 0, "message": "Queued", "step": None},
+                    "run_after": now, "updated_at": now
+                },
+                "$unset": {"finished_at": ""}
+            },
+            projection={"params": 0, "files": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is not None:
+            self._notify()
+        return job
+
+    # ==================== WORKERS ====================
+
+    def start(self):
+        """Start the worker pool (JOB_WORKERS tasks) on the running event loop"""
+        if self._tasks or self.workers <= 0:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._work(f"{self._instance}:{number}")) for number in range(self.workers)
+        ]
+        logger.info(f"Job runner started ({self.workers} workers, kinds: {', '.join(self._handlers)})")
+
+    async def stop(self):
+        """Stop the workers; jobs they were running are queued again"""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _notify(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _work(self, owner: str):
+        while True:
+            try:
+                job = await self._claim(owner)
+                if job is None:
+                    await self._purge_if_due()
+            except PyMongoError as e:
+                logger.error(f"Job worker {owner} cannot reach the jobs collection: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            self.running[owner] = str(job["_id"])
+            try:
+                await self._run(job, owner)
+            except PyMongoError as e:
+                # The outcome was not stored; the lease expires and the job is picked up again
+                logger.error(f"Job worker {owner} lost track of job {job['_id']}: {e}")
+            finally:
+                self.running.pop(owner, None)
+
+    async def _claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest due job, or one whose worker stopped renewing its lease"""
+        now = datetime.utcnow()
+        return await get_database().jobs.find_one_and_update(
+            {
+                "$or": [
+                    {"status": QUEUED, "run_after": {"$lte": now}},
+                    {"status": RUNNING, "lease_expires_at": {"$lt": now}}
+                ],
+                "kind": {"$in": self.kinds()}
+            },
+            {
+                "$set": {
+                    "status": RUNNING, "lease_owner": owner,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "started_at": now, "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("run_after", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _run(self, job: Dict[str, Any], owner: str):
+        kind = job["kind"]
+        if job["attempts"] > job["max_attempts"]:
+            # Its last attempt was leased and never finished (the worker died)
+            await self._finish(job["_id"], owner, FAILED, error="The job's worker stopped before it finished")
+            jobs_total.inc(kind=kind, status="lost")
+            return
+
+        context = JobContext(self, job, owner)
+        task = asyncio.create_task(self._handlers[kind][0](context))
+        heartbeat = asyncio.create_task(self._heartbeat(context, task))
+        start = time.perf_counter()
+        outcome = FAILED
+        try:
+            result = await task
+            outcome = SUCCEEDED
+            await self._finish(
+                job["_id"], owner, SUCCEEDED, result=result,
+                progress={"percentage": 100, "message": "Completed", "step": "completed"}
+            )
+        except asyncio.CancelledError:
+            if context.cancel_requested:
+                outcome = CANCELLED
+                await self._finish(job["_id"], owner, CANCELLED, error="Cancelled")
+            elif context.lease_lost:
+                outcome = "lost"  # another worker re-leased it; that run reports the outcome
+            else:
+                # The worker itself is stopping: give the attempt back
+                outcome = "requeued"
+                await get_database().jobs.update_one(
+                    {"_id": job["_id"], "lease_owner": owner},
+                    {"$set": {"status": QUEUED, "run_after": datetime.utcnow()},
+                     "$unset": {"lease_owner": "", "lease_expires_at": ""}, "$inc": {"attempts": -1}}
+                )
+                raise
+        except JobFailed as e:
+            await self._finish(job["_id"], owner, FAILED, error=str(e))
+        except Exception as e:
+            logger.exception(f"Job {job['_id']} ({kind}) attempt {job['attempts']} failed")
+            if job["attempts"] < job["max_attempts"]:
+                outcome = "retrying"
+                delay = self.retry_delay_seconds * 2 ** (job["attempts"] - 1)
+                await get_database().jobs.update_one(
+                    {"_id": job["_id"], "lease_owner": owner},
+                    {"$set": {
+                        "status": QUEUED, "error": str(e), "updated_at": datetime.utcnow(),
+                        "run_after": datetime.utcnow() + timedelta(seconds=delay)
+                    }, "$unset": {"lease_owner": "", "lease_expires_at": ""}}
+                )
+            else:
+                await self._finish(job["_id"], owner, FAILED, error=str(e))
+        finally:
+            heartbeat.cancel()
+            if not task.done():
+                task.cancel()
+            jobs_total.inc(kind=kind, status=outcome)
+            job_duration_seconds.observe(time.perf_counter() - start, kind=kind, status=outcome)
+
+    async def _heartbeat(self, context: JobContext, task: asyncio.Task):
+        """Renew the lease while the handler runs; cancel it when asked to or when the lease is lost"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                job = await get_database().jobs.find_one_and_update(
+                    {"_id": context.id, "lease_owner": context.owner},
+                    {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+                    projection={"cancel_requested": 1}
+                )
+            except PyMongoError as e:
+                logger.warning(f"Lease renewal of job {context.id} failed: {e}")
+                continue
+            if job is None:
+                context.lease_lost = True
+                task.cancel()
+                return
+            if job.get("cancel_requested"):
+                context.cancel_requested = True
+                task.cancel()
+                return
+
+    async def _finish(self, job_id: ObjectId, owner: str, status: str, **fields):
+        now = datetime.utcnow()
+        await get_database().jobs.update_one(
+            {"_id": job_id, "lease_owner": owner},
+            {"$set": {"status": status, "finished_at": now, "updated_at": now, **fields},
+             "$unset": {"lease_owner": "", "lease_expires_at": ""}}
+        )
+
+    async def _purge_if_due(self):
+        if time.monotonic() - self._purged_at < PURGE_INTERVAL_SECONDS:
+            return
+        self._purged_at = time.monotonic()
+        purged = await self.purge()
+        if purged:
+            logger.info(f"Purged {purged} finished jobs")
+
+    async def purge(self) -> int:
+        """Delete jobs finished more than JOB_RETENTION_DAYS ago, with their files"""
+        db = get_database()
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        query = {"status": {"$in": list(FINAL_STATUSES)}, "finished_at": {"$lt": cutoff}}
+        job_ids = []
+        async for job in db.jobs.find(query, {"files": 1}):
+            job_ids.append(job["_id"])
+            for file_id in (job.get("files") or {}).values():
+                try:
+                    await self.files_bucket().delete(file_id)
+                except Exception as e:
+                    logger.warning(f"Could not delete file {file_id} of job {job['_id']}: {e}")
+        if job_ids:
+            await db.jobs.delete_many({"_id": {"$in": job_ids}})
+        return len(job_ids)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": len(self._tasks),
+            "kinds": self.kinds(),
+            "running": dict(self.running),
+            "lease_seconds": self.lease_seconds
+        }
+
+
+def job_to_dict(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Public view of a job document"""
+    return {"id": str(job["_id"]), **{field: job.get(field) for field in PUBLIC_FIELDS}}
+
+
+def accepted(job: Dict[str, Any], **extra) -> FastJSONResponse:
+    """202 response for an operation submitted as a job"""
+    return FastJSONResponse(
+        {
+            "job_id": str(job["_id"]),
+            "kind": job["kind"],
+            "status": job["status"],
+            "status_url": f"/api/admin/jobs/{job['_id']}",
+            **extra
+        },
+        status_code=202
+    )
+
+
+# Global instance
+job_runner = JobRunner(
+    workers=settings.JOB_WORKERS,
+    lease_seconds=settings.JOB_LEASE_SECONDS,
+    poll_seconds=settings.JOB_POLL_SECONDS,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+    retry_delay_seconds=settings.JOB_RETRY_DELAY_SECONDS,
+    retention_days=settings.JOB_RETENTION_DAYS
+)
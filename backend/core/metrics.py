@@ -0,0 +1,186 @@
+"""
+Prometheus metrics registry
+Minimal counters and histograms rendered in the Prometheus text exposition
+format, without pulling in an extra client dependency
+"""
+from threading import Lock
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds (Prometheus client defaults plus a 30s tail for AI calls)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0)
+
+# Per-request MongoDB command counts
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250, 500)
+
+# Background job run time in seconds (uploads and AI generation run for minutes)
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Monotonic counter with a fixed set of label names"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with a fixed set of label names"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [bucket counts..., sum, count]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{labels} {int(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric exported on /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        if name not in self._metrics:
+            self._metrics[name] = Counter(name, documentation, labelnames)
+        return self._metrics[name]
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        if name not in self._metrics:
+            self._metrics[name] = Histogram(name, documentation, labelnames, buckets)
+        return self._metrics[name]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Global registry
+registry = MetricsRegistry()
+
+# ==================== HTTP ====================
+
+http_requests_total = registry.counter(
+    "http_requests_total", "HTTP requests by route template and status",
+    ("method", "route", "status")
+)
+http_request_duration_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route", "status")
+)
+
+# ==================== MONGODB ====================
+
+http_request_mongodb_commands = registry.histogram(
+    "http_request_mongodb_commands", "MongoDB commands issued per HTTP request",
+    ("method", "route"), buckets=COUNT_BUCKETS
+)
+http_request_mongodb_duration_seconds = registry.histogram(
+    "http_request_mongodb_duration_seconds", "Time spent in MongoDB commands per HTTP request",
+    ("method", "route")
+)
+mongodb_commands_total = registry.counter(
+    "mongodb_commands_total", "MongoDB commands issued while serving HTTP requests",
+    ("route", "command")
+)
+
+# ==================== PASSWORD HASHING ====================
+
+password_hash_queue_seconds = registry.histogram(
+    "password_hash_queue_seconds", "Time bcrypt calls wait for a hashing worker",
+    ("operation",)
+)
+password_hash_duration_seconds = registry.histogram(
+    "password_hash_duration_seconds", "bcrypt execution time on the hashing pool",
+    ("operation",)
+)
+
+# ==================== GEMINI ====================
+
+gemini_requests_total = registry.counter(
+    "gemini_requests_total", "Outbound Gemini generate_content calls",
+    ("model", "status")
+)
+gemini_request_duration_seconds = registry.histogram(
+    "gemini_request_duration_seconds", "Outbound Gemini generate_content latency",
+    ("model",)
+)
+
+# ==================== JOBS ====================
+
+jobs_total = registry.counter(
+    "jobs_total", "Background job attempts by kind and outcome",
+    ("kind", "status")
+)
+job_duration_seconds = registry.histogram(
+    "job_duration_seconds", "Background job attempt run time",
+    ("kind", "status"), buckets=JOB_BUCKETS
+)
@@ -0,0 +1,62 @@
+"""
+Request Metrics Middleware
+Records request count, status and latency per route template, plus the
+MongoDB commands each request issued, into the Prometheus registry
+"""
+
+import time
+
+from core.database.monitoring import RequestCommandStats, request_command_stats
+from core.metrics import (
+    http_requests_total,
+    http_request_duration_seconds,
+    http_request_mongodb_commands,
+    http_request_mongodb_duration_seconds,
+    mongodb_commands_total
+)
+
+# Label for requests that did not match any route, so 404 scans cannot
+# blow up label cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (does not buffer streaming responses)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestCommandStats()
+        token = request_command_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            request_command_stats.reset(token)
+
+            # The router stores the matched route on the (shared) scope
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            method = scope.get("method", "")
+            status = str(status_code)
+
+            http_requests_total.inc(method=method, route=route_path, status=status)
+            http_request_duration_seconds.observe(duration, method=method, route=route_path, status=status)
+            http_request_mongodb_commands.observe(stats.count, method=method, route=route_path)
+            http_request_mongodb_duration_seconds.observe(stats.duration_seconds, method=method, route=route_path)
+            for command_name, count in stats.by_command.items():
+                mongodb_commands_total.inc(count, route=route_path, command=command_name)
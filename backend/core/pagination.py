@@ -0,0 +1,151 @@
+"""
+Keyset (cursor) pagination
+Listings are ordered by (sort_key, _id) and each page seeks past the last
+row of the previous one through an index, so page N costs the same as
+page 1. Cursors are opaque URL-safe tokens; totals are estimated unless
+the caller asks for an exact count, and skipped when it needs none.
+"""
+import base64
+from typing import Any, Dict, Optional, Tuple
+
+from bson import ObjectId, json_util
+from fastapi import HTTPException
+from pymongo import ASCENDING
+
+from core.config import settings
+
+
+def encode_cursor(sort_field: str, document: Dict[str, Any]) -> str:
+    """Build the cursor pointing just after `document`"""
+    payload = {"f": sort_field, "id": document["_id"]}
+    if sort_field != "_id":
+        payload["v"] = document.get(sort_field)
+    raw = json_util.dumps(payload).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str) -> Tuple[Any, ObjectId]:
+    """
+    Decode a cursor issued for `sort_field`
+
+    Returns:
+        (sort value, _id) of the last row already returned
+
+    Raises:
+        HTTPException 400 if the token is malformed or was issued for another ordering
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json_util.loads(raw)
+        last_id = payload["id"]
+        if payload["f"] != sort_field or not isinstance(last_id, ObjectId):
+            raise ValueError
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return payload.get("v"), last_id
+
+
+def seek_query(query: Dict[str, Any], sort_field: str, direction: int, cursor: str) -> Dict[str, Any]:
+    """
+    Restrict `query` to rows strictly after the cursor in (sort_field, _id) order
+
+    MongoDB sorts null and missing values before every other value, but
+    range operators never match them, so rows without a sort value are
+    sought explicitly: after the others when descending, before them when
+    ascending.
+    """
+    last_value, last_id = decode_cursor(cursor, sort_field)
+    op = "$gt" if direction == ASCENDING else "$lt"
+
+    if sort_field == "_id":
+        seek = {"_id": {op: last_id}}
+    elif last_value is None:
+        seek = {sort_field: None, "_id": {op: last_id}}
+        if direction == ASCENDING:
+            seek = {"$or": [seek, {sort_field: {"$ne": None}}]}
+    else:
+        seek = {"$or": [
+            {sort_field: {op: last_value}},
+            {sort_field: last_value, "_id": {op: last_id}}
+        ]}
+        if direction != ASCENDING:
+            seek["$or"].append({sort_field: None})
+    return {"$and": [query, seek]} if query else seek
+
+
+async def count_total(collection, query: Dict[str, Any], exact: bool = False) -> Tuple[int, bool]:
+    """
+    Count matching documents without paying for a full scan by default
+
+    An unfiltered count uses collection metadata; a filtered count stops at
+    PAGINATION_COUNT_CAP, in which case the total is a lower bound.
+
+    Returns:
+        (total, whether the total is exact)
+    """
+    if exact:
+        return await collection.count_documents(query), True
+    if not query:
+        return await collection.estimated_document_count(), False
+
+    cap = settings.PAGINATION_COUNT_CAP
+    total = await collection.count_documents(query, limit=cap)
+    return total, total < cap
+
+
+async def paginate(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    direction: int,
+    limit: int,
+    cursor: Optional[str] = None,
+    page: int = 1,
+    exact_total: bool = False,
+    projection: Optional[Dict[str, Any]] = None,
+    include_total: bool = True
+) -> Dict[str, Any]:
+    """
+    Fetch one page of a (sort_field, _id) ordered listing
+
+    Args:
+        collection: Motor collection
+        query: Filter for the listing
+        sort_field: Leading sort key ("_id" for insertion order)
+        direction: ASCENDING or DESCENDING, applied to both sort_field and _id
+        limit: Page size
+        cursor: next_cursor from the previous page; takes precedence over page
+        page: Offset page number, kept for clients that do not send cursors yet
+        exact_total: Count every match instead of estimating
+        projection: Fields to return (sort_field and _id are always included)
+        include_total: Count the matches; when False, total, total_exact and
+            pages are None and has_more is the only end-of-listing signal
+
+    Returns:
+        items, next_cursor, has_more, total, total_exact, page, pages
+    """
+    if cursor:
+        find_query = seek_query(query, sort_field, direction, cursor)
+        skip = 0
+    else:
+        find_query = query
+        skip = (page - 1) * limit
+
+    sort = [(sort_field, direction)] if sort_field == "_id" else [(sort_field, direction), ("_id", direction)]
+    if projection is not None:
+        projection = {**projection, sort_field: 1}
+    rows = await collection.find(find_query, projection).sort(sort).skip(skip).limit(limit + 1).to_list(limit + 1)
+
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    total, total_exact = await count_total(collection, query, exact_total) if include_total else (None, None)
+
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(sort_field, items[-1]) if has_more else None,
+        "has_more": has_more,
+        "total": total,
+        "total_exact": total_exact,
+        "page": None if cursor else page,
+        "pages": (total + limit - 1) // limit if include_total else None
+    }
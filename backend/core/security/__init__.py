@@ -1,17 +1,24 @@
 from .auth import (
     get_password_hash,
     verify_password,
+    get_password_hash_async,
+    verify_password_async,
     create_access_token,
     get_current_user,
     get_admin_user,
     security
 )
+from .user_cache import user_cache
+
 
 __all__ = [
     'get_password_hash',
     'verify_password',
+    'get_password_hash_async',
+    'verify_password_async',
     'create_access_token',
     'get_current_user',
     'get_admin_user',
-    'security'
+    'security',
+    'user_cache'
 ]
@@ -1,25 +1,32 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict
-from bson import ObjectId
 from core.config import settings
 from core.database import get_database
+from core.security.user_cache import get_cached_user
+from core.security.password_hasher import pwd_context, password_hasher
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+    """Verify a password against its hash (blocking, avoid in request handlers)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
+    """Hash a password (blocking, avoid in request handlers)"""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the bounded hashing pool"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the bounded hashing pool"""
+    return await password_hasher.hash(password)
+
 def create_access_token(data: dict) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -45,8 +52,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
-    db = get_database()
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await get_cached_user(get_database(), user_id)
     if user is None:
         raise credentials_exception
     
@@ -0,0 +1,51 @@
+"""
+Password hasher
+Runs bcrypt on a dedicated, bounded thread pool so hashing never blocks the
+event loop, and records queue and execution time for every call
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from passlib.context import CryptContext
+
+from core.config import settings
+from core.metrics import password_hash_queue_seconds, password_hash_duration_seconds
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasher:
+    """bcrypt executor; the worker count is the concurrency cap"""
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+
+    def _timed(self, operation: str, fn: Callable, submitted_at: float, *args):
+        started_at = time.perf_counter()
+        password_hash_queue_seconds.observe(started_at - submitted_at, operation=operation)
+        try:
+            return fn(*args)
+        finally:
+            password_hash_duration_seconds.observe(time.perf_counter() - started_at, operation=operation)
+
+    async def _run(self, operation: str, fn: Callable, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self._timed, operation, fn, time.perf_counter(), *args
+        )
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", pwd_context.verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", pwd_context.hash, password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+
+# Global instance
+password_hasher = PasswordHasher(max_workers=settings.PASSWORD_HASH_WORKERS)
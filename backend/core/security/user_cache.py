@@ -0,0 +1,86 @@
+"""
+Authenticated user cache
+Bounded TTL cache of projected user documents, keyed by user id, so that
+resolving the JWT subject does not hit MongoDB on every request
+"""
+from typing import Any, Dict, Optional
+
+from bson import ObjectId
+from cachetools import TTLCache
+
+from core.config import settings
+
+# Fields never kept in memory
+USER_PROJECTION = {"password": 0}
+
+
+class UserCache:
+    """TTL/LRU cache of user documents with hit-rate counters"""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        user = self._cache.get(str(user_id))
+        if user is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Hand out copies so request handlers cannot mutate the cached entry
+        return dict(user)
+
+    def set(self, user_id: str, user: Dict[str, Any]):
+        self._cache[str(user_id)] = dict(user)
+
+    def invalidate(self, user_id: Any):
+        """Drop a user after a write to their document"""
+        if self._cache.pop(str(user_id), None) is not None:
+            self.invalidations += 1
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# Global instance
+user_cache = UserCache(
+    maxsize=settings.USER_CACHE_MAX_SIZE,
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
+
+
+async def get_cached_user(db, user_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve a user by id, serving from the cache when possible
+
+    Args:
+        db: Motor database handle
+        user_id: User id from the JWT subject
+
+    Returns:
+        User document without the password hash, or None if not found
+    """
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    user = await db.users.find_one({"_id": ObjectId(user_id)}, USER_PROJECTION)
+    if user is not None:
+        user_cache.set(user_id, user)
+    return user
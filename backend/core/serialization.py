@@ -0,0 +1,152 @@
+"""
+Fast response serialization
+Turns trusted MongoDB documents straight into JSON bytes with orjson,
+skipping per-document pydantic validation on hot read paths
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+
+def _default(obj: Any):
+    """Types orjson/json cannot encode natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes (orjson when installed, stdlib json otherwise)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by dumps(); routes opt in by returning it directly
+
+    Returning a Response instance bypasses response_model validation, so the
+    route keeps its response_model for the OpenAPI schema only.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# ==================== QUESTIONS ====================
+
+# QuestionResponse fields in declaration order, with the defaults the routes
+# used when a document predates the extended 24-column CSV format
+QUESTION_FIELDS = (
+    ("sub_section_id", None),
+    ("question_text", None),
+    ("options", None),
+    ("correct_answer", None),
+    ("difficulty", None),
+    ("tags", []),
+    ("explanation", ""),
+    ("hint", ""),
+    ("solution", ""),
+    ("code_snippet", ""),
+    ("image_url", ""),
+    ("formula", ""),
+    ("created_at", None),
+    ("uid", ""),
+    ("exam", ""),
+    ("year", ""),
+    ("subject", ""),
+    ("chapter", ""),
+    ("topic", ""),
+    ("question_type", "MCQ-SC"),
+    ("answer_choices_count", 4),
+    ("marks", 1.0),
+    ("negative_marks", 0.0),
+    ("time_limit_seconds", 120),
+    ("formula_latex", ""),
+    ("image_alt_text", ""),
+    ("confidence_score", 1.0),
+    ("source_notes", ""),
+)
+
+# Numeric fields coerced the same way pydantic would on output
+_FLOAT_FIELDS = ("marks", "negative_marks", "confidence_score")
+_INT_FIELDS = ("correct_answer", "answer_choices_count", "time_limit_seconds")
+
+
+def question_to_dict(q: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Project a question document onto the QuestionResponse shape
+
+    Args:
+        q: Question document from MongoDB
+
+    Returns:
+        Dict with the same keys and defaults as QuestionResponse
+    """
+    data = {"id": str(q["_id"])}
+    for field, default in QUESTION_FIELDS:
+        data[field] = q.get(field, default)
+
+    if data["created_at"] is None:
+        data["created_at"] = datetime.utcnow()
+    for field in _FLOAT_FIELDS:
+        if type(data[field]) is int:
+            data[field] = float(data[field])
+    for field in _INT_FIELDS:
+        value = data[field]
+        if type(value) is float and value.is_integer():
+            data[field] = int(value)
+    return data
+
+
+def questions_to_list(questions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [question_to_dict(q) for q in questions]
+
+
+# ==================== TEST RESULTS ====================
+
+TEST_RESULT_FIELDS = ("user_id", "score", "total_questions", "correct_answers", "percentile", "questions", "timestamp")
+# Percentile within the test's exam and subject (None when its questions span several)
+TEST_RESULT_SCOPED_PERCENTILES = ("exam_percentile", "subject_percentile")
+
+
+def result_to_dict(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a test_results document onto the TestResultResponse shape"""
+    data = {"id": str(r["_id"])}
+    for field in TEST_RESULT_FIELDS:
+        data[field] = r[field]
+    data["score"] = float(data["score"])
+    data["percentile"] = float(data["percentile"])
+    # Results stored before scoped percentiles were reported have none
+    for field in TEST_RESULT_SCOPED_PERCENTILES:
+        data[field] = r.get(field)
+    return data
+
+
+# Fields of a history list entry; the embedded questions stay in the database
+TEST_RESULT_SUMMARY_FIELDS = ("score", "total_questions", "correct_answers", "percentile", "timestamp")
+TEST_RESULT_SUMMARY_PROJECTION = {field: 1 for field in TEST_RESULT_SUMMARY_FIELDS}
+
+
+def result_summary_to_dict(r: Dict[str, Any]) -> Dict[str, Any]:
+    """Project a test_results document onto the TestResultSummary shape"""
+    data = {"id": str(r["_id"])}
+    for field in TEST_RESULT_SUMMARY_FIELDS:
+        data[field] = r[field]
+    data["score"] = float(data["score"])
+    data["percentile"] = float(data["percentile"])
+    return data
+
@@ -4,11 +4,13 @@ Consolidated backend serving Mobile App, Web App, and Admin Dashboard
 Organized in a 5-level nested structure
 """
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import uvicorn
+import asyncio
 import logging
 
 # Core imports
@@ -18,6 +20,15 @@ from core.middleware.error_handler import (
     validation_exception_handler,
     general_exception_handler
 )
+from core.database import get_database
+from core.database.mongodb import Database
+from core.database.indexes import ensure_indexes, check_index_drift, get_index_report
+from core.middleware.metrics_middleware import MetricsMiddleware
+from core.security import get_admin_user
+from core.security.password_hasher import password_hasher
+from core.metrics import registry as metrics_registry
+from api.v1.tests.services.answer_keys import answer_keys
+from core.jobs import job_runner
 
 # Import organized routes
 from api.v1.auth.routes import router as auth_router
@@ -49,8 +60,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Has-More"],  # cursor pagination of array responses
 )
 
+# Request metrics (outermost, so CORS preflights and errors are counted too)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Exception handlers
 app.add_exception_handler(StarletteHTTPException, http_exception_handler)
 app.add_exception_handler(RequestValidationError, validation_exception_handler)
@@ -65,6 +81,22 @@ async def health_check():
         "version": settings.APP_VERSION
     }
 
+@app.get("/health/indexes")
+async def index_health_check(refresh: bool = False, current_user: dict = Depends(get_admin_user)):
+    """Report MongoDB index drift (declared but missing, undeclared extras, other options); admin only"""
+    report = get_index_report()
+    if refresh or report is None:
+        report = await check_index_drift(get_database())
+    return report
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics():
+    """Prometheus metrics in text exposition format"""
+    return PlainTextResponse(
+        metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -94,14 +126,41 @@ async def startup_event():
     logger.info(f"🚀 {settings.APP_NAME} v{settings.APP_VERSION} starting...")
     logger.info(f"📊 Database: {settings.DB_NAME}")
     logger.info(f"🌐 CORS Origins: {settings.ALLOWED_ORIGINS}")
+    # Warm up the shared connection pool before the first request
+    try:
+        await Database.ping()
+        logger.info(f"🔌 MongoDB pool ready (maxPoolSize={settings.MONGO_MAX_POOL_SIZE})")
+    except Exception as e:
+        logger.error(f"MongoDB warm-up ping failed: {e}")
+    if settings.AUTO_CREATE_INDEXES:
+        # Build missing indexes in the background so startup is not blocked
+        app.state.index_bootstrap = asyncio.create_task(_bootstrap_indexes())
+    # Load the answer keys used for grading without delaying startup
+    app.state.answer_keys_preload = asyncio.create_task(_preload_answer_keys())
+    # Run queued background jobs (and pick up ones a crashed process left behind)
+    job_runner.start()
     logger.info("✅ Application startup complete")
 
+async def _bootstrap_indexes():
+    try:
+        await ensure_indexes(get_database())
+    except Exception as e:
+        logger.error(f"Index bootstrap failed: {e}")
+
+async def _preload_answer_keys():
+    try:
+        count = await answer_keys.reload()
+        logger.info(f"🔑 Answer keys loaded ({count} questions)")
+    except Exception as e:
+        logger.error(f"Answer key preload failed: {e}")
+
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("👋 Application shutting down...")
-    from core.database.mongodb import Database
+    await job_runner.stop()
     await Database.close()
+    password_hasher.shutdown()
     logger.info("✅ Database connections closed")
 
 if __name__ == "__main__":
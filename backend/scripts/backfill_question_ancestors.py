@@ -0,0 +1,34 @@
+"""
+Back-fill the denormalized ancestor ids on every question
+
+Needed once after deploying question ancestry (existing questions only
+carry sub_section_id) and after hierarchy edits made directly in the
+database. Writes only questions whose chain changed, so it is safe to
+re-run.
+
+Usage (from backend/):
+    python -m scripts.backfill_question_ancestors --batch-size 500
+"""
+import argparse
+import asyncio
+import time
+
+from core.database.mongodb import Database
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
+
+
+async def main(batch_size: int):
+    start = time.perf_counter()
+    try:
+        summary = await QuestionAncestryService.backfill(batch_size=batch_size)
+    finally:
+        await Database.close()
+    print(f"Scanned {summary['scanned']} questions, updated {summary['updated']} "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="questions per cursor batch and bulk write")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
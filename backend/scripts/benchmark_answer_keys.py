@@ -0,0 +1,100 @@
+"""
+Benchmark: answer-key store memory footprint and lookup latency
+
+Builds the array-backed AnswerKeyColumns for a synthetic question bank and
+compares its size with the obvious alternative, a dict of per-question
+dicts keyed by id string, measured with tracemalloc. Lookups are timed for
+random ids of the bank. Keys are synthetic, so no database is needed.
+
+Usage (from backend/):
+    python -m scripts.benchmark_answer_keys --count 1000000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from bson import ObjectId
+
+from api.v1.tests.services.answer_keys import AnswerKey, AnswerKeyColumns
+
+# Marking schemes seen in a typical bank: (marks, negative marks, question type)
+SCHEMES = [
+    (1.0, 0.0, "MCQ-SC"),
+    (4.0, 1.0, "MCQ-SC"),
+    (2.0, 0.5, "MCQ-SC"),
+    (4.0, 2.0, "MCQ-MC"),
+    (1.0, 0.33, "MCQ-SC"),
+    (4.0, 0.0, "NUMERICAL"),
+]
+
+
+def make_keys(count: int) -> list:
+    rng = random.Random(42)
+    return sorted(
+        ((ObjectId(), AnswerKey(rng.randrange(4), *rng.choice(SCHEMES))) for _ in range(count)),
+        key=lambda pair: pair[0].binary
+    )
+
+
+def build_columns(keys: list) -> AnswerKeyColumns:
+    columns = AnswerKeyColumns()
+    for question_id, key in keys:
+        columns.append(question_id, key)
+    return columns
+
+
+def build_dict(keys: list) -> dict:
+    return {
+        str(question_id): {
+            "correct_answer": key.correct_answer,
+            "marks": key.marks,
+            "negative_marks": key.negative_marks,
+            "question_type": key.question_type
+        } for question_id, key in keys
+    }
+
+
+def traced(build, keys: list):
+    """(structure, bytes allocated while building it and still alive)"""
+    tracemalloc.start()
+    structure = build(keys)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, size
+
+
+def main(count: int, lookups: int):
+    keys = make_keys(count)
+    columns, columns_bytes = traced(build_columns, keys)
+    mapping, dict_bytes = traced(build_dict, keys)
+
+    probes = [question_id for question_id, _ in random.Random(7).sample(keys, min(lookups, count))]
+    start = time.perf_counter()
+    for question_id in probes:
+        columns.find(question_id)
+    array_lookup = (time.perf_counter() - start) / len(probes)
+    start = time.perf_counter()
+    for question_id in probes:
+        mapping[str(question_id)]
+    dict_lookup = (time.perf_counter() - start) / len(probes)
+
+    expected = dict(keys[:1000])
+    assert all(columns.find(question_id) == key for question_id, key in expected.items())
+    assert columns.find(ObjectId()) is None
+
+    print(f"{count:,} questions, {len(columns.scheme_table)} marking schemes")
+    print(f"  typed arrays:    {columns_bytes / 1024 / 1024:8.1f} MB  ({columns_bytes / count:5.1f} B/question, "
+          f"{columns.nbytes() / count:.0f} B in the arrays)")
+    print(f"  dict of dicts:   {dict_bytes / 1024 / 1024:8.1f} MB  ({dict_bytes / count:5.1f} B/question)")
+    print(f"  reduction:       {dict_bytes / columns_bytes:8.1f}x")
+    print(f"  lookup (array):  {array_lookup * 1e6:8.2f} us  (binary search, {len(probes):,} random ids)")
+    print(f"  lookup (dict):   {dict_lookup * 1e6:8.2f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1_000_000, help="questions in the bank")
+    parser.add_argument("--lookups", type=int, default=100_000, help="timed random lookups")
+    args = parser.parse_args()
+    main(args.count, args.lookups)
@@ -0,0 +1,129 @@
+"""
+Benchmark: Excel question upload, pandas.read_excel vs streaming sheets
+
+Builds a synthetic 24-column workbook (200,000 rows over 4 sheets by
+default, cached in the temp directory) and reads it into question
+documents two ways, each in a fresh process:
+
+    read_excel  pandas.read_excel of every sheet (openpyxl normal mode), then
+                the transformation in UPLOAD_CHUNK_ROWS slices
+    streaming   excel_reader.workbook_to_csv (read-only parser, one process
+                per sheet up to --workers), then read_csv chunks as uploads do
+
+Reports wall time, rows/s, peak RSS of the process doing the upload and
+of the largest reader process. The database is not part of the timings.
+
+Usage (from backend/):
+    python -m scripts.benchmark_excel_ingest --rows 200000 --sheets 4 --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from core.config import settings
+from api.v1.questions.services import question_ingest
+from scripts.benchmark_question_ingest import make_sheet
+
+
+def build_workbook(path: str, rows: int, sheets: int):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    per_sheet = -(-rows // sheets)
+    for number in range(sheets):
+        df = make_sheet(min(per_sheet, rows - number * per_sheet))
+        df["UID"] = [f"S{number}-{uid}" for uid in df["UID"]]
+        sheet = workbook.create_sheet(f"Sheet{number + 1}")
+        sheet.append(list(df.columns))
+        for values in df.itertuples(index=False):
+            sheet.append([value.item() if hasattr(value, "item") else value for value in values])
+    workbook.save(f"{path}.partial")
+    os.replace(f"{path}.partial", path)
+
+
+def transform(chunks) -> int:
+    documents = 0
+    for chunk in chunks:
+        documents += len(question_ingest.format_records(chunk, question_ingest.NEW_FORMAT))
+    return documents
+
+
+def read_excel(path: str, workers: int) -> int:
+    size = settings.UPLOAD_CHUNK_ROWS
+    documents = 0
+    for df in pd.read_excel(path, sheet_name=None).values():
+        documents += transform(df.iloc[start:start + size] for start in range(0, len(df), size))
+    return documents
+
+
+def streaming(path: str, workers: int) -> int:
+    from api.v1.questions.services import excel_reader
+
+    documents = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for sheet in asyncio.run(excel_reader.workbook_to_csv(path, directory, workers)):
+            with pd.read_csv(sheet.path, chunksize=settings.UPLOAD_CHUNK_ROWS) as chunks:
+                documents += transform(chunks)
+    return documents
+
+
+VARIANTS = {"read_excel": read_excel, "streaming": streaming}
+
+
+def run_variant(variant: str, path: str, workers: int):
+    """Child process: run one variant and print its measurements as JSON"""
+    start = time.perf_counter()
+    documents = VARIANTS[variant](path, workers)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "documents": documents,
+        "seconds": elapsed,
+        "main_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "reader_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    }))
+
+
+def main(rows: int, sheets: int, workers: int):
+    path = os.path.join(tempfile.gettempdir(), f"benchmark_questions_{rows}x{sheets}.xlsx")
+    if not os.path.exists(path):
+        print(f"building {path} ...")
+        build_workbook(path, rows, sheets)
+    print(f"{rows:,} rows in {sheets} sheets, {os.path.getsize(path) / 2**20:.1f} MB, "
+          f"{os.cpu_count()} CPUs (reader processes are capped at one per CPU)\n")
+
+    print(f"{'variant':<22} {'time':>9} {'rows/s':>9} {'main RSS':>10} {'reader RSS':>11}")
+    runs = [("read_excel", 1), ("streaming", 1)] + ([("streaming", workers)] if workers > 1 else [])
+    for variant, count in runs:
+        output = subprocess.run(
+            [sys.executable, "-m", "scripts.benchmark_excel_ingest", "--run", variant,
+             "--workers", str(count), "--workbook", path],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        assert result["documents"] == rows, f"{variant} produced {result['documents']} documents"
+        label = variant if variant == "read_excel" else f"{variant} ({count} workers)"
+        reader = f"{result['reader_mb']:>8.0f} MB" if variant == "streaming" else f"{'-':>11}"
+        print(f"{label:<22} {result['seconds']:>7.1f} s {rows / result['seconds']:>9,.0f} "
+              f"{result['main_mb']:>7.0f} MB {reader}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows in the workbook")
+    parser.add_argument("--sheets", type=int, default=4, help="sheets the rows are split over")
+    parser.add_argument("--workers", type=int, default=settings.EXCEL_READ_WORKERS, help="reader processes")
+    parser.add_argument("--run", choices=sorted(VARIANTS), help=argparse.SUPPRESS)
+    parser.add_argument("--workbook", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        run_variant(args.run, args.workbook, args.workers)
+    else:
+        main(args.rows, args.sheets, args.workers)
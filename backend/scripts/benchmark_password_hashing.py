@@ -0,0 +1,93 @@
+"""
+Benchmark: event-loop latency under concurrent logins
+
+Runs a burst of concurrent bcrypt verifications twice: inline on the event
+loop (the old behaviour) and on the bounded hashing pool. A ticker coroutine
+measures how late the loop wakes it up while the burst is in flight.
+
+Usage (from backend/):
+    python -m scripts.benchmark_password_hashing --logins 32
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from core.security.auth import verify_password, verify_password_async, get_password_hash
+from core.security.password_hasher import password_hasher
+
+
+async def _ticker(interval: float, lags: list, stop: asyncio.Event):
+    """Sleep in a loop and record how late each wake-up was"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected))
+
+
+async def _blocking_login(password: str, hashed: str):
+    return verify_password(password, hashed)
+
+
+async def _pooled_login(password: str, hashed: str):
+    return await verify_password_async(password, hashed)
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(name: str, login, logins: int, hashed: str, interval: float) -> dict:
+    lags: list = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(interval, lags, stop))
+    await asyncio.sleep(interval * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(login("benchmark-password", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    assert all(results)
+
+    return {
+        "scenario": name,
+        "logins": logins,
+        "wall_s": elapsed,
+        "logins_per_s": logins / elapsed,
+        "lag_p50_ms": _percentile(lags, 50) * 1000,
+        "lag_p99_ms": _percentile(lags, 99) * 1000,
+        "lag_max_ms": max(lags) * 1000 if lags else 0.0,
+        "lag_mean_ms": statistics.mean(lags) * 1000 if lags else 0.0
+    }
+
+
+async def main(logins: int, interval_ms: float):
+    hashed = get_password_hash("benchmark-password")
+    interval = interval_ms / 1000
+
+    rows = [
+        await run_scenario("inline (event loop)", _blocking_login, logins, hashed, interval),
+        await run_scenario(f"pool ({password_hasher.max_workers} workers)", _pooled_login, logins, hashed, interval),
+    ]
+
+    print(f"{'scenario':<24}{'logins':>8}{'wall s':>9}{'login/s':>9}"
+          f"{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for row in rows:
+        print(f"{row['scenario']:<24}{row['logins']:>8}{row['wall_s']:>9.2f}{row['logins_per_s']:>9.1f}"
+              f"{row['lag_p50_ms']:>12.1f}{row['lag_p99_ms']:>12.1f}{row['lag_max_ms']:>12.1f}")
+
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent logins in the burst")
+    parser.add_argument("--interval-ms", type=float, default=5.0, help="ticker sleep interval")
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.interval_ms))
@@ -0,0 +1,136 @@
+"""
+Benchmark: CSV-to-question transformation, iterrows vs column-wise
+
+Times the per-row implementation the upload endpoints used (iterrows with
+row.get/pd.notna for every cell, copied below as the baseline) against
+api.v1.questions.services.question_ingest on synthetic 24-column sheets,
+and checks that both produce the same documents. The DataFrame is built
+in memory, so CSV parsing and the database are not part of the timings.
+
+Usage (from backend/):
+    python -m scripts.benchmark_question_ingest --rows 10000 100000 1000000
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from api.v1.questions.services import question_ingest
+
+
+def make_sheet(rows: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    index = np.arange(rows)
+    choices = rng.choice([2, 3, 4], size=rows, p=[0.1, 0.2, 0.7])
+    return pd.DataFrame({
+        "UID": [f"Q{i:07d}" for i in index],
+        "Exam": rng.choice(["JEE", "NEET", "GATE"], size=rows),
+        "Year": rng.integers(2015, 2025, size=rows),
+        "Subject": rng.choice(["Physics", "Chemistry", "Mathematics"], size=rows),
+        "Chapter": [f"Chapter {i % 40}" for i in index],
+        "Topic": [f"Topic {i % 200}" for i in index],
+        "QuestionType": "MCQ-SC",
+        "QuestionText": [f"Question {i}: which statement about topic {i % 200} is correct?" for i in index],
+        "OptionA": [f"Option A of {i}" for i in index],
+        "OptionB": [f"Option B of {i}" for i in index],
+        "OptionC": [f"Option C of {i}" for i in index],
+        "OptionD": [f"Option D of {i}" for i in index],
+        "CorrectAnswer": rng.choice(list("ABCD"), size=rows),
+        "AnswerChoicesCount": choices,
+        "Marks": rng.choice([1.0, 4.0], size=rows),
+        "NegativeMarks": rng.choice([0.0, 1.0], size=rows),
+        "TimeLimitSeconds": 120,
+        "Difficulty": rng.choice(["Easy", "Medium", "Hard"], size=rows),
+        "Tags": [f"tag-{i % 7}, tag-{i % 11}" for i in index],
+        "FormulaLaTeX": "E = mc^2",
+        "ImageUploadThingURL": "",
+        "ImageAltText": "",
+        "Explanation": [f"Because of rule {i % 13}" for i in index],
+        "ConfidenceScore": 1.0,
+        "SourceNotes": "synthetic",
+    })
+
+
+def iterrows_records(df: pd.DataFrame) -> list:
+    """The per-row transformation the upload endpoints used before question_ingest"""
+    questions = []
+    for _, row in df.iterrows():
+        answer_choices = int(row.get("AnswerChoicesCount", 4))
+        options = []
+        for i in range(answer_choices):
+            option_key = f"Option{chr(65+i)}"
+            if option_key in df.columns and pd.notna(row.get(option_key)):
+                options.append(str(row[option_key]))
+
+        correct_answer_letter = str(row["CorrectAnswer"]).upper()
+        correct_answer_index = ord(correct_answer_letter) - ord('A') if correct_answer_letter in 'ABCD' else 0
+
+        tags_str = row.get("Tags", "")
+        tags = [tag.strip() for tag in str(tags_str).split(",") if tag.strip()] if pd.notna(tags_str) else []
+
+        questions.append({
+            "sub_section_id": str(row.get("Subject", "")),
+            "question_text": str(row["QuestionText"]),
+            "options": options,
+            "correct_answer": correct_answer_index,
+            "difficulty": str(row.get("Difficulty", "medium")).lower(),
+            "tags": tags,
+            "explanation": str(row.get("Explanation", "")),
+            "hint": "",
+            "solution": str(row.get("Explanation", "")),
+            "code_snippet": "",
+            "image_url": str(row.get("ImageUploadThingURL", "")),
+            "formula": str(row.get("FormulaLaTeX", "")),
+            "uid": str(row.get("UID", "")),
+            "exam": str(row.get("Exam", "")),
+            "year": str(row.get("Year", "")),
+            "subject": str(row.get("Subject", "")),
+            "chapter": str(row.get("Chapter", "")),
+            "topic": str(row.get("Topic", "")),
+            "question_type": str(row.get("QuestionType", "MCQ-SC")),
+            "answer_choices_count": answer_choices,
+            "marks": float(row.get("Marks", 1.0)),
+            "negative_marks": float(row.get("NegativeMarks", 0.0)),
+            "time_limit_seconds": int(row.get("TimeLimitSeconds", 120)),
+            "formula_latex": str(row.get("FormulaLaTeX", "")),
+            "image_alt_text": str(row.get("ImageAltText", "")),
+            "confidence_score": float(row.get("ConfidenceScore", 1.0)),
+            "source_notes": str(row.get("SourceNotes", "")),
+            "created_at": datetime.utcnow()
+        })
+    return questions
+
+
+def timed(fn, df: pd.DataFrame):
+    start = time.perf_counter()
+    records = fn(df)
+    return records, time.perf_counter() - start
+
+
+def same_documents(old: list, new: list) -> bool:
+    strip = lambda records: [{k: v for k, v in r.items() if k != "created_at"} for r in records]
+    return strip(old) == strip(new)
+
+
+def main(row_counts: list, baseline_max_rows: int):
+    print(f"{'rows':>10} {'iterrows':>12} {'column-wise':>12} {'speed-up':>9}")
+    for rows in row_counts:
+        df = make_sheet(rows)
+        new, new_time = timed(question_ingest.new_format_records, df)
+        if rows > baseline_max_rows:
+            print(f"{rows:>10,} {'skipped':>12} {new_time:>10.2f} s {'':>9}")
+            continue
+        old, old_time = timed(iterrows_records, df)
+        assert same_documents(old, new), "column-wise output differs from iterrows"
+        print(f"{rows:>10,} {old_time:>10.2f} s {new_time:>10.2f} s {old_time / new_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000], help="sheet sizes")
+    parser.add_argument("--baseline-max-rows", type=int, default=1_000_000,
+                        help="skip the (slow) iterrows baseline above this many rows")
+    args = parser.parse_args()
+    main(args.rows, args.baseline_max_rows)
@@ -0,0 +1,104 @@
+"""
+Benchmark: 1,000-question admin listing serialization
+
+Compares the old response path (build a QuestionResponse per document, then
+let FastAPI validate against response_model and JSON-encode) with the fast
+path (project documents with question_to_dict and encode with dumps).
+Documents are synthetic, so no database is needed.
+
+Usage (from backend/):
+    python -m scripts.benchmark_question_serialization --count 1000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from bson import ObjectId
+from pydantic import TypeAdapter
+
+from api.v1.questions.models import QuestionResponse
+from core.serialization import ORJSON_AVAILABLE, dumps, question_to_dict, questions_to_list
+
+
+def make_documents(count: int) -> list:
+    created = datetime(2024, 1, 1)
+    return [{
+        "_id": ObjectId(),
+        "sub_section_id": str(ObjectId()),
+        "question_text": f"Question {i}: which of the following statements about topic {i % 37} is correct?",
+        "options": [f"Option {c} for question {i}" for c in "ABCD"],
+        "correct_answer": i % 4,
+        "difficulty": ("easy", "medium", "hard")[i % 3],
+        "tags": ["physics", f"tag-{i % 11}"],
+        "explanation": "Because the reasoning follows from the definition. " * 3,
+        "hint": "Think about the definition",
+        "solution": "Apply the definition step by step",
+        "code_snippet": "",
+        "image_url": "",
+        "formula": "E = mc^2",
+        "created_at": created + timedelta(seconds=i),
+        "uid": f"Q{i:06d}",
+        "exam": "JEE",
+        "year": "2024",
+        "subject": "Physics",
+        "chapter": "Mechanics",
+        "topic": "Kinematics",
+        "question_type": "MCQ-SC",
+        "answer_choices_count": 4,
+        "marks": 4,
+        "negative_marks": 1,
+        "time_limit_seconds": 120,
+        "formula_latex": "E = mc^2",
+        "image_alt_text": "",
+        "confidence_score": 1.0,
+        "source_notes": ""
+    } for i in range(count)]
+
+
+_adapter = TypeAdapter(List[QuestionResponse])
+
+
+def old_path(documents: list) -> bytes:
+    """Per-document model construction + response_model validation + JSONResponse"""
+    models = [QuestionResponse(**question_to_dict(q)) for q in documents]
+    validated = _adapter.validate_python(models)
+    content = _adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(documents: list) -> bytes:
+    return dumps(questions_to_list(documents))
+
+
+def measure(fn, documents: list, repeat: int) -> float:
+    fn(documents)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(documents)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(count: int, repeat: int):
+    documents = make_documents(count)
+    assert json.loads(old_path(documents)) == json.loads(fast_path(documents))
+
+    old = measure(old_path, documents, repeat)
+    fast = measure(fast_path, documents, repeat)
+    encoder = "orjson" if ORJSON_AVAILABLE else "json (orjson not installed)"
+
+    print(f"{count} questions, best of {repeat}, encoder: {encoder}")
+    print(f"  pydantic response_model: {old * 1000:8.2f} ms")
+    print(f"  fast serializer:         {fast * 1000:8.2f} ms")
+    print(f"  speed-up:                {old / fast:8.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000, help="questions in the listing")
+    parser.add_argument("--repeat", type=int, default=20, help="timed repetitions")
+    args = parser.parse_args()
+    main(args.count, args.repeat)
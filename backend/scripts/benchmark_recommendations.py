@@ -0,0 +1,128 @@
+"""
+Benchmark: /recommendations/tests for a user with a heavy test history
+
+Seeds a scratch database (<DB_NAME>_bench) with a topic tree, a question
+bank and one user with --tests results of --questions answers each, then
+times the old per-answer find_one walk against RecommendationService and
+counts the MongoDB commands each one issues. The scratch database is
+dropped afterwards.
+
+Usage (from backend/):
+    python -m scripts.benchmark_recommendations --tests 50 --questions 30
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+from core.config import settings
+from core.database.mongodb import Database
+from core.database.monitoring import pool_telemetry
+from api.v1.content.services.hierarchy_cache import content_cache
+from api.v1.user.services.recommendation_service import RecommendationService
+
+USER_ID = "benchmark-user"
+
+
+async def seed(db, tests: int, questions_per_test: int, topics: int, bank_size: int):
+    topic_ids = (await db.topics.insert_many([
+        {"name": f"Topic {i}", "chapter_id": str(ObjectId())} for i in range(topics)
+    ])).inserted_ids
+    question_ids = (await db.questions.insert_many([
+        {
+            "question_text": f"Question {i}",
+            "options": ["A", "B", "C", "D"],
+            "correct_answer": 0,
+            "topic_id": str(topic_ids[i % topics])
+        } for i in range(bank_size)
+    ])).inserted_ids
+
+    rng = random.Random(42)
+    await db.test_results.insert_many([
+        {
+            "user_id": USER_ID,
+            "score": 0.0,
+            "questions": [
+                {"question_id": str(qid), "is_correct": rng.random() < 0.6}
+                for qid in rng.sample(question_ids, questions_per_test)
+            ],
+            "timestamp": datetime.utcnow()
+        } for _ in range(tests)
+    ])
+
+
+async def old_recommendations(db, user_id: str) -> list:
+    """The per-answer / per-topic find_one walk this service replaced"""
+    results = await db.test_results.find({"user_id": user_id}).to_list(100)
+    topic_performance = {}
+    for result in results:
+        for q in result.get("questions", []):
+            question = await db.questions.find_one({"_id": ObjectId(q["question_id"])})
+            if question and question.get("topic_id"):
+                performance = topic_performance.setdefault(question["topic_id"], {"correct": 0, "total": 0})
+                performance["total"] += 1
+                if q.get("is_correct"):
+                    performance["correct"] += 1
+
+    topic_scores = []
+    for topic_id, performance in topic_performance.items():
+        topic = await db.topics.find_one({"_id": ObjectId(topic_id)})
+        if topic:
+            topic_scores.append({
+                "topic_id": topic_id,
+                "percentage": (performance["correct"] / performance["total"]) * 100
+            })
+    topic_scores.sort(key=lambda x: x["percentage"])
+    return [t["topic_id"] for t in topic_scores[:3]]
+
+
+async def new_recommendations(db, user_id: str) -> list:
+    response = await RecommendationService.recommend_topics(user_id)
+    return [t["topic_id"] for t in response["recommended_topics"]]
+
+
+async def measure(fn, db, repeat: int) -> tuple:
+    await fn(db, USER_ID)  # warm-up (also loads the hierarchy cache)
+    pool_telemetry.reset_commands()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        topics = await fn(db, USER_ID)
+        timings.append(time.perf_counter() - start)
+    commands = sum(stats["count"] for stats in pool_telemetry.snapshot()["commands"].values())
+    return min(timings), commands // repeat, topics
+
+
+async def main(tests: int, questions_per_test: int, topics: int, bank_size: int, repeat: int):
+    settings.DB_NAME = f"{settings.DB_NAME}_bench"
+    db = Database.get_database()
+    try:
+        await db.client.drop_database(settings.DB_NAME)
+        await seed(db, tests, questions_per_test, topics, bank_size)
+        content_cache.invalidate()
+
+        old_time, old_commands, old_topics = await measure(old_recommendations, db, repeat)
+        new_time, new_commands, new_topics = await measure(new_recommendations, db, repeat)
+        assert old_topics == new_topics, (old_topics, new_topics)
+
+        print(f"{tests} tests x {questions_per_test} answers, {topics} topics, best of {repeat}")
+        print(f"  per-answer find_one: {old_time * 1000:9.1f} ms  {old_commands:5d} commands")
+        print(f"  batched $in:         {new_time * 1000:9.1f} ms  {new_commands:5d} commands")
+        print(f"  speed-up:            {old_time / new_time:9.1f}x")
+    finally:
+        await db.client.drop_database(settings.DB_NAME)
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tests", type=int, default=50, help="stored test results of the user")
+    parser.add_argument("--questions", type=int, default=30, help="answers per test")
+    parser.add_argument("--topics", type=int, default=40, help="topics in the bank")
+    parser.add_argument("--bank", type=int, default=2000, help="questions in the bank")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions")
+    args = parser.parse_args()
+    asyncio.run(main(args.tests, args.questions, args.topics, args.bank, args.repeat))
@@ -0,0 +1,73 @@
+"""
+Benchmark: cold import of main:app against a startup budget
+
+Imports `main:app` in fresh interpreters several times and compares the
+median wall time with STARTUP_IMPORT_BUDGET_SECONDS (or --budget). Also
+fails if a dependency that must stay lazy was imported eagerly. Exits
+non-zero on failure so it can gate CI.
+
+Usage (from backend/):
+    python -m scripts.benchmark_startup --runs 5
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Heavy dependencies only the endpoints that need them may import
+LAZY_MODULES = ("pandas", "google.generativeai", "exponent_server_sdk", "openpyxl")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from main import app
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "eager": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+
+def cold_import() -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(lazy=LAZY_MODULES)],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import main failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(runs: int, budget: float) -> int:
+    samples = [cold_import() for _ in range(runs)]
+    timings = sorted(sample["elapsed"] for sample in samples)
+    eager = sorted({module for sample in samples for module in sample["eager"]})
+    median = statistics.median(timings)
+
+    print(f"cold import of main:app over {runs} runs")
+    print(f"  min {timings[0]:.3f} s | median {median:.3f} s | max {timings[-1]:.3f} s | budget {budget:.3f} s")
+
+    failed = False
+    if median > budget:
+        print(f"FAIL: median cold import {median:.3f} s exceeds budget {budget:.3f} s")
+        failed = True
+    if eager:
+        print(f"FAIL: imported eagerly at startup: {', '.join(eager)}")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(BACKEND_DIR))
+    from core.config import settings
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time")
+    parser.add_argument("--budget", type=float, default=settings.STARTUP_IMPORT_BUDGET_SECONDS,
+                        help="maximum median import time in seconds")
+    args = parser.parse_args()
+    sys.exit(main(args.runs, args.budget))
@@ -0,0 +1,127 @@
+"""
+Benchmark: /tests/history payload size and latency, full vs summary view
+
+Seeds a scratch database (<DB_NAME>_bench) with one user holding --tests
+results of --questions answers each (question text, options and
+explanation embedded as submit_test stores them), then times a page of
+the old full history against the summary projection and the lazy
+per-attempt detail read, and reports the encoded payload sizes. The
+scratch database is dropped afterwards.
+
+Usage (from backend/):
+    python -m scripts.benchmark_test_history --tests 500 --questions 50
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from pymongo import DESCENDING
+
+from core.config import settings
+from core.database.mongodb import Database
+from core.pagination import paginate
+from core.serialization import (
+    dumps, result_to_dict, result_summary_to_dict, TEST_RESULT_SUMMARY_PROJECTION
+)
+
+USER_ID = "benchmark-user"
+
+
+async def seed(db, tests: int, questions_per_test: int):
+    rng = random.Random(42)
+    start = datetime.utcnow() - timedelta(days=tests)
+    batch = []
+    for i in range(tests):
+        answers = []
+        for j in range(questions_per_test):
+            user_answer = rng.randrange(4)
+            answers.append({
+                "question_id": f"{i:06d}{j:06d}".rjust(24, "0"),
+                "question_text": f"Question {j}: " + "Which of the following statements holds? " * 4,
+                "options": [f"Option {k}: " + "a plausible distractor " * 3 for k in "ABCD"],
+                "user_answer": user_answer,
+                "correct_answer": 0,
+                "is_correct": user_answer == 0,
+                "explanation": "Worked explanation of the correct option. " * 8
+            })
+        correct = sum(a["is_correct"] for a in answers)
+        batch.append({
+            "user_id": USER_ID,
+            "score": correct / questions_per_test * 100,
+            "total_questions": questions_per_test,
+            "correct_answers": correct,
+            "percentile": rng.uniform(0, 100),
+            "questions": answers,
+            "timestamp": start + timedelta(days=i)
+        })
+        if len(batch) == 100:
+            await db.test_results.insert_many(batch)
+            batch = []
+    if batch:
+        await db.test_results.insert_many(batch)
+
+
+async def full_page(db, limit: int) -> bytes:
+    """The history read this replaced: every document with its questions"""
+    results = await db.test_results.find({"user_id": USER_ID}).sort("timestamp", -1).limit(limit).to_list(limit)
+    return dumps([result_to_dict(r) for r in results])
+
+
+async def summary_page(db, limit: int) -> bytes:
+    page = await paginate(
+        db.test_results, {"user_id": USER_ID}, "timestamp", DESCENDING, limit,
+        projection=TEST_RESULT_SUMMARY_PROJECTION, include_total=False
+    )
+    return dumps([result_summary_to_dict(r) for r in page["items"]])
+
+
+def detail_of(result_id):
+    """The /tests/history/{result_id} read for one attempt"""
+    async def detail(db, limit: int) -> bytes:
+        result = await db.test_results.find_one({"_id": result_id, "user_id": USER_ID})
+        return dumps(result_to_dict(result))
+    return detail
+
+
+async def measure(fn, db, limit: int, repeat: int) -> tuple:
+    await fn(db, limit)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = await fn(db, limit)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(body)
+
+
+async def main(tests: int, questions_per_test: int, limit: int, repeat: int):
+    settings.DB_NAME = f"{settings.DB_NAME}_bench"
+    db = Database.get_database()
+    try:
+        await db.client.drop_database(settings.DB_NAME)
+        await seed(db, tests, questions_per_test)
+
+        full_time, full_size = await measure(full_page, db, limit, repeat)
+        summary_time, summary_size = await measure(summary_page, db, limit, repeat)
+        latest = await db.test_results.find_one({"user_id": USER_ID}, {"_id": 1}, sort=[("timestamp", -1)])
+        detail_time, detail_size = await measure(detail_of(latest["_id"]), db, limit, repeat)
+
+        print(f"{tests} tests x {questions_per_test} answers, page of {limit}, best of {repeat}")
+        print(f"  full history:    {full_time * 1000:9.1f} ms  {full_size / 1024:9.1f} KB")
+        print(f"  summary history: {summary_time * 1000:9.1f} ms  {summary_size / 1024:9.1f} KB")
+        print(f"  one attempt:     {detail_time * 1000:9.1f} ms  {detail_size / 1024:9.1f} KB")
+        print(f"  payload ratio:   {full_size / summary_size:9.1f}x")
+    finally:
+        await db.client.drop_database(settings.DB_NAME)
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tests", type=int, default=500, help="stored test results of the user")
+    parser.add_argument("--questions", type=int, default=50, help="answers per test")
+    parser.add_argument("--limit", type=int, default=100, help="history page size")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions")
+    args = parser.parse_args()
+    asyncio.run(main(args.tests, args.questions, args.limit, args.repeat))
@@ -0,0 +1,43 @@
+"""
+Rewrite test results that still embed question content into the compact form
+
+Results submitted before compact attempt storage copy question text,
+options and explanation into every answer. This keeps only question ids,
+answers, correctness and marks (content is hydrated on read) and reports
+the storage saved. Runs online in batches and is safe to re-run; use
+--dry-run to measure first.
+
+Usage (from backend/):
+    python -m scripts.compact_test_results --batch-size 500 [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+
+from core.database.mongodb import Database
+from api.v1.tests.services.attempt_storage import AttemptStorageService
+
+
+async def main(batch_size: int, dry_run: bool):
+    start = time.perf_counter()
+    try:
+        summary = await AttemptStorageService.migrate(batch_size=batch_size, dry_run=dry_run)
+    finally:
+        await Database.close()
+
+    saved = summary["bytes_before"] - summary["bytes_after"]
+    action = "would compact" if dry_run else "compacted"
+    print(f"Scanned {summary['scanned']} results, {action} {summary['compacted']} "
+          f"in {time.perf_counter() - start:.1f} s")
+    print(f"  {summary['bytes_before'] / 1024 / 1024:.1f} MB -> {summary['bytes_after'] / 1024 / 1024:.1f} MB "
+          f"({saved / 1024 / 1024:.1f} MB saved)")
+    if summary["kept_embedded"]:
+        print(f"  {summary['kept_embedded']} answers kept embedded (question deleted without a version snapshot)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500, help="results per cursor batch and bulk write")
+    parser.add_argument("--dry-run", action="store_true", help="report the savings without writing")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.dry_run))
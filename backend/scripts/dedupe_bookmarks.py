@@ -0,0 +1,54 @@
+"""
+Remove duplicate bookmarks and build the unique (user_id, question_id) index
+
+Bookmarks used to be written with find_one + insert_one, so concurrent adds
+could store the same bookmark twice, and the index on (user_id, question_id)
+was not unique. This keeps the oldest bookmark of every pair, then replaces
+a non-unique index with the unique one declared in core/database/indexes.py.
+Safe to re-run; use --dry-run to count the duplicates first.
+
+Usage (from backend/):
+    python -m scripts.dedupe_bookmarks [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+
+from core.database import get_database
+from core.database.indexes import INDEX_REGISTRY
+from core.database.mongodb import Database
+from api.v1.user.services.bookmark_service import BookmarkService
+
+
+async def rebuild_index() -> str:
+    """Drop a non-unique bookmarks index with the declared keys and create the unique one"""
+    collection = get_database().bookmarks
+    model = INDEX_REGISTRY["bookmarks"][0]
+    async for info in collection.list_indexes():
+        if dict(info["key"]) == dict(model.document["key"]):
+            if info.get("unique"):
+                return f"unique index {info['name']} already present"
+            await collection.drop_index(info["name"])
+    await collection.create_indexes([model])
+    return f"created unique index {model.document['name']}"
+
+
+async def main(dry_run: bool):
+    start = time.perf_counter()
+    try:
+        summary = await BookmarkService.deduplicate(dry_run=dry_run)
+        index = "index left unchanged (dry run)" if dry_run else await rebuild_index()
+    finally:
+        await Database.close()
+
+    action = "would delete" if dry_run else "deleted"
+    print(f"{summary['pairs']} duplicated bookmarks, {action} {summary['deleted']} copies "
+          f"in {time.perf_counter() - start:.1f} s")
+    print(f"  {index}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count the duplicates without deleting them")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
@@ -0,0 +1,100 @@
+"""
+Retire duplicate-UID questions and build the unique questions.uid index
+
+Bulk uploads used to insert every row, so re-uploading a sheet stored each
+UID again. For every UID held by several questions this keeps the oldest
+and marks the newer copies the way the duplicate merge endpoint does
+(is_duplicate, duplicate_of, is_active: false), moving their UID to
+duplicate_uid so the partial unique index declared in
+core/database/indexes.py can be built. Copies are not deleted: test
+results that reference them still resolve. Safe to re-run; use --dry-run
+to count the duplicates first.
+
+Usage (from backend/):
+    python -m scripts.dedupe_question_uids [--dry-run]
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from core.database import get_database
+from core.database.indexes import INDEX_REGISTRY
+from core.database.mongodb import Database
+
+
+def uid_index():
+    """The declared unique uid index"""
+    return next(model for model in INDEX_REGISTRY["questions"] if dict(model.document["key"]) == {"uid": 1})
+
+
+async def retire_duplicates(dry_run: bool, batch_size: int = 1000) -> dict:
+    """Mark every question but the oldest of each UID as a duplicate of it"""
+    db = get_database()
+    summary = {"uids": 0, "retired": 0}
+    operations = []
+    now = datetime.utcnow()
+
+    async def flush():
+        if operations and not dry_run:
+            await db.questions.bulk_write(operations, ordered=False)
+        operations.clear()
+
+    async for group in db.questions.aggregate([
+        {"$match": {"uid": {"$gt": ""}}},
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": "$uid", "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}}
+    ], allowDiskUse=True):
+        summary["uids"] += 1
+        summary["retired"] += len(group["ids"]) - 1
+        keep_id = str(group["ids"][0])
+        for question_id in group["ids"][1:]:
+            operations.append(UpdateOne({"_id": question_id}, {"$set": {
+                "uid": "",
+                "duplicate_uid": group["_id"],
+                "is_duplicate": True,
+                "duplicate_of": keep_id,
+                "is_active": False,
+                "merged_at": now
+            }}))
+        if len(operations) >= batch_size:
+            await flush()
+    await flush()
+    return summary
+
+
+async def rebuild_index() -> str:
+    """Drop a non-unique uid index and create the declared unique one"""
+    collection = get_database().questions
+    model = uid_index()
+    async for info in collection.list_indexes():
+        if dict(info["key"]) == dict(model.document["key"]):
+            if info.get("unique"):
+                return f"unique index {info['name']} already present"
+            await collection.drop_index(info["name"])
+    await collection.create_indexes([model])
+    return f"created unique index {model.document['name']}"
+
+
+async def main(dry_run: bool):
+    start = time.perf_counter()
+    try:
+        summary = await retire_duplicates(dry_run)
+        index = "index left unchanged (dry run)" if dry_run else await rebuild_index()
+    finally:
+        await Database.close()
+
+    action = "would retire" if dry_run else "retired"
+    print(f"{summary['uids']} duplicated UIDs, {action} {summary['retired']} copies "
+          f"in {time.perf_counter() - start:.1f} s")
+    print(f"  {index}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true", help="count the duplicates without changing them")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run))
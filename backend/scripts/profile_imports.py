@@ -0,0 +1,66 @@
+"""
+Import-time profile of the API process
+
+Runs a cold `import main` under `python -X importtime` in a subprocess and
+reports the slowest modules (cumulative and self time) plus a per-package
+rollup.
+
+Usage (from backend/):
+    python -m scripts.profile_imports --top 25
+"""
+import argparse
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def collect(module: str) -> list:
+    """Return (self_us, cumulative_us, depth, name) for every imported module"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((int(self_us), int(cumulative_us), depth, name.strip()))
+    return rows
+
+
+def main(module: str, top: int):
+    rows = collect(module)
+    total_us = max(cumulative for _, cumulative, _, _ in rows)
+
+    print(f"Cold import of {module}: {total_us / 1e6:.3f} s ({len(rows)} modules)\n")
+
+    print(f"Top {top} by cumulative time")
+    for _, cumulative, _, name in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+    print(f"\nTop {top} by self time")
+    for self_us, _, _, name in sorted(rows, key=lambda r: r[0], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {name}")
+
+    by_package = defaultdict(int)
+    for self_us, _, _, name in rows:
+        by_package[name.split(".")[0]] += self_us
+    print(f"\nTop {top} packages by self time")
+    for package, self_us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:9.1f} ms  {package}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="main", help="module to import")
+    parser.add_argument("--top", type=int, default=20, help="rows per section")
+    args = parser.parse_args()
+    main(args.module, args.top)
@@ -0,0 +1,34 @@
+"""
+Rebuild every leaderboard (all periods and scopes) from test_results
+
+Needed once after deploying the maintained leaderboards and whenever
+results are edited or deleted directly in the database. Exam/subject
+boards use the scope stored on each result, so run
+scripts.rebuild_score_distributions first on older data.
+
+Usage (from backend/):
+    python -m scripts.rebuild_leaderboards
+"""
+import argparse
+import asyncio
+import time
+
+from core.database.mongodb import Database
+from api.v1.user.services.leaderboard_service import LeaderboardService
+
+
+async def main(batch_size: int):
+    start = time.perf_counter()
+    try:
+        summary = await LeaderboardService.rebuild(batch_size=batch_size)
+    finally:
+        await Database.close()
+    print(f"Counted {summary['results']} results into {summary['entries']} leaderboard entries "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="results per cursor batch and inserts per write")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,33 @@
+"""
+Rebuild the score_distributions histograms from test_results
+
+Needed once after deploying the incremental histogram (existing results
+were never counted) and whenever results are edited or deleted directly in
+the database. Also back-fills exam_id/subject_id on older results.
+
+Usage (from backend/):
+    python -m scripts.rebuild_score_distributions
+"""
+import argparse
+import asyncio
+import time
+
+from core.database.mongodb import Database
+from api.v1.tests.services.score_distribution import ScoreDistributionService
+
+
+async def main(batch_size: int):
+    start = time.perf_counter()
+    try:
+        summary = await ScoreDistributionService.rebuild(batch_size=batch_size)
+    finally:
+        await Database.close()
+    print(f"Counted {summary['results']} results into {summary['scopes']} distributions "
+          f"in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="results per round trip")
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,32 @@
+"""
+Rebuild the user_stats rollups from test_results and practice_attempts
+
+Needed once after deploying the rollups (existing history was never
+counted), after ancestor ids were back-filled on questions, and whenever
+results are edited or deleted directly in the database.
+
+Usage (from backend/):
+    python -m scripts.rebuild_user_stats [--user-id <id>]
+"""
+import argparse
+import asyncio
+import time
+
+from core.database.mongodb import Database
+from api.v1.user.services.user_stats_service import UserStatsService
+
+
+async def main(user_id: str):
+    start = time.perf_counter()
+    try:
+        summary = await UserStatsService.rebuild(user_id=user_id)
+    finally:
+        await Database.close()
+    print(f"Rebuilt stats of {summary['users']} users in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", default=None, help="rebuild a single user")
+    args = parser.parse_args()
+    asyncio.run(main(args.user_id))
@@ -0,0 +1,43 @@
+"""
+Run background jobs in a dedicated worker process
+
+Every API process runs JOB_WORKERS jobs itself. To keep long uploads and
+AI generation off the API processes, set JOB_WORKERS=0 for them and run
+one or more of these instead. Jobs are leased from MongoDB, so any number
+of workers can share the queue; on Ctrl+C or SIGTERM running jobs are
+handed back to the queue.
+
+Usage (from backend/):
+    python -m scripts.run_jobs [--workers 4]
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from core.config import settings
+from core.database.mongodb import Database
+from core.jobs import job_runner
+from main import app  # noqa: F401  (importing the app registers every job handler with its routes)
+
+
+async def main(workers: int):
+    job_runner.workers = workers
+    job_runner.start()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await job_runner.stop()
+        await Database.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=max(settings.JOB_WORKERS, 1), help="concurrent jobs")
+    args = parser.parse_args()
+    logging.getLogger("core.jobs").setLevel(logging.INFO)
+    asyncio.run(main(args.workers))
@@ -1,60 +1,55 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
 from bson import ObjectId
 from typing import List, Optional, Dict, Any
 import os
 import logging
+import asyncio
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr
-import pandas as pd
 import io
-try:
-    import google.generativeai as genai
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
-    genai = None
-
-try:
-    from exponent_server_sdk import (
-        DeviceNotRegisteredError,
-        PushClient,
-        PushMessage,
-        PushServerError,
-        PushTicketError,
-    )
-    PUSH_NOTIFICATIONS_AVAILABLE = True
-except ImportError:
-    PUSH_NOTIFICATIONS_AVAILABLE = False
+# pandas, google.generativeai and exponent_server_sdk are imported lazily by
+# the endpoints that use them to keep cold start fast
+
+from core.database.mongodb import Database
+from core.jobs import job_runner, accepted
+from core.security import verify_password_async, get_password_hash_async
+from core.security.user_cache import user_cache, get_cached_user
+from api.v1.ai.services.gemini_client import get_model
+from api.v1.admin.services.notification_service import NotificationService, SEND_NOTIFICATION, PUSH_TOKENS_SOURCE
+from api.v1.content.services.hierarchy_cache import content_cache
+from api.v1.questions.services.question_ancestry import QuestionAncestryService
+from api.v1.questions.services.question_jobs import submit_bulk_upload
+from api.v1.questions.services.question_service import uid_conflict
+from api.v1.tests.services.question_pool import question_pools
+from api.v1.tests.services.attempt_storage import AttemptStorageService
+from api.v1.tests.services.answer_keys import answer_keys
+from api.v1.tests.services.session_service import SessionService
+from api.v1.user.services.user_stats_service import UserStatsService, QUESTION_PROJECTION as STATS_PROJECTION
+from api.v1.user.services.bookmark_service import BookmarkService
+from api.v1.user.services.leaderboard_service import LeaderboardService, PERIODS, SCOPES, board_id
+from core.serialization import FastJSONResponse, question_to_dict, questions_to_list, result_to_dict
+from core.serialization import result_summary_to_dict, TEST_RESULT_SUMMARY_PROJECTION
+from core.pagination import paginate
+from core.export import stream_export, test_result_row, TEST_RESULT_EXPORT_FIELDS, TEST_RESULT_EXPORT_PROJECTION
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection (shares the process-wide pool with the v1 API)
+client = Database.get_client()
+db = Database.get_database()
 
 # Security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 SECRET_KEY = os.environ.get('JWT_SECRET', 'your_jwt_secret_key')
 ALGORITHM = os.environ.get('JWT_ALGORITHM', 'HS256')
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.environ.get('ACCESS_TOKEN_EXPIRE_MINUTES', 1440))
 
-# Configure Gemini
-if GENAI_AVAILABLE:
-    try:
-        genai.configure(api_key=os.environ.get('GEMINI_API_KEY'))
-    except Exception as e:
-        print(f"Warning: Could not configure Gemini AI: {e}")
-
 # Create the main app
 app = FastAPI(title="Quiz App API")
 api_router = APIRouter(prefix="/api")
@@ -257,9 +252,19 @@ class TestResultResponse(BaseModel):
     total_questions: int
     correct_answers: int
     percentile: float
+    exam_percentile: Optional[float] = None
+    subject_percentile: Optional[float] = None
     questions: List[Dict[str, Any]]
     timestamp: datetime
 
+class TestResultSummary(BaseModel):
+    id: str
+    score: float
+    total_questions: int
+    correct_answers: int
+    percentile: float
+    timestamp: datetime
+
 # Bookmark Models
 class BookmarkCreate(BaseModel):
     question_id: str
@@ -292,11 +297,11 @@ class SendNotificationRequest(BaseModel):
 
 # ==================== HELPER FUNCTIONS ====================
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await verify_password_async(plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def get_password_hash(password):
+    return await get_password_hash_async(password)
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -315,7 +320,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = await db.users.find_one({"_id": ObjectId(user_id)})
+    user = await get_cached_user(db, user_id)
     if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     return user
@@ -335,7 +340,7 @@ async def signup(user: UserCreate):
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash(user.password)
     user_dict = {
         "email": user.email,
         "password": hashed_password,
@@ -363,7 +368,7 @@ async def signup(user: UserCreate):
 @api_router.post("/auth/login", response_model=Token)
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Incorrect email or password")
     
     access_token = create_access_token({"sub": str(user["_id"])})
@@ -397,6 +402,7 @@ async def create_exam(exam: ExamCreate, admin: dict = Depends(get_admin_user)):
         "created_at": datetime.utcnow()
     }
     result = await db.exams.insert_one(exam_dict)
+    content_cache.invalidate("exams")
     exam_dict["_id"] = result.inserted_id
     
     return ExamResponse(
@@ -418,7 +424,7 @@ async def get_exams(admin: dict = Depends(get_admin_user)):
 
 @api_router.get("/exams", response_model=List[ExamResponse])
 async def get_exams_public():
-    exams = await db.exams.find().to_list(1000)
+    exams = await content_cache.list("exams")
     return [ExamResponse(
         id=str(exam["_id"]),
         name=exam["name"],
@@ -432,6 +438,7 @@ async def update_exam(exam_id: str, exam: ExamCreate, admin: dict = Depends(get_
         {"_id": ObjectId(exam_id)},
         {"$set": exam.dict()}
     )
+    content_cache.invalidate("exams")
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Exam not found")
     
@@ -446,6 +453,8 @@ async def update_exam(exam_id: str, exam: ExamCreate, admin: dict = Depends(get_
 @api_router.delete("/admin/exams/{exam_id}")
 async def delete_exam(exam_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.exams.delete_one({"_id": ObjectId(exam_id)})
+    content_cache.invalidate("exams")
+    await QuestionAncestryService.refresh_in_background("exams", exam_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Exam not found")
     return {"message": "Exam deleted successfully"}
@@ -459,6 +468,7 @@ async def create_subject(subject: SubjectCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.subjects.insert_one(subject_dict)
+    content_cache.invalidate("subjects")
     subject_dict["_id"] = result.inserted_id
     
     return SubjectResponse(
@@ -483,8 +493,7 @@ async def get_subjects(exam_id: Optional[str] = None, admin: dict = Depends(get_
 
 @api_router.get("/subjects", response_model=List[SubjectResponse])
 async def get_subjects_public(exam_id: Optional[str] = None):
-    query = {"exam_id": exam_id} if exam_id else {}
-    subjects = await db.subjects.find(query).to_list(1000)
+    subjects = await content_cache.list("subjects", exam_id)
     return [SubjectResponse(
         id=str(subject["_id"]),
         exam_id=subject["exam_id"],
@@ -495,10 +504,13 @@ async def get_subjects_public(exam_id: Optional[str] = None):
 
 @api_router.put("/admin/subjects/{subject_id}", response_model=SubjectResponse)
 async def update_subject(subject_id: str, subject: SubjectCreate, admin: dict = Depends(get_admin_user)):
+    previous_parent = await QuestionAncestryService.parent_of("subjects", subject_id)
     result = await db.subjects.update_one(
         {"_id": ObjectId(subject_id)},
         {"$set": subject.dict()}
     )
+    content_cache.invalidate("subjects")
+    await QuestionAncestryService.refresh_if_moved("subjects", subject_id, previous_parent, subject.exam_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Subject not found")
     
@@ -514,6 +526,8 @@ async def update_subject(subject_id: str, subject: SubjectCreate, admin: dict =
 @api_router.delete("/admin/subjects/{subject_id}")
 async def delete_subject(subject_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.subjects.delete_one({"_id": ObjectId(subject_id)})
+    content_cache.invalidate("subjects")
+    await QuestionAncestryService.refresh_in_background("subjects", subject_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Subject not found")
     return {"message": "Subject deleted successfully"}
@@ -527,6 +541,7 @@ async def create_chapter(chapter: ChapterCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.chapters.insert_one(chapter_dict)
+    content_cache.invalidate("chapters")
     chapter_dict["_id"] = result.inserted_id
     
     return ChapterResponse(
@@ -551,8 +566,7 @@ async def get_chapters(subject_id: Optional[str] = None, admin: dict = Depends(g
 
 @api_router.get("/chapters", response_model=List[ChapterResponse])
 async def get_chapters_public(subject_id: Optional[str] = None):
-    query = {"subject_id": subject_id} if subject_id else {}
-    chapters = await db.chapters.find(query).to_list(1000)
+    chapters = await content_cache.list("chapters", subject_id)
     return [ChapterResponse(
         id=str(chapter["_id"]),
         subject_id=chapter["subject_id"],
@@ -563,10 +577,13 @@ async def get_chapters_public(subject_id: Optional[str] = None):
 
 @api_router.put("/admin/chapters/{chapter_id}", response_model=ChapterResponse)
 async def update_chapter(chapter_id: str, chapter: ChapterCreate, admin: dict = Depends(get_admin_user)):
+    previous_parent = await QuestionAncestryService.parent_of("chapters", chapter_id)
     result = await db.chapters.update_one(
         {"_id": ObjectId(chapter_id)},
         {"$set": chapter.dict()}
     )
+    content_cache.invalidate("chapters")
+    await QuestionAncestryService.refresh_if_moved("chapters", chapter_id, previous_parent, chapter.subject_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Chapter not found")
     
@@ -582,6 +599,8 @@ async def update_chapter(chapter_id: str, chapter: ChapterCreate, admin: dict =
 @api_router.delete("/admin/chapters/{chapter_id}")
 async def delete_chapter(chapter_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.chapters.delete_one({"_id": ObjectId(chapter_id)})
+    content_cache.invalidate("chapters")
+    await QuestionAncestryService.refresh_in_background("chapters", chapter_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Chapter not found")
     return {"message": "Chapter deleted successfully"}
@@ -595,6 +614,7 @@ async def create_topic(topic: TopicCreate, admin: dict = Depends(get_admin_user)
         "created_at": datetime.utcnow()
     }
     result = await db.topics.insert_one(topic_dict)
+    content_cache.invalidate("topics")
     topic_dict["_id"] = result.inserted_id
     
     return TopicResponse(
@@ -619,8 +639,7 @@ async def get_topics(chapter_id: Optional[str] = None, admin: dict = Depends(get
 
 @api_router.get("/topics", response_model=List[TopicResponse])
 async def get_topics_public(chapter_id: Optional[str] = None):
-    query = {"chapter_id": chapter_id} if chapter_id else {}
-    topics = await db.topics.find(query).to_list(1000)
+    topics = await content_cache.list("topics", chapter_id)
     return [TopicResponse(
         id=str(topic["_id"]),
         chapter_id=topic["chapter_id"],
@@ -631,10 +650,13 @@ async def get_topics_public(chapter_id: Optional[str] = None):
 
 @api_router.put("/admin/topics/{topic_id}", response_model=TopicResponse)
 async def update_topic(topic_id: str, topic: TopicCreate, admin: dict = Depends(get_admin_user)):
+    previous_parent = await QuestionAncestryService.parent_of("topics", topic_id)
     result = await db.topics.update_one(
         {"_id": ObjectId(topic_id)},
         {"$set": topic.dict()}
     )
+    content_cache.invalidate("topics")
+    await QuestionAncestryService.refresh_if_moved("topics", topic_id, previous_parent, topic.chapter_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Topic not found")
     
@@ -650,6 +672,8 @@ async def update_topic(topic_id: str, topic: TopicCreate, admin: dict = Depends(
 @api_router.delete("/admin/topics/{topic_id}")
 async def delete_topic(topic_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.topics.delete_one({"_id": ObjectId(topic_id)})
+    content_cache.invalidate("topics")
+    await QuestionAncestryService.refresh_in_background("topics", topic_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Topic not found")
     return {"message": "Topic deleted successfully"}
@@ -663,6 +687,7 @@ async def create_sub_topic(sub_topic: SubTopicCreate, admin: dict = Depends(get_
         "created_at": datetime.utcnow()
     }
     result = await db.sub_topics.insert_one(sub_topic_dict)
+    content_cache.invalidate("sub_topics")
     sub_topic_dict["_id"] = result.inserted_id
     
     return SubTopicResponse(
@@ -687,8 +712,7 @@ async def get_sub_topics(topic_id: Optional[str] = None, admin: dict = Depends(g
 
 @api_router.get("/sub-topics", response_model=List[SubTopicResponse])
 async def get_sub_topics_public(topic_id: Optional[str] = None):
-    query = {"topic_id": topic_id} if topic_id else {}
-    sub_topics = await db.sub_topics.find(query).to_list(1000)
+    sub_topics = await content_cache.list("sub_topics", topic_id)
     return [SubTopicResponse(
         id=str(st["_id"]),
         topic_id=st["topic_id"],
@@ -699,10 +723,13 @@ async def get_sub_topics_public(topic_id: Optional[str] = None):
 
 @api_router.put("/admin/sub-topics/{sub_topic_id}", response_model=SubTopicResponse)
 async def update_sub_topic(sub_topic_id: str, sub_topic: SubTopicCreate, admin: dict = Depends(get_admin_user)):
+    previous_parent = await QuestionAncestryService.parent_of("sub_topics", sub_topic_id)
     result = await db.sub_topics.update_one(
         {"_id": ObjectId(sub_topic_id)},
         {"$set": sub_topic.dict()}
     )
+    content_cache.invalidate("sub_topics")
+    await QuestionAncestryService.refresh_if_moved("sub_topics", sub_topic_id, previous_parent, sub_topic.topic_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Sub-topic not found")
     
@@ -718,6 +745,8 @@ async def update_sub_topic(sub_topic_id: str, sub_topic: SubTopicCreate, admin:
 @api_router.delete("/admin/sub-topics/{sub_topic_id}")
 async def delete_sub_topic(sub_topic_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.sub_topics.delete_one({"_id": ObjectId(sub_topic_id)})
+    content_cache.invalidate("sub_topics")
+    await QuestionAncestryService.refresh_in_background("sub_topics", sub_topic_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Sub-topic not found")
     return {"message": "Sub-topic deleted successfully"}
@@ -731,6 +760,7 @@ async def create_section(section: SectionCreate, admin: dict = Depends(get_admin
         "created_at": datetime.utcnow()
     }
     result = await db.sections.insert_one(section_dict)
+    content_cache.invalidate("sections")
     section_dict["_id"] = result.inserted_id
     
     return SectionResponse(
@@ -755,8 +785,7 @@ async def get_sections(sub_topic_id: Optional[str] = None, admin: dict = Depends
 
 @api_router.get("/sections", response_model=List[SectionResponse])
 async def get_sections_public(sub_topic_id: Optional[str] = None):
-    query = {"sub_topic_id": sub_topic_id} if sub_topic_id else {}
-    sections = await db.sections.find(query).to_list(1000)
+    sections = await content_cache.list("sections", sub_topic_id)
     return [SectionResponse(
         id=str(s["_id"]),
         sub_topic_id=s["sub_topic_id"],
@@ -767,10 +796,13 @@ async def get_sections_public(sub_topic_id: Optional[str] = None):
 
 @api_router.put("/admin/sections/{section_id}", response_model=SectionResponse)
 async def update_section(section_id: str, section: SectionCreate, admin: dict = Depends(get_admin_user)):
+    previous_parent = await QuestionAncestryService.parent_of("sections", section_id)
     result = await db.sections.update_one(
         {"_id": ObjectId(section_id)},
         {"$set": section.dict()}
     )
+    content_cache.invalidate("sections")
+    await QuestionAncestryService.refresh_if_moved("sections", section_id, previous_parent, section.sub_topic_id)
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Section not found")
     
@@ -786,6 +818,8 @@ async def update_section(section_id: str, section: SectionCreate, admin: dict =
 @api_router.delete("/admin/sections/{section_id}")
 async def delete_section(section_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.sections.delete_one({"_id": ObjectId(section_id)})
+    content_cache.invalidate("sections")
+    await QuestionAncestryService.refresh_in_background("sections", section_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Section not found")
     return {"message": "Section deleted successfully"}
@@ -799,6 +833,7 @@ async def create_sub_section(sub_section: SubSectionCreate, admin: dict = Depend
         "created_at": datetime.utcnow()
     }
     result = await db.sub_sections.insert_one(sub_section_dict)
+    content_cache.invalidate("sub_sections")
     sub_section_dict["_id"] = result.inserted_id
     
     return SubSectionResponse(
@@ -823,8 +858,7 @@ async def get_sub_sections(section_id: Optional[str] = None, admin: dict = Depen
 
 @api_router.get("/sub-sections", response_model=List[SubSectionResponse])
 async def get_sub_sections_public(section_id: Optional[str] = None):
-    query = {"section_id": section_id} if section_id else {}
-    sub_sections = await db.sub_sections.find(query).to_list(1000)
+    sub_sections = await content_cache.list("sub_sections", section_id)
     return [SubSectionResponse(
         id=str(ss["_id"]),
         section_id=ss["section_id"],
@@ -835,10 +869,15 @@ async def get_sub_sections_public(section_id: Optional[str] = None):
 
 @api_router.put("/admin/sub-sections/{sub_section_id}", response_model=SubSectionResponse)
 async def update_sub_section(sub_section_id: str, sub_section: SubSectionCreate, admin: dict = Depends(get_admin_user)):
+    previous_parent = await QuestionAncestryService.parent_of("sub_sections", sub_section_id)
     result = await db.sub_sections.update_one(
         {"_id": ObjectId(sub_section_id)},
         {"$set": sub_section.dict()}
     )
+    content_cache.invalidate("sub_sections")
+    await QuestionAncestryService.refresh_if_moved(
+        "sub_sections", sub_section_id, previous_parent, sub_section.section_id
+    )
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Sub-section not found")
     
@@ -854,6 +893,8 @@ async def update_sub_section(sub_section_id: str, sub_section: SubSectionCreate,
 @api_router.delete("/admin/sub-sections/{sub_section_id}")
 async def delete_sub_section(sub_section_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.sub_sections.delete_one({"_id": ObjectId(sub_section_id)})
+    content_cache.invalidate("sub_sections")
+    await QuestionAncestryService.refresh_in_background("sub_sections", sub_section_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Sub-section not found")
     return {"message": "Sub-section deleted successfully"}
@@ -867,77 +908,40 @@ async def create_question(question: QuestionCreate, admin: dict = Depends(get_ad
         **question.dict(),
         "created_at": datetime.utcnow()
     }
-    result = await db.questions.insert_one(question_dict)
+    await QuestionAncestryService.stamp(question_dict)
+    with uid_conflict():
+        result = await db.questions.insert_one(question_dict)
+    question_pools.invalidate()
     question_dict["_id"] = result.inserted_id
     
-    return QuestionResponse(
-        id=str(question_dict["_id"]),
-        sub_section_id=question_dict["sub_section_id"],
-        question_text=question_dict["question_text"],
-        options=question_dict["options"],
-        correct_answer=question_dict["correct_answer"],
-        difficulty=question_dict["difficulty"],
-        tags=question_dict["tags"],
-        explanation=question_dict["explanation"],
-        hint=question_dict.get("hint", ""),
-        solution=question_dict.get("solution", ""),
-        code_snippet=question_dict.get("code_snippet", ""),
-        image_url=question_dict.get("image_url", ""),
-        formula=question_dict.get("formula", ""),
-        created_at=question_dict.get("created_at", datetime.utcnow())
-    )
+    return FastJSONResponse(question_to_dict(question_dict))
 
 @api_router.get("/admin/questions", response_model=List[QuestionResponse])
 async def get_questions_admin(sub_section_id: Optional[str] = None, admin: dict = Depends(get_admin_user)):
     query = {"sub_section_id": sub_section_id} if sub_section_id else {}
     questions = await db.questions.find(query).to_list(1000)
-    return [QuestionResponse(
-        id=str(q["_id"]),
-        sub_section_id=q["sub_section_id"],
-        question_text=q["question_text"],
-        options=q["options"],
-        correct_answer=q["correct_answer"],
-        difficulty=q["difficulty"],
-        tags=q.get("tags", []),
-        explanation=q.get("explanation", ""),
-        hint=q.get("hint", ""),
-        solution=q.get("solution", ""),
-        code_snippet=q.get("code_snippet", ""),
-        image_url=q.get("image_url", ""),
-        formula=q.get("formula", ""),
-        created_at=q.get("created_at", datetime.utcnow())
-    ) for q in questions]
+    return FastJSONResponse(questions_to_list(questions))
 
 @api_router.put("/admin/questions/{question_id}", response_model=QuestionResponse)
 async def update_question(question_id: str, question: QuestionCreate, admin: dict = Depends(get_admin_user)):
-    result = await db.questions.update_one(
-        {"_id": ObjectId(question_id)},
-        {"$set": question.dict()}
-    )
+    with uid_conflict():
+        result = await db.questions.update_one(
+            {"_id": ObjectId(question_id)},
+            {"$set": await QuestionAncestryService.stamp(question.dict())}
+        )
+    answer_keys.discard([question_id])
+    question_pools.invalidate()
     if result.modified_count == 0:
         raise HTTPException(status_code=404, detail="Question not found")
     
     updated_question = await db.questions.find_one({"_id": ObjectId(question_id)})
-    return QuestionResponse(
-        id=str(updated_question["_id"]),
-        sub_section_id=updated_question["sub_section_id"],
-        question_text=updated_question["question_text"],
-        options=updated_question["options"],
-        correct_answer=updated_question["correct_answer"],
-        difficulty=updated_question["difficulty"],
-        tags=updated_question.get("tags", []),
-        explanation=updated_question.get("explanation", ""),
-        hint=updated_question.get("hint", ""),
-        solution=updated_question.get("solution", ""),
-        code_snippet=updated_question.get("code_snippet", ""),
-        image_url=updated_question.get("image_url", ""),
-        formula=updated_question.get("formula", ""),
-        created_at=updated_question.get("created_at", datetime.utcnow())
-    )
+    return FastJSONResponse(question_to_dict(updated_question))
 
 @api_router.delete("/admin/questions/{question_id}")
 async def delete_question(question_id: str, admin: dict = Depends(get_admin_user)):
     result = await db.questions.delete_one({"_id": ObjectId(question_id)})
+    answer_keys.discard([question_id])
+    question_pools.invalidate()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Question not found")
     return {"message": "Question deleted successfully"}
@@ -945,128 +949,26 @@ async def delete_question(question_id: str, admin: dict = Depends(get_admin_user
 # ==================== ADMIN ROUTES - BULK UPLOAD ====================
 
 @api_router.post("/admin/questions/bulk-upload")
-async def bulk_upload_questions(file: UploadFile = File(...), admin: dict = Depends(get_admin_user)):
+async def bulk_upload_questions(
+    file: UploadFile = File(...),
+    mode: str = Query("upsert", regex="^(insert|upsert|replace)$"),
+    background: bool = False,
+    admin: dict = Depends(get_admin_user)
+):
+    from api.v1.questions.services.question_upload import QuestionUploadService
+    
     try:
-        contents = await file.read()
-        df = pd.read_csv(io.BytesIO(contents))
-        
-        # Check for 24-column format (new format) or legacy format
-        is_new_format = "UID" in df.columns and "QuestionText" in df.columns
-        
-        if is_new_format:
-            # New 24-column CSV format
-            required_columns = ["UID", "Exam", "Subject", "QuestionType", "QuestionText", "OptionA", "OptionB", "CorrectAnswer"]
-            if not all(col in df.columns for col in required_columns):
-                raise HTTPException(status_code=400, detail=f"New CSV format must contain columns: {required_columns}")
-            
-            questions = []
-            for _, row in df.iterrows():
-                # Build options array based on AnswerChoicesCount
-                answer_choices = int(row.get("AnswerChoicesCount", 4))
-                options = []
-                for i in range(answer_choices):
-                    option_key = f"Option{chr(65+i)}"  # OptionA, OptionB, OptionC, OptionD
-                    if option_key in df.columns and pd.notna(row.get(option_key)):
-                        options.append(str(row[option_key]))
-                
-                # Convert CorrectAnswer (A/B/C/D) to index (0/1/2/3)
-                correct_answer_letter = str(row["CorrectAnswer"]).upper()
-                correct_answer_index = ord(correct_answer_letter) - ord('A') if correct_answer_letter in 'ABCD' else 0
-                
-                # Parse tags
-                tags_str = row.get("Tags", "")
-                tags = [tag.strip() for tag in str(tags_str).split(",") if tag.strip()] if pd.notna(tags_str) else []
-                
-                # Map difficulty
-                difficulty = str(row.get("Difficulty", "medium")).lower()
-                
-                question_dict = {
-                    "sub_section_id": str(row.get("Subject", "")),  # Map to existing field
-                    "question_text": str(row["QuestionText"]),
-                    "options": options,
-                    "correct_answer": correct_answer_index,
-                    "difficulty": difficulty,
-                    "tags": tags,
-                    "explanation": str(row.get("Explanation", "")),
-                    "hint": "",  # Not in 24-column format, use solution
-                    "solution": str(row.get("Explanation", "")),  # Use explanation as solution
-                    "code_snippet": "",
-                    "image_url": str(row.get("ImageUploadThingURL", "")),
-                    "formula": str(row.get("FormulaLaTeX", "")),
-                    # Extended fields
-                    "uid": str(row.get("UID", "")),
-                    "exam": str(row.get("Exam", "")),
-                    "year": str(row.get("Year", "")),
-                    "subject": str(row.get("Subject", "")),
-                    "chapter": str(row.get("Chapter", "")),
-                    "topic": str(row.get("Topic", "")),
-                    "question_type": str(row.get("QuestionType", "MCQ-SC")),
-                    "answer_choices_count": answer_choices,
-                    "marks": float(row.get("Marks", 1.0)),
-                    "negative_marks": float(row.get("NegativeMarks", 0.0)),
-                    "time_limit_seconds": int(row.get("TimeLimitSeconds", 120)),
-                    "formula_latex": str(row.get("FormulaLaTeX", "")),
-                    "image_alt_text": str(row.get("ImageAltText", "")),
-                    "confidence_score": float(row.get("ConfidenceScore", 1.0)),
-                    "source_notes": str(row.get("SourceNotes", "")),
-                    "created_at": datetime.utcnow()
-                }
-                questions.append(question_dict)
-        
-        else:
-            # Legacy format
-            required_columns = ["sub_section_id", "question_text", "option1", "option2", "option3", "option4", "correct_answer", "difficulty"]
-            if not all(col in df.columns for col in required_columns):
-                raise HTTPException(status_code=400, detail=f"CSV must contain columns: {required_columns}")
-            
-            questions = []
-            for _, row in df.iterrows():
-                options = [row["option1"], row["option2"], row["option3"], row["option4"]]
-                tags = row.get("tags", "").split(",") if pd.notna(row.get("tags")) else []
-                tags = [tag.strip() for tag in tags if tag.strip()]
-                
-                question_dict = {
-                    "sub_section_id": str(row["sub_section_id"]),
-                    "question_text": row["question_text"],
-                    "options": options,
-                    "correct_answer": int(row["correct_answer"]),
-                    "difficulty": row["difficulty"],
-                    "tags": tags,
-                    "explanation": row.get("explanation", ""),
-                    "hint": row.get("hint", ""),
-                    "solution": row.get("solution", ""),
-                    "code_snippet": row.get("code_snippet", ""),
-                    "image_url": row.get("image_url", ""),
-                    "formula": row.get("formula", ""),
-                    # Default extended fields
-                    "uid": "",
-                    "exam": "",
-                    "year": "",
-                    "subject": "",
-                    "chapter": "",
-                    "topic": "",
-                    "question_type": "MCQ-SC",
-                    "answer_choices_count": 4,
-                    "marks": 1.0,
-                    "negative_marks": 0.0,
-                    "time_limit_seconds": 120,
-                    "formula_latex": row.get("formula", ""),
-                    "image_alt_text": "",
-                    "confidence_score": 1.0,
-                    "source_notes": "",
-                    "created_at": datetime.utcnow()
-                }
-                questions.append(question_dict)
-        
-        if questions:
-            result = await db.questions.insert_many(questions)
-            return {
-                "message": f"Successfully uploaded {len(result.inserted_ids)} questions",
-                "format": "new_24_column" if is_new_format else "legacy",
-                "count": len(result.inserted_ids)
-            }
-        else:
+        # Streamed in chunks; the 24-column (new) or legacy format is detected from the header
+        if background:
+            return await submit_bulk_upload(file, admin, mode=mode)
+        summary = await QuestionUploadService.upload_csv(file.file, mode=mode)
+        if not summary["total_rows"]:
             raise HTTPException(status_code=400, detail="No valid questions found in CSV")
+        return {
+            "message": QuestionUploadService.message(summary),
+            "count": QuestionUploadService.written_count(summary),
+            **summary
+        }
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing CSV: {str(e)}")
@@ -1111,22 +1013,7 @@ async def get_questions(
         query["difficulty"] = difficulty
     
     questions = await db.questions.find(query).limit(limit).to_list(limit)
-    return [QuestionResponse(
-        id=str(q["_id"]),
-        sub_section_id=q["sub_section_id"],
-        question_text=q["question_text"],
-        options=q["options"],
-        correct_answer=q["correct_answer"],
-        difficulty=q["difficulty"],
-        tags=q.get("tags", []),
-        explanation=q.get("explanation", ""),
-        hint=q.get("hint", ""),
-        solution=q.get("solution", ""),
-        code_snippet=q.get("code_snippet", ""),
-        image_url=q.get("image_url", ""),
-        formula=q.get("formula", ""),
-        created_at=q.get("created_at", datetime.utcnow())
-    ) for q in questions]
+    return FastJSONResponse(questions_to_list(questions))
 
 # ==================== USER ROUTES - TESTS ====================
 
@@ -1135,112 +1022,66 @@ async def submit_test(submission: TestSubmission, current_user: dict = Depends(g
     if len(submission.question_ids) != len(submission.answers):
         raise HTTPException(status_code=400, detail="Mismatch between questions and answers")
     
-    # Fetch questions
+    # Fetch questions, in the order they were answered
     question_objects = await db.questions.find({
         "_id": {"$in": [ObjectId(qid) for qid in submission.question_ids]}
     }).to_list(1000)
+    by_id = {str(q["_id"]): q for q in question_objects}
     
-    if len(question_objects) != len(submission.question_ids):
+    if any(qid not in by_id for qid in submission.question_ids):
         raise HTTPException(status_code=404, detail="Some questions not found")
     
-    # Calculate score
-    correct_count = 0
-    questions_with_results = []
-    
-    for i, q in enumerate(question_objects):
-        is_correct = submission.answers[i] == q["correct_answer"]
-        if is_correct:
-            correct_count += 1
-        
-        questions_with_results.append({
-            "question_id": str(q["_id"]),
-            "question_text": q["question_text"],
-            "options": q["options"],
-            "user_answer": submission.answers[i],
-            "correct_answer": q["correct_answer"],
-            "is_correct": is_correct,
-            "explanation": q.get("explanation", "")
-        })
-    
-    score = (correct_count / len(submission.question_ids)) * 100
+    result_dict = await SessionService.grade(
+        str(current_user["_id"]), [by_id[qid] for qid in submission.question_ids], submission.answers
+    )
+    return FastJSONResponse(result_to_dict(result_dict))
+
+@api_router.get("/tests/history", response_model=List[TestResultSummary])
+async def get_test_history(
+    view: str = "summary",
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    # Summary rows by default; questions are fetched per attempt from /tests/history/{result_id}
+    summary = view != "full"
+    page = await paginate(
+        db.test_results, {"user_id": str(current_user["_id"])}, "timestamp", -1, max(1, min(limit, 100)),
+        cursor=cursor, projection=TEST_RESULT_SUMMARY_PROJECTION if summary else None, include_total=False
+    )
+    if not summary:
+        await AttemptStorageService.hydrate_many(page["items"])
+    to_dict = result_summary_to_dict if summary else result_to_dict
     
-    # Calculate percentile (simplified - compare with all tests)
-    all_scores = await db.test_results.find({}, {"score": 1}).to_list(10000)
-    scores_lower = sum(1 for s in all_scores if s["score"] < score)
-    percentile = (scores_lower / len(all_scores) * 100) if all_scores else 50.0
+    headers = {"X-Has-More": "true" if page["has_more"] else "false"}
+    if page["next_cursor"]:
+        headers["X-Next-Cursor"] = page["next_cursor"]
+    return FastJSONResponse([to_dict(r) for r in page["items"]], headers=headers)
+
+@api_router.get("/tests/history/{result_id}", response_model=TestResultResponse)
+async def get_test_result(result_id: str, current_user: dict = Depends(get_current_user)):
+    try:
+        obj_id = ObjectId(result_id)
+    except:
+        raise HTTPException(status_code=400, detail="Invalid result ID")
     
-    # Save result
-    result_dict = {
-        "user_id": str(current_user["_id"]),
-        "score": score,
-        "total_questions": len(submission.question_ids),
-        "correct_answers": correct_count,
-        "percentile": percentile,
-        "questions": questions_with_results,
-        "timestamp": datetime.utcnow()
-    }
+    result = await db.test_results.find_one({"_id": obj_id, "user_id": str(current_user["_id"])})
+    if not result:
+        raise HTTPException(status_code=404, detail="Test result not found")
     
-    result = await db.test_results.insert_one(result_dict)
-    result_dict["_id"] = result.inserted_id
-    
-    return TestResultResponse(
-        id=str(result_dict["_id"]),
-        user_id=result_dict["user_id"],
-        score=result_dict["score"],
-        total_questions=result_dict["total_questions"],
-        correct_answers=result_dict["correct_answers"],
-        percentile=result_dict["percentile"],
-        questions=result_dict["questions"],
-        timestamp=result_dict["timestamp"]
-    )
-
-@api_router.get("/tests/history", response_model=List[TestResultResponse])
-async def get_test_history(current_user: dict = Depends(get_current_user)):
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).sort("timestamp", -1).to_list(100)
-    
-    return [TestResultResponse(
-        id=str(r["_id"]),
-        user_id=r["user_id"],
-        score=r["score"],
-        total_questions=r["total_questions"],
-        correct_answers=r["correct_answers"],
-        percentile=r["percentile"],
-        questions=r["questions"],
-        timestamp=r["timestamp"]
-    ) for r in results]
+    return FastJSONResponse(result_to_dict(await AttemptStorageService.hydrate(result)))
 
 # ==================== USER ROUTES - BOOKMARKS ====================
 
 @api_router.post("/bookmarks", response_model=BookmarkResponse)
 async def create_bookmark(bookmark: BookmarkCreate, current_user: dict = Depends(get_current_user)):
-    # Check if already bookmarked
-    existing = await db.bookmarks.find_one({
-        "user_id": str(current_user["_id"]),
-        "question_id": bookmark.question_id
-    })
-    
-    if existing:
-        return BookmarkResponse(
-            id=str(existing["_id"]),
-            user_id=existing["user_id"],
-            question_id=existing["question_id"],
-            created_at=existing.get("created_at", datetime.utcnow())
-        )
-    
-    bookmark_dict = {
-        "user_id": str(current_user["_id"]),
-        "question_id": bookmark.question_id,
-        "created_at": datetime.utcnow()
-    }
-    
-    result = await db.bookmarks.insert_one(bookmark_dict)
-    bookmark_dict["_id"] = result.inserted_id
+    existing = await BookmarkService.add(str(current_user["_id"]), bookmark.question_id)
     
     return BookmarkResponse(
-        id=str(bookmark_dict["_id"]),
-        user_id=bookmark_dict["user_id"],
-        question_id=bookmark_dict["question_id"],
-        created_at=bookmark_dict.get("created_at", datetime.utcnow())
+        id=str(existing["_id"]),
+        user_id=existing["user_id"],
+        question_id=existing["question_id"],
+        created_at=existing.get("created_at", datetime.utcnow())
     )
 
 @api_router.get("/bookmarks", response_model=List[BookmarkResponse])
@@ -1270,10 +1111,11 @@ async def delete_bookmark(bookmark_id: str, current_user: dict = Depends(get_cur
 
 @api_router.get("/analytics/performance", response_model=AnalyticsResponse)
 async def get_user_analytics(current_user: dict = Depends(get_current_user)):
-    # Get all test results for user
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).to_list(1000)
+    # Read the materialized rollup instead of the whole history
+    stats = await UserStatsService.get(str(current_user["_id"]))
+    total_tests, average_score = UserStatsService.summary(stats)
     
-    if not results:
+    if not total_tests:
         return AnalyticsResponse(
             user_id=str(current_user["_id"]),
             total_tests=0,
@@ -1283,40 +1125,18 @@ async def get_user_analytics(current_user: dict = Depends(get_current_user)):
             improvement_suggestions=[]
         )
     
-    # Calculate average score
-    total_tests = len(results)
-    average_score = sum(r["score"] for r in results) / total_tests
-    
-    # Analyze topic-wise performance
-    topic_performance = {}
-    
-    for result in results:
-        for q in result["questions"]:
-            question = await db.questions.find_one({"_id": ObjectId(q["question_id"])})
-            if question:
-                topic_id = question["topic_id"]
-                if topic_id not in topic_performance:
-                    topic_performance[topic_id] = {"correct": 0, "total": 0}
-                
-                topic_performance[topic_id]["total"] += 1
-                if q["is_correct"]:
-                    topic_performance[topic_id]["correct"] += 1
-    
-    # Calculate percentages and identify strong/weak topics
+    # Topic-wise performance
     topic_scores = []
-    for topic_id, performance in topic_performance.items():
-        percentage = (performance["correct"] / performance["total"]) * 100
-        topic = await db.topics.find_one({"_id": ObjectId(topic_id)})
-        
+    for topic_id, performance in stats.get("tests", {}).get("topics", {}).items():
+        topic = await content_cache.get("topics", topic_id)
         if topic:
             topic_scores.append({
                 "topic_id": topic_id,
                 "topic_name": topic["name"],
-                "percentage": percentage,
-                "correct": performance["correct"],
-                "total": performance["total"]
+                "percentage": (performance["correct"] / performance["total"]) * 100 if performance.get("total") else 0,
+                "correct": performance.get("correct", 0),
+                "total": performance.get("total", 0)
             })
-    
     topic_scores.sort(key=lambda x: x["percentage"], reverse=True)
     
     strong_topics = topic_scores[:3]
@@ -1324,7 +1144,7 @@ async def get_user_analytics(current_user: dict = Depends(get_current_user)):
     
     # Generate AI suggestions using Gemini
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = get_model('gemini-pro')
         
         prompt = f"""
         Analyze this student's performance and provide 3-5 personalized improvement suggestions:
@@ -1395,32 +1215,8 @@ async def get_test_recommendations(current_user: dict = Depends(get_current_user
 
 @api_router.get("/leaderboard")
 async def get_leaderboard(limit: int = 50):
-    # Aggregate to get average scores per user
-    pipeline = [
-        {"$group": {
-            "_id": "$user_id",
-            "average_score": {"$avg": "$score"},
-            "total_tests": {"$sum": 1}
-        }},
-        {"$sort": {"average_score": -1}},
-        {"$limit": limit}
-    ]
-    
-    leaderboard_data = await db.test_results.aggregate(pipeline).to_list(limit)
-    
-    # Get user details
-    leaderboard = []
-    for idx, entry in enumerate(leaderboard_data):
-        user = await db.users.find_one({"_id": ObjectId(entry["_id"])})
-        if user:
-            leaderboard.append({
-                "rank": idx + 1,
-                "user_email": user["email"],
-                "average_score": round(entry["average_score"], 2),
-                "total_tests": entry["total_tests"]
-            })
-    
-    return leaderboard
+    # Maintained on every submission, users hydrated in one query
+    return await LeaderboardService.top(board_id("all_time"), limit)
 
 # ==================== PASSWORD RESET ====================
 
@@ -1482,7 +1278,7 @@ async def reset_password(request: PasswordReset):
         raise HTTPException(status_code=400, detail="Reset code has expired")
     
     # Update password
-    hashed_password = pwd_context.hash(request.new_password)
+    hashed_password = await get_password_hash(request.new_password)
     await db.users.update_one(
         {"email": request.email},
         {"$set": {"password": hashed_password}}
@@ -1524,6 +1320,7 @@ async def update_profile(profile: ProfileUpdate, current_user: dict = Depends(ge
             {"_id": current_user["_id"]},
             {"$set": update_data}
         )
+        user_cache.invalidate(current_user["_id"])
     
     # Get updated user
     updated_user = await db.users.find_one({"_id": current_user["_id"]})
@@ -1595,28 +1392,13 @@ async def batch_bookmark_operation(request: BatchBookmarkRequest, current_user:
     user_id = str(current_user["_id"])
     
     if request.action == "add":
-        # Add bookmarks
-        for question_id in request.question_ids:
-            # Check if bookmark already exists
-            existing = await db.bookmarks.find_one({
-                "user_id": user_id,
-                "question_id": question_id
-            })
-            if not existing:
-                await db.bookmarks.insert_one({
-                    "user_id": user_id,
-                    "question_id": question_id,
-                    "created_at": datetime.utcnow()
-                })
-        return {"message": f"Added {len(request.question_ids)} bookmarks"}
+        # One unordered bulk upsert; already bookmarked questions are left as is
+        added = await BookmarkService.add_many(user_id, request.question_ids)
+        return {"message": f"Added {added} bookmarks", "added_count": added}
     
     elif request.action == "remove":
-        # Remove bookmarks
-        await db.bookmarks.delete_many({
-            "user_id": user_id,
-            "question_id": {"$in": request.question_ids}
-        })
-        return {"message": f"Removed {len(request.question_ids)} bookmarks"}
+        removed = await BookmarkService.remove_many(user_id, request.question_ids)
+        return {"message": f"Removed {removed} bookmarks", "removed_count": removed}
     
     else:
         raise HTTPException(status_code=400, detail="Invalid action. Use 'add' or 'remove'")
@@ -1626,40 +1408,14 @@ async def batch_bookmark_operation(request: BatchBookmarkRequest, current_user:
 @api_router.get("/analytics/difficulty-breakdown")
 async def get_difficulty_breakdown(current_user: dict = Depends(get_current_user)):
     """Get performance breakdown by difficulty level"""
-    user_id = str(current_user["_id"])
-    
-    # Get all test results
-    results = await db.test_results.find({"user_id": user_id}).to_list(None)
-    
-    difficulty_stats = {
-        "easy": {"correct": 0, "total": 0},
-        "medium": {"correct": 0, "total": 0},
-        "hard": {"correct": 0, "total": 0}
-    }
+    stats = await UserStatsService.get(str(current_user["_id"]))
+    difficulty_stats = UserStatsService.breakdown(stats, "difficulty")
     
-    for result in results:
-        for q in result["questions"]:
-            question = await db.questions.find_one({"_id": ObjectId(q["question_id"])})
-            if question:
-                difficulty = question["difficulty"]
-                difficulty_stats[difficulty]["total"] += 1
-                if q["is_correct"]:
-                    difficulty_stats[difficulty]["correct"] += 1
-    
-    # Calculate percentages
-    breakdown = []
-    for diff, stats in difficulty_stats.items():
-        if stats["total"] > 0:
-            percentage = (stats["correct"] / stats["total"]) * 100
-        else:
-            percentage = 0
-        
-        breakdown.append({
-            "difficulty": diff,
-            "correct": stats["correct"],
-            "total": stats["total"],
-            "percentage": round(percentage, 2)
-        })
+    empty = {"correct": 0, "total": 0, "percentage": 0}
+    breakdown = [
+        {"difficulty": diff, **difficulty_stats.get(diff, empty)}
+        for diff in ("easy", "medium", "hard")
+    ]
     
     return {"difficulty_breakdown": breakdown}
 
@@ -1673,49 +1429,14 @@ async def get_filtered_leaderboard(
     limit: int = 50
 ):
     """Get leaderboard with filters"""
+    if period not in PERIODS or scope not in SCOPES:
+        raise HTTPException(status_code=400, detail="Invalid period or scope")
+    if scope != "global" and not scope_id:
+        raise HTTPException(status_code=400, detail="scope_id is required for exam and subject leaderboards")
     
-    # Build date filter for period
-    date_filter = {}
-    if period == "weekly":
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        date_filter = {"timestamp": {"$gte": week_ago}}
-    elif period == "monthly":
-        month_ago = datetime.utcnow() - timedelta(days=30)
-        date_filter = {"timestamp": {"$gte": month_ago}}
-    
-    # Build scope filter
-    # For MVP, we'll use global scope
-    # In full implementation, filter by exam/subject questions
-    
-    pipeline = [
-        {"$match": date_filter},
-        {"$group": {
-            "_id": "$user_id",
-            "average_score": {"$avg": "$score"},
-            "total_tests": {"$sum": 1}
-        }},
-        {"$sort": {"average_score": -1}},
-        {"$limit": limit}
-    ]
-    
-    leaderboard_data = await db.test_results.aggregate(pipeline).to_list(limit)
-    
-    # Get user details
-    leaderboard = []
-    for idx, entry in enumerate(leaderboard_data):
-        user = await db.users.find_one({"_id": ObjectId(entry["_id"])})
-        if user:
-            leaderboard.append({
-                "rank": idx + 1,
-                "user_id": str(user["_id"]),
-                "user_email": user["email"],
-                "user_name": user.get("name", user["email"].split("@")[0]),
-                "average_score": round(entry["average_score"], 2),
-                "total_tests": entry["total_tests"]
-            })
-    
-    # Calculate percentile for current user
-    total_users = len(leaderboard)
+    board = board_id(period, scope, scope_id)
+    leaderboard = await LeaderboardService.top(board, limit)
+    total_users = await db.leaderboard_entries.count_documents({"board": board})
     
     return {
         "leaderboard": leaderboard,
@@ -1735,7 +1456,8 @@ async def get_filtered_questions(
     current_user: dict = Depends(get_current_user)
 ):
     """Get questions with filters"""
-    query = {}
+    # The bookmark filter is part of the query, so pages are full
+    query = await BookmarkService.filter_clause(str(current_user["_id"]), bookmarked)
     
     if sub_section_id:
         query["sub_section_id"] = sub_section_id
@@ -1744,38 +1466,7 @@ async def get_filtered_questions(
         query["difficulty"] = difficulty
     
     questions = await db.questions.find(query).limit(limit).to_list(limit)
-    
-    # If bookmarked filter is applied
-    if bookmarked is not None:
-        user_id = str(current_user["_id"])
-        bookmarked_questions = await db.bookmarks.find({"user_id": user_id}).to_list(None)
-        bookmarked_ids = {b["question_id"] for b in bookmarked_questions}
-        
-        if bookmarked:
-            # Only include bookmarked questions
-            questions = [q for q in questions if str(q["_id"]) in bookmarked_ids]
-        else:
-            # Exclude bookmarked questions
-            questions = [q for q in questions if str(q["_id"]) not in bookmarked_ids]
-    
-    return [
-        QuestionResponse(
-            id=str(q["_id"]),
-            sub_section_id=q["sub_section_id"],
-            question_text=q["question_text"],
-            options=q["options"],
-            correct_answer=q["correct_answer"],
-            difficulty=q["difficulty"],
-            tags=q.get("tags", []),
-            explanation=q.get("explanation", ""),
-            hint=q.get("hint", ""),
-            solution=q.get("solution", ""),
-            code_snippet=q.get("code_snippet", ""),
-            image_url=q.get("image_url", ""),
-            formula=q.get("formula", ""),
-            created_at=q.get("created_at", datetime.utcnow())
-        ) for q in questions
-    ]
+    return FastJSONResponse(questions_to_list(questions))
 
 # ==================== SYLLABUS MANAGEMENT ====================
 
@@ -1867,7 +1558,7 @@ async def delete_syllabus(syllabus_id: str, admin: dict = Depends(get_admin_user
 async def generate_syllabus_ai(exam_name: str, admin: dict = Depends(get_admin_user)):
     """Generate syllabus using Gemini AI"""
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = get_model('gemini-pro')
         
         prompt = f"""
         Generate a comprehensive syllabus for the {exam_name} examination. 
@@ -1926,71 +1617,28 @@ async def register_push_token(token_data: PushTokenCreate, current_user: dict =
 
 @api_router.post("/admin/notifications/send")
 async def send_notification(notification: NotificationCreate, admin: dict = Depends(get_admin_user)):
-    """Send push notification to users"""
-    import requests
-    
-    # Get target tokens
-    query = {}
-    if notification.target_users:
-        query["user_id"] = {"$in": notification.target_users}
-    
-    tokens = await db.push_tokens.find(query).to_list(None)
-    
-    # If exam_id specified, filter by users who have taken tests for that exam
-    if notification.exam_id and not notification.target_users:
-        # Get users who have taken tests (simplified - in production, link tests to exams)
-        user_ids = set()
-        test_results = await db.test_results.find().to_list(None)
-        user_ids = {r["user_id"] for r in test_results}
-        tokens = [t for t in tokens if t["user_id"] in user_ids]
-    
-    # Prepare Expo push notifications
-    expo_messages = []
-    for token_doc in tokens:
-        if token_doc["token"].startswith("ExponentPushToken"):
-            message = {
-                "to": token_doc["token"],
-                "title": notification.title,
-                "body": notification.body,
-                "data": notification.data or {},
-                "sound": "default"
-            }
-            expo_messages.append(message)
-    
-    # Send to Expo Push API
-    if expo_messages:
-        try:
-            response = requests.post(
-                "https://exp.host/--/api/v2/push/send",
-                json=expo_messages,
-                headers={
-                    "Accept": "application/json",
-                    "Content-Type": "application/json"
-                }
-            )
-            response.raise_for_status()
-            
-            # Store notification in database
-            notification_doc = {
-                "title": notification.title,
-                "body": notification.body,
-                "data": notification.data,
-                "target_users": notification.target_users,
-                "exam_id": notification.exam_id,
-                "sent_count": len(expo_messages),
-                "created_at": datetime.utcnow()
-            }
-            await db.notifications.insert_one(notification_doc)
-            
-            return {
-                "success": True,
-                "sent_count": len(expo_messages),
-                "message": f"Notification sent to {len(expo_messages)} devices"
-            }
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Failed to send notification: {str(e)}")
-    
-    return {"success": False, "message": "No valid push tokens found"}
+    """Send push notification to users
+    
+    Delivery runs as a background job (202 with a job_id); poll
+    /api/admin/jobs/{job_id} for the sent and failed counts.
+    """
+    notification_dict = notification.dict()
+    collection, query, _ = await NotificationService.recipients(notification_dict, PUSH_TOKENS_SOURCE)
+    recipients = await db[collection].count_documents(query)
+    if not recipients:
+        return {"success": False, "message": "No valid push tokens found"}
+    
+    job = await job_runner.submit(
+        SEND_NOTIFICATION,
+        {"notification": notification_dict, "source": PUSH_TOKENS_SOURCE},
+        submitted_by=str(admin["_id"])
+    )
+    return accepted(
+        job,
+        success=True,
+        sent_count=recipients,
+        message=f"Notification queued for {recipients} devices"
+    )
 
 @api_router.get("/notifications/history")
 async def get_notification_history(limit: int = 50, current_user: dict = Depends(get_current_user)):
@@ -2026,28 +1674,35 @@ async def check_practice_answer(
     current_user: dict = Depends(get_current_user)
 ):
     """Check answer during practice mode"""
-    question = await db.questions.find_one({"_id": ObjectId(question_id)})
-    if not question:
+    key = await answer_keys.get(question_id)
+    if not key:
         raise HTTPException(status_code=404, detail="Question not found")
     
-    is_correct = user_answer == question["correct_answer"]
+    is_correct = key.check(user_answer)
     
-    # Store practice attempt
+    # Store practice attempt while the response fields are read
     practice_doc = {
         "user_id": str(current_user["_id"]),
         "question_id": question_id,
         "user_answer": user_answer,
-        "correct_answer": question["correct_answer"],
+        "correct_answer": key.correct_answer,
         "is_correct": is_correct,
         "timestamp": datetime.utcnow()
     }
-    await db.practice_attempts.insert_one(practice_doc)
+    question, _ = await asyncio.gather(
+        db.questions.find_one(
+            {"_id": ObjectId(question_id)}, {"explanation": 1, "options": 1, **STATS_PROJECTION}
+        ),
+        db.practice_attempts.insert_one(practice_doc)
+    )
+    question = question or {}
+    await UserStatsService.record_practice(str(current_user["_id"]), question, is_correct)
     
     return {
         "is_correct": is_correct,
-        "correct_answer": question["correct_answer"],
+        "correct_answer": key.correct_answer,
         "explanation": question.get("explanation", ""),
-        "options": question["options"]
+        "options": question.get("options", [])
     }
 
 @api_router.get("/practice/history")
@@ -2064,39 +1719,14 @@ async def get_practice_history(current_user: dict = Depends(get_current_user), l
 @api_router.get("/analytics/subject-wise")
 async def get_subject_wise_analytics(current_user: dict = Depends(get_current_user)):
     """Get subject-wise performance analytics"""
-    # Get all test results
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).to_list(None)
+    stats = await UserStatsService.get(str(current_user["_id"]))
+    subject_stats = UserStatsService.breakdown(stats, "subjects")
     
     subject_performance = {}
-    
-    for result in results:
-        for q in result["questions"]:
-            question = await db.questions.find_one({"_id": ObjectId(q["question_id"])})
-            if question:
-                # Traverse up to find subject
-                sub_section = await db.sub_sections.find_one({"_id": ObjectId(question["sub_section_id"])})
-                if sub_section:
-                    section = await db.sections.find_one({"_id": ObjectId(sub_section["section_id"])})
-                    if section:
-                        sub_topic = await db.sub_topics.find_one({"_id": ObjectId(section["sub_topic_id"])})
-                        if sub_topic:
-                            topic = await db.topics.find_one({"_id": ObjectId(sub_topic["topic_id"])})
-                            if topic:
-                                chapter = await db.chapters.find_one({"_id": ObjectId(topic["chapter_id"])})
-                                if chapter:
-                                    subject = await db.subjects.find_one({"_id": ObjectId(chapter["subject_id"])})
-                                    if subject:
-                                        subject_id = str(subject["_id"])
-                                        if subject_id not in subject_performance:
-                                            subject_performance[subject_id] = {
-                                                "subject_name": subject["name"],
-                                                "correct": 0,
-                                                "total": 0
-                                            }
-                                        
-                                        subject_performance[subject_id]["total"] += 1
-                                        if q["is_correct"]:
-                                            subject_performance[subject_id]["correct"] += 1
+    for subject_id, counters in subject_stats.items():
+        subject = await content_cache.get("subjects", subject_id)
+        if subject:
+            subject_performance[subject_id] = {"subject_name": subject["name"], **counters}
     
     # Calculate percentages
     result_data = []
@@ -2116,41 +1746,19 @@ async def get_subject_wise_analytics(current_user: dict = Depends(get_current_us
 @api_router.get("/analytics/chapter-wise")
 async def get_chapter_wise_analytics(subject_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Get chapter-wise performance analytics"""
-    results = await db.test_results.find({"user_id": str(current_user["_id"])}).to_list(None)
+    stats = await UserStatsService.get(str(current_user["_id"]))
+    chapter_stats = UserStatsService.breakdown(stats, "chapters")
     
     chapter_performance = {}
-    
-    for result in results:
-        for q in result["questions"]:
-            question = await db.questions.find_one({"_id": ObjectId(q["question_id"])})
-            if question:
-                # Traverse up to find chapter
-                sub_section = await db.sub_sections.find_one({"_id": ObjectId(question["sub_section_id"])})
-                if sub_section:
-                    section = await db.sections.find_one({"_id": ObjectId(sub_section["section_id"])})
-                    if section:
-                        sub_topic = await db.sub_topics.find_one({"_id": ObjectId(section["sub_topic_id"])})
-                        if sub_topic:
-                            topic = await db.topics.find_one({"_id": ObjectId(sub_topic["topic_id"])})
-                            if topic:
-                                chapter = await db.chapters.find_one({"_id": ObjectId(topic["chapter_id"])})
-                                if chapter:
-                                    # Filter by subject if specified
-                                    if subject_id and chapter["subject_id"] != subject_id:
-                                        continue
-                                    
-                                    chapter_id = str(chapter["_id"])
-                                    if chapter_id not in chapter_performance:
-                                        chapter_performance[chapter_id] = {
-                                            "chapter_name": chapter["name"],
-                                            "subject_id": chapter["subject_id"],
-                                            "correct": 0,
-                                            "total": 0
-                                        }
-                                    
-                                    chapter_performance[chapter_id]["total"] += 1
-                                    if q["is_correct"]:
-                                        chapter_performance[chapter_id]["correct"] += 1
+    for chapter_id, counters in chapter_stats.items():
+        chapter = await content_cache.get("chapters", chapter_id)
+        # Filter by subject if specified
+        if chapter and (not subject_id or chapter["subject_id"] == subject_id):
+            chapter_performance[chapter_id] = {
+                "chapter_name": chapter["name"],
+                "subject_id": chapter["subject_id"],
+                **counters
+            }
     
     # Calculate percentages
     result_data = []
@@ -2171,106 +1779,71 @@ async def get_chapter_wise_analytics(subject_id: Optional[str] = None, current_u
 @api_router.get("/analytics/export")
 async def export_analytics(format: str = "json", current_user: dict = Depends(get_current_user)):
     """Export user analytics data"""
-    # Get all data
-    test_results = await db.test_results.find({"user_id": str(current_user["_id"])}).to_list(None)
-    analytics = await get_user_analytics(current_user)
-    subject_analytics = await get_subject_wise_analytics(current_user)
-    
-    export_data = {
-        "user_id": str(current_user["_id"]),
-        "user_email": current_user["email"],
-        "total_tests": len(test_results),
-        "average_score": analytics.average_score,
-        "strong_topics": analytics.strong_topics,
-        "weak_topics": analytics.weak_topics,
-        "subject_wise_performance": subject_analytics["subject_wise_performance"],
-        "test_history": [
-            {
-                "test_id": str(r["_id"]),
-                "score": r["score"],
-                "total_questions": r["total_questions"],
-                "correct_answers": r["correct_answers"],
-                "percentile": r["percentile"],
-                "timestamp": r["timestamp"].isoformat()
-            } for r in test_results
-        ],
-        "exported_at": datetime.utcnow().isoformat()
-    }
-    
-    if format == "csv":
-        # Convert to CSV format (simplified)
-        import csv
-        from io import StringIO
-        
-        output = StringIO()
-        writer = csv.writer(output)
-        
-        # Write headers
-        writer.writerow(["Test ID", "Score", "Total Questions", "Correct Answers", "Percentile", "Timestamp"])
-        
-        # Write test data
-        for test in export_data["test_history"]:
-            writer.writerow([
-                test["test_id"],
-                test["score"],
-                test["total_questions"],
-                test["correct_answers"],
-                test["percentile"],
-                test["timestamp"]
-            ])
-        
-        return {"format": "csv", "data": output.getvalue()}
-    
-    return {"format": "json", "data": export_data}
+    query = {"user_id": str(current_user["_id"])}
+    document = None
+    if format == "json":
+        analytics = await get_user_analytics(current_user)
+        subject_analytics = await get_subject_wise_analytics(current_user)
+        document = {
+            "format": "json",
+            "data": {
+                "user_id": str(current_user["_id"]),
+                "user_email": current_user["email"],
+                "total_tests": analytics.total_tests,
+                "average_score": analytics.average_score,
+                "strong_topics": analytics.strong_topics,
+                "weak_topics": analytics.weak_topics,
+                "subject_wise_performance": subject_analytics["subject_wise_performance"],
+                "exported_at": datetime.utcnow().isoformat()
+            }
+        }
+
+    # Test history is streamed from the cursor instead of loaded with to_list(None)
+    cursor = db.test_results.find(query, TEST_RESULT_EXPORT_PROJECTION).sort("timestamp", -1)
+    return stream_export(
+        cursor, format, TEST_RESULT_EXPORT_FIELDS, test_result_row, "analytics_export",
+        document=document, path=("data", "test_history")
+    )
 
 # ==================== EXCEL UPLOAD SUPPORT ====================
 
 @api_router.post("/admin/questions/bulk-upload-excel")
-async def bulk_upload_questions_excel(file: UploadFile = File(...), admin: dict = Depends(get_admin_user)):
-    """Bulk upload questions from Excel file"""
+async def bulk_upload_questions_excel(
+    file: UploadFile = File(...),
+    background: bool = False,
+    admin: dict = Depends(get_admin_user)
+):
+    """Bulk upload questions from Excel file (background=true runs it as a job)"""
+    import pandas as pd
+    from api.v1.questions.services import question_ingest
+    from api.v1.questions.services.question_upload import QuestionUploadService
+    
     try:
-        contents = await file.read()
+        # Expected columns: sub_section_id, question_text, option1, option2, option3, option4, correct_answer, difficulty, tags, explanation
+        options = {"sheet_format": question_ingest.LEGACY_FORMAT, "message": "File must contain columns"}
+        if background and file.filename.endswith(('.xlsx', '.xls', '.csv')):
+            return await submit_bulk_upload(file, admin, **options)
         
         # Check file extension
-        if file.filename.endswith('.xlsx') or file.filename.endswith('.xls'):
-            df = pd.read_excel(io.BytesIO(contents))
+        if file.filename.endswith('.xlsx'):
+            # Every sheet, streamed (read-only) to CSV by a process pool
+            summary = await QuestionUploadService.upload_excel(file.file, **options)
+        elif file.filename.endswith('.xls'):
+            df = pd.read_excel(io.BytesIO(await file.read()))
+            summary = await QuestionUploadService.upload_dataframe(df, **options)
         elif file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
+            summary = await QuestionUploadService.upload_csv(file.file, **options)
         else:
             raise HTTPException(status_code=400, detail="File must be CSV or Excel (.xlsx, .xls)")
         
-        # Expected columns: sub_section_id, question_text, option1, option2, option3, option4, correct_answer, difficulty, tags, explanation
-        required_columns = ["sub_section_id", "question_text", "option1", "option2", "option3", "option4", "correct_answer", "difficulty"]
-        if not all(col in df.columns for col in required_columns):
-            raise HTTPException(status_code=400, detail=f"File must contain columns: {required_columns}")
-        
-        questions = []
-        for _, row in df.iterrows():
-            options = [row["option1"], row["option2"], row["option3"], row["option4"]]
-            tags = row.get("tags", "").split(",") if pd.notna(row.get("tags")) else []
-            tags = [tag.strip() for tag in tags if tag.strip()]
-            
-            question_dict = {
-                "sub_section_id": str(row["sub_section_id"]),
-                "question_text": row["question_text"],
-                "options": options,
-                "correct_answer": int(row["correct_answer"]),
-                "difficulty": row["difficulty"],
-                "tags": tags,
-                "explanation": row.get("explanation", ""),
-                "created_at": datetime.utcnow()
-            }
-            questions.append(question_dict)
-        
-        if questions:
-            result = await db.questions.insert_many(questions)
-            return {
-                "success": True,
-                "message": f"Successfully uploaded {len(result.inserted_ids)} questions",
-                "count": len(result.inserted_ids)
-            }
-        else:
+        if not summary["total_rows"]:
             raise HTTPException(status_code=400, detail="No valid questions found in file")
+        return {
+            "success": True,
+            "message": QuestionUploadService.message(summary),
+            "count": QuestionUploadService.written_count(summary),
+            **summary
+        }
     
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing file: {str(e)}")
@@ -2286,7 +1859,7 @@ async def generate_questions_ai(
 ):
     """Generate questions using Gemini AI"""
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = get_model('gemini-pro')
         
         prompt = f"""
         Generate {count} multiple-choice questions for the topic: {topic_name}
@@ -2323,7 +1896,7 @@ async def improve_question_ai(
         raise HTTPException(status_code=404, detail="Question not found")
     
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = get_model('gemini-pro')
         
         prompt = f"""
         Improve this multiple-choice question:
@@ -2361,7 +1934,7 @@ async def analyze_question_ai(
         raise HTTPException(status_code=404, detail="Question not found")
     
     try:
-        model = genai.GenerativeModel('gemini-pro')
+        model = get_model('gemini-pro')
         
         prompt = f"""
         Analyze this multiple-choice question for quality:
@@ -2429,25 +2002,9 @@ async def get_detailed_admin_analytics(
         avg_score = 0
         avg_time_per_test = 0
     
-    # Popular subjects
-    subject_popularity = {}
-    for result in test_results:
-        for q in result.get("questions", []):
-            question = await db.questions.find_one({"_id": ObjectId(q["question_id"])})
-            if question:
-                # Get subject (simplified traversal)
-                sub_section = await db.sub_sections.find_one({"_id": ObjectId(question["sub_section_id"])})
-                if sub_section:
-                    section = await db.sections.find_one({"_id": ObjectId(sub_section["section_id"])})
-                    if section:
-                        sub_topic = await db.sub_topics.find_one({"_id": ObjectId(section["sub_topic_id"])})
-                        if sub_topic:
-                            topic = await db.topics.find_one({"_id": ObjectId(sub_topic["topic_id"])})
-                            if topic:
-                                chapter = await db.chapters.find_one({"_id": ObjectId(topic["chapter_id"])})
-                                if chapter:
-                                    subject_id_key = chapter["subject_id"]
-                                    subject_popularity[subject_id_key] = subject_popularity.get(subject_id_key, 0) + 1
+    # Popular subjects (answers per subject, via the questions' denormalized subject_id)
+    subject_stats = await QuestionAncestryService.answer_stats(test_query, "subject_id")
+    subject_popularity = {subject_id: stats["total"] for subject_id, stats in subject_stats.items()}
     
     popular_subjects = sorted(subject_popularity.items(), key=lambda x: x[1], reverse=True)[:5]
     
@@ -2481,8 +2038,9 @@ async def generate_questions_csv_ai(
     try:
         import uuid
         import json
+        import pandas as pd
         
-        model = genai.GenerativeModel('gemini-2.0-flash-exp')
+        model = get_model('gemini-2.0-flash-exp')
         
         all_questions = []
         
@@ -2621,6 +2179,7 @@ async def update_push_token(
             {"_id": ObjectId(user_id)},
             {"$set": {"push_token": token_data.push_token, "updated_at": datetime.utcnow()}}
         )
+        user_cache.invalidate(user_id)
         
         return {"success": True, "message": "Push token updated successfully"}
     except Exception as e:
@@ -2633,6 +2192,11 @@ async def send_push_notifications(
     current_user: dict = Depends(get_admin_user)
 ):
     """Send push notifications to users (Admin only)"""
+    try:
+        from exponent_server_sdk import PushClient, PushMessage, PushServerError
+    except ImportError:
+        raise HTTPException(status_code=503, detail="Push notifications are not available")
+    
     try:
         # Build query to find target users
         query = {}
@@ -2799,4 +2363,4 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await Database.close()
@@ -15,7 +15,7 @@ import { useAuth } from '../../src/context/AuthContext';
 import { useTheme } from '../../src/contexts/ThemeContext';
 import { Card, Loading, Button } from '../../src/components/common';
 import { quizService } from '../../src/services/api/quiz';
-import { Analytics, TestResult } from '../../src/types';
+import { Analytics, TestResultSummary } from '../../src/types';
 
 const createStyles = (colors: any) => ({
   userName: {
@@ -84,7 +84,7 @@ export default function ProfileScreen() {
   const { user, logout } = useAuth();
   const { theme, toggleTheme, colors } = useTheme();
   const [analytics, setAnalytics] = useState<Analytics | null>(null);
-  const [testHistory, setTestHistory] = useState<TestResult[]>([]);
+  const [testHistory, setTestHistory] = useState<TestResultSummary[]>([]);
   const [loading, setLoading] = useState(true);
   const [refreshing, setRefreshing] = useState(false);
 
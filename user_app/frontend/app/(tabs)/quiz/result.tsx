@@ -30,9 +30,11 @@ export default function ResultScreen() {
 
   const fetchTestResult = async () => {
     try {
-      const history = await quizService.getTestHistory();
-      const latestResult = history[0]; // Get the most recent result
-      setResult(latestResult);
+      // History rows are summaries; the attempt's questions come from its detail endpoint
+      const resultId = (params.resultId as string) || (await quizService.getTestHistory())[0]?.id;
+      if (resultId) {
+        setResult(await quizService.getTestResult(resultId));
+      }
     } catch (error) {
       console.error('Error fetching test result:', error);
     }
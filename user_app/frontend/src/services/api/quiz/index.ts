@@ -11,6 +11,7 @@ import {
   Question,
   TestSubmission,
   TestResult,
+  TestResultSummary,
   Bookmark,
   Analytics,
   LeaderboardEntry,
@@ -75,11 +76,16 @@ export const quizService = {
     return response.data;
   },
 
-  async getTestHistory(): Promise<TestResult[]> {
+  async getTestHistory(): Promise<TestResultSummary[]> {
     const response = await apiClient.get(API_ENDPOINTS.TESTS_HISTORY);
     return response.data;
   },
 
+  async getTestResult(resultId: string): Promise<TestResult> {
+    const response = await apiClient.get(`${API_ENDPOINTS.TESTS_HISTORY}/${resultId}`);
+    return response.data;
+  },
+
   // Bookmarks
   async createBookmark(questionId: string): Promise<Bookmark> {
     const response = await apiClient.post(API_ENDPOINTS.BOOKMARKS, {
@@ -5,7 +5,7 @@ import { Card, Loading, Button, Input } from '@/components/common';
 import { useAuth } from '@/contexts/AuthContext';
 import { quizService } from '@/lib/quiz-service';
 import { authService } from '@/lib/auth-service';
-import { Analytics, TestResult } from '@/types';
+import { Analytics, TestResultSummary } from '@/types';
 import toast from 'react-hot-toast';
 import {
   UserIcon,
@@ -41,7 +41,7 @@ const COLORS = ['#10B981', '#F59E0B', '#EF4444'];
 export default function ProfilePage() {
   const { user, updateUser } = useAuth();
   const [analytics, setAnalytics] = useState<Analytics | null>(null);
-  const [testHistory, setTestHistory] = useState<TestResult[]>([]);
+  const [testHistory, setTestHistory] = useState<TestResultSummary[]>([]);
   const [difficultyBreakdown, setDifficultyBreakdown] = useState<any[]>([]);
   const [loading, setLoading] = useState(true);
   const [editing, setEditing] = useState(false);
@@ -38,9 +38,11 @@ export default function ResultPage() {
 
   const fetchTestResult = async () => {
     try {
-      const history = await quizService.getTestHistory();
-      const latestResult = history[0];
-      setResult(latestResult);
+      // History rows are summaries; the attempt's questions come from its detail endpoint
+      const resultId = testId || (await quizService.getTestHistory())[0]?.id;
+      if (resultId) {
+        setResult(await quizService.getTestResult(resultId));
+      }
       
       // Fetch difficulty breakdown
       const breakdown = await quizService.getDifficultyBreakdown();
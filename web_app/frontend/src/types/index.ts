@@ -130,6 +130,16 @@ export interface TestResult {
   timestamp: string;
 }
 
+// Entry of /tests/history; questions come from /tests/history/{id}
+export interface TestResultSummary {
+  id: string;
+  score: number;
+  total_questions: number;
+  correct_answers: number;
+  percentile: number;
+  timestamp: string;
+}
+
 export interface Bookmark {
   id: string;
   user_id: string;